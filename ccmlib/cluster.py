@@ -18,8 +18,8 @@
 # ccm clusters
 from __future__ import absolute_import
 
-import itertools
 import os
+import functools
 import random
 import re
 import shutil
@@ -27,15 +27,16 @@ import signal
 import subprocess
 import threading
 import time
-from collections import OrderedDict, defaultdict, namedtuple
+from collections import OrderedDict, namedtuple
 from distutils.version import LooseVersion #pylint: disable=import-error, no-name-in-module
 
 import yaml
 from six import print_
 
-from ccmlib import common, extension, repository
-from ccmlib.node import Node, NodeError, TimeoutError
-from six.moves import xrange
+from ccmlib import common, extension, logmerge, logscan, logtail, repository, startup
+from ccmlib.node import NODE_WAIT_TIMEOUT_IN_SECS, Node, NodeError, TimeoutError
+from ccmlib.timeline import cluster_timeline
+from six.moves import queue, xrange
 try:
     from urllib.parse import urlparse
 except ImportError:
@@ -44,6 +45,16 @@ except ImportError:
 
 DEFAULT_CLUSTER_WAIT_TIMEOUT_IN_SECS = int(os.environ.get('CCM_CLUSTER_START_DEFAULT_TIMEOUT', 120))
 
+
+class StopResult():
+    """
+    What Cluster.stop_nodes() did with each node.
+    """
+    STOPPED = "stopped"
+    NOT_RUNNING = "not running"
+    KILLED = "killed"
+
+
 class Cluster(object):
 
     @staticmethod
@@ -157,9 +168,10 @@ class Cluster(object):
 
     def actively_watch_logs_for_error(self, on_error_call, interval=1):
         """
-        Begins a thread that repeatedly scans system.log for new errors, every interval seconds.
-        (The first pass covers the entire log contents written at that point,
-        subsequent scans cover newly appended log messages).
+        Begins a thread that reports new errors written to system.log as soon as
+        they are logged. (The first pass covers the entire log contents written at
+        that point, subsequent scans cover newly appended log messages). Nodes
+        added to the cluster are picked up within interval seconds.
 
         Reports new errors, by calling the provided callback with an OrderedDictionary
         mapping node name to a list of error lines.
@@ -171,6 +183,10 @@ class Cluster(object):
             """
             This class is embedded here for now, because it is used only from
             within Cluster, and depends on cluster.nodelist().
+
+            The logs are read by the shared tailers of the nodes, which are woken up by
+            file-change notifications; errors are queued by their subscribers and reported
+            from this thread, so that the callback is never called concurrently.
             """
 
             def __init__(self, cluster):
@@ -179,35 +195,42 @@ class Cluster(object):
                 self.daemon = True  # set so that thread will exit when main thread exits
                 self.req_stop_event = threading.Event()
                 self.done_event = threading.Event()
-                self.log_positions = defaultdict(int)
-
-            def scan(self):
+                self.reports = queue.Queue()
+                self.subscriptions = OrderedDict()
+
+            def subscribe(self):
+                nodes = self.cluster.nodelist()
+                # nodes removed from the cluster are no longer watched
+                names = set(node.name for node in nodes)
+                for name in [name for name in self.subscriptions if name not in names]:
+                    tailer, subscriber = self.subscriptions.pop(name)
+                    tailer.unsubscribe(subscriber)
+                for node in nodes:
+                    subscription = self.subscriptions.get(node.name)
+                    if subscription is not None:
+                        _, subscriber = subscription
+                        if subscriber.error is not None:
+                            # in the case of unexpected error, report this thread to the callback
+                            self.reports.put(('log_scanner', [[str(subscriber.error)]]))
+                            subscriber.error = None
+                        continue
+                    subscriber = logscan.ErrorSubscriber(lambda errors, name=node.name: self.reports.put((name, errors)))
+                    tailer = node.log_tailer()
+                    tailer.subscribe(subscriber)
+                    self.subscriptions[node.name] = (tailer, subscriber)
+
+            def report(self, timeout=None):
+                # reports everything queued together, waiting up to timeout for something to be
                 errordata = OrderedDict()
-
                 try:
-                    for node in self.cluster.nodelist():
-                        scan_from_mark = self.log_positions[node.name]
-                        next_time_scan_from_mark = node.mark_log()
-                        if next_time_scan_from_mark == scan_from_mark:
-                            # log hasn't advanced, nothing to do for this node
-                            continue
-                        else:
-                            errors = node.grep_log_for_errors_from(seek_start=scan_from_mark)
-                        self.log_positions[node.name] = next_time_scan_from_mark
-                        if errors:
-                            errordata[node.name] = errors
-                except IOError as e:
-                    if 'No such file or directory' in str(e.strerror):
-                        pass  # most likely log file isn't yet written
-
-                    # in the case of unexpected error, report this thread to the callback
-                    else:
-                        errordata['log_scanner'] = [[str(e)]]
-
-                return errordata
-
-            def scan_and_report(self):
-                errordata = self.scan()
+                    report = self.reports.get(timeout=timeout) if timeout else self.reports.get_nowait()
+                    while True:
+                        if report is not None:
+                            name, errors = report
+                            errordata.setdefault(name, []).extend(errors)
+                        report = self.reports.get_nowait()
+                except queue.Empty:
+                    pass
 
                 if errordata:
                     on_error_call(errordata)
@@ -215,24 +238,30 @@ class Cluster(object):
             def run(self):
                 common.debug("Log-watching thread starting.")
 
-                # run until stop gets requested by .join()
-                while not self.req_stop_event.is_set():
-                    self.scan_and_report()
-                    time.sleep(interval)
-
                 try:
-                    # do a final scan to make sure we got to the very end of the files
-                    self.scan_and_report()
+                    # run until stop gets requested by .join()
+                    while not self.req_stop_event.is_set():
+                        self.subscribe()
+                        self.report(timeout=interval)
+
+                    # make sure we got to the very end of the files
+                    for tailer, _ in self.subscriptions.values():
+                        tailer.catch_up()
+                    self.report()
                 finally:
+                    for tailer, subscriber in self.subscriptions.values():
+                        tailer.unsubscribe(subscriber)
+                    self.subscriptions.clear()
                     common.debug("Log-watching thread exiting.")
                     # done_event signals that the scan completed a final pass
                     self.done_event.set()
 
             def join(self, timeout=None):
-                # signals to the main run() loop that a stop is requested
+                # signals to the main run() loop that a stop is requested, and wakes it up
                 self.req_stop_event.set()
+                self.reports.put(None)
                 # now wait for the main loop to get through a final log scan, and signal that it's done
-                self.done_event.wait(timeout=interval * 2)  # need to wait at least interval seconds before expecting thread to finish. 2x for safety.
+                self.done_event.wait(timeout=interval * 2)
                 super(LogWatchingThread, self).join(timeout)
 
         log_watcher = LogWatchingThread(self)
@@ -531,7 +560,24 @@ class Cluster(object):
 
     def start(self, no_wait=False, verbose=False, wait_for_binary_proto=True,
               wait_other_notice=True, jvm_args=None, profile_options=None,
-              quiet_start=False, allow_root=False, jvm_version=None, **kwargs):
+              quiet_start=False, allow_root=False, jvm_version=None, deadline=None,
+              max_concurrent_starts=None, **kwargs):
+        """
+        Start the nodes of the cluster that are not running. deadline, a common.Deadline
+        or a number of seconds, bounds the whole start: every wait, of every node, waits
+        at most for the time left (and for its own timeout). timeout (in kwargs,
+        DEFAULT_CLUSTER_WAIT_TIMEOUT_IN_SECS by default) only bounds the wait of each
+        node for its listening message; the ccm start --deadline option sets deadline.
+
+        The nodes are started concurrently, each going from its launch to listening for
+        clients on its own; at most max_concurrent_starts of them (all by default) are
+        being launched at a time, until their JVM runs. Seeds are launched before the
+        other nodes, and nodes allocating their tokens at startup one after the other,
+        each once the previous one accepts clients.
+        With wait_other_notice, the started nodes and the nodes already running all
+        wait for the started nodes to be UP.
+        """
+        deadline = common.Deadline.of(deadline)
         if jvm_args is None:
             jvm_args = []
 
@@ -544,71 +590,270 @@ class Cluster(object):
                     if itf is not None:
                         common.assert_socket_available(itf)
 
-        started = []
-        for node in list(self.nodes.values()):
-            if not node.is_running():
-                mark = 0
-                if os.path.exists(node.logfilename()):
-                    mark = node.mark_log()
-
+        # every wait below fails as soon as one of the nodes shows it will not start
+        supervisor = startup.StartupSupervisor()
+        timeline = cluster_timeline(self, 'cluster')
+        try:
+            to_start = [node for node in list(self.nodes.values()) if not node.is_running()]
+            # the nodes already running must see the started ones UP too
+            live_marks = {}
+            if wait_other_notice and not no_wait:
+                live_marks = dict((node, node.mark_log()) for node in list(self.nodes.values()) if node.is_live())
+            # Prior to JDK8, starting every node at once could lead to a
+            # nanotime collision where the RNG that generates a node's tokens
+            # gives identical tokens to several nodes. Thus, we stagger
+            # the node launches
+            launch_lock = threading.Lock() if common.get_jdk_version() < '1.8' else None
+            # a node holds its slot until its JVM runs, then waits for it to listen without one
+            scheduler = startup.StartScheduler(max_concurrent_starts, slot_phase='running')
+            seeds = [node for node in to_start if node in self.seeds]
+            allocating = None
+            for node in to_start:
+                after = [(seed, 'launched') for seed in seeds if node not in seeds]
                 # if the node is going to allocate_strategy_ tokens during start, then wait_for_binary_proto=True
                 node_wait_for_binary_proto = (self.can_generate_tokens() and self.use_vnodes and node.initial_token is None)
-                p = node.start(update_pid=False, jvm_args=jvm_args, jvm_version=jvm_version,
-                               profile_options=profile_options, verbose=verbose, quiet_start=quiet_start,
-                               allow_root=allow_root, wait_for_binary_proto=node_wait_for_binary_proto)
-
-                # Prior to JDK8, starting every node at once could lead to a
-                # nanotime collision where the RNG that generates a node's tokens
-                # gives identical tokens to several nodes. Thus, we stagger
-                # the node starts
-                if common.get_jdk_version() < '1.8':
-                    time.sleep(1)
+                if node_wait_for_binary_proto:
+                    if allocating is not None:
+                        after.append((allocating, 'launched'))
+                    allocating = node
+                pipeline = functools.partial(self._start_node, node, supervisor, deadline, launch_lock, no_wait,
+                                             # the nodes are waited for to see each other below, all at once
+                                             dict(jvm_args=jvm_args, jvm_version=jvm_version, wait_other_notice=False,
+                                                  profile_options=profile_options, verbose=verbose,
+                                                  quiet_start=quiet_start, allow_root=allow_root,
+                                                  wait_for_binary_proto=node_wait_for_binary_proto,
+                                                  timeline=timeline),
+                                             kwargs.get('timeout', DEFAULT_CLUSTER_WAIT_TIMEOUT_IN_SECS))
+                scheduler.add(node, pipeline, after)
+            try:
+                results = scheduler.run()
+            except RuntimeError as e:
+                timeline.record(None, 'failed', error=str(e))
+                return None
+            started = [results[node] for node in to_start]
+
+            if no_wait:
+                time.sleep(common.cap_timeout(2, deadline))  # waiting 2 seconds to check for early errors and for the pid to be set
+                supervisor.check()
+
+            self.__update_pids(started)
+
+            for node, p, _ in started:
+                if not node.is_running():
+                    raise NodeError("Error starting {0}.".format(node.name), p)
+
+            if not no_wait:
+                marks = dict((node, mark) for node, _, mark in started)
+                if wait_other_notice and marks and (len(marks) > 1 or live_marks):
+                    # every node must see every other started node UP, all the logs are watched at once
+                    exprs_by_node = dict((node, node.alive_exprs([other for other in marks if other is not node]))
+                                         for node in marks)
+                    exprs_by_node.update((node, node.alive_exprs(list(marks))) for node in live_marks)
+
+                    def seen(node, at):
+                        # each started node once it saw the others UP
+                        if node in marks:
+                            timeline.record(node, 'gossip', at=at)
+
+                    self.watch_logs_for(exprs_by_node, from_marks=dict(list(live_marks.items()) + list(marks.items())),
+                                        timeout=max(node.ALIVE_WAIT_TIMEOUT_IN_SECS for node in exprs_by_node),
+                                        supervisor=supervisor, deadline=deadline, on_found=seen)
+
+                if wait_for_binary_proto:
+                    if self.version() >= '1.2':
+                        self.watch_logs_for(dict((node, ["Starting listening for CQL clients"]) for node in marks),
+                                            from_marks=marks, timeout=NODE_WAIT_TIMEOUT_IN_SECS,
+                                            error_on_pid_terminated=True, supervisor=supervisor, deadline=deadline)
+                    self._wait_for_binary_sockets(list(marks), deadline, timeline)
+        except Exception as e:
+            timeline.record(None, 'failed', error=str(e))
+            raise
+        finally:
+            supervisor.close()
 
-                started.append((node, p, mark))
+        for node, _, _ in started:
+            timeline.record(node, 'ready')
+        timeline.record(None, 'ready')
+        extension.post_cluster_start(self)
 
-        if no_wait:
-            time.sleep(2)  # waiting 2 seconds to check for early errors and for the pid to be set
-        else:
-            for node, p, mark in started:
-                if not node._wait_for_running(p, timeout_s=7):
-                    raise NodeError("Node {} should be running before waiting for <started listening> log message, "
-                                    "but C* process is terminated.".format(node.name))
-                try:
-                    timeout=kwargs.get('timeout', DEFAULT_CLUSTER_WAIT_TIMEOUT_IN_SECS)
-                    timeout=int(os.environ.get('CCM_CLUSTER_START_TIMEOUT_OVERRIDE', timeout))
-                    start_message = "Listening for thrift clients..." if self.cassandra_version() < "2.2" else "Starting listening for CQL clients"
-                    node.watch_log_for(start_message, timeout=timeout, process=p, verbose=verbose, from_mark=mark,
-                                       error_on_pid_terminated=True)
-                except RuntimeError:
-                    return None
+        return started
 
-        self.__update_pids(started)
+    def _wait_for_binary_sockets(self, nodes, deadline, timeline):
+        # the sockets of the nodes are checked concurrently, each recorded as soon as it listens
+        errors = []
 
-        for node, p, _ in started:
-            if not node.is_running():
-                raise NodeError("Error starting {0}.".format(node.name), p)
+        def wait(node):
+            try:
+                node.wait_for_binary_socket(timeout=common.cap_timeout(NODE_WAIT_TIMEOUT_IN_SECS, deadline))
+                timeline.record(node, 'binary')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=wait, args=(node,), name="ccm-binary-{}".format(node.name))
+                   for node in nodes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def _start_node(self, node, supervisor, deadline, launch_lock, no_wait, start_options, timeout, progress):
+        # the start of one node by start(), from its launch to listening for clients
+        mark = 0
+        if os.path.exists(node.logfilename()):
+            mark = node.mark_log()
+        # Node.start adds to its jvm_args
+        start_options = dict(start_options, jvm_args=list(start_options['jvm_args']))
+        try:
+            if launch_lock is None:
+                p = node.start(update_pid=False, supervisor=supervisor, deadline=deadline, **start_options)
+            else:
+                with launch_lock:
+                    p = node.start(update_pid=False, supervisor=supervisor, deadline=deadline, **start_options)
+                    time.sleep(1)
+            progress('launched')
+            if no_wait:
+                return node, p, mark
+
+            if not node._wait_for_running(p, timeout_s=common.cap_timeout(7, deadline)):
+                supervisor.check()
+                if deadline is not None and deadline.expired():
+                    raise TimeoutError.create(start=deadline.start, timeout=deadline.timeout, node=node.name,
+                                              msg="the start deadline expired before the process was running")
+                raise NodeError("Node {} should be running before waiting for <started listening> log message, "
+                                "but C* process is terminated.".format(node.name))
+            start_options['timeline'].record(node, 'pid')
+            progress('running')
+            timeout = int(os.environ.get('CCM_CLUSTER_START_TIMEOUT_OVERRIDE', timeout))
+            start_message = "Listening for thrift clients..." if self.cassandra_version() < "2.2" else "Starting listening for CQL clients"
+            node.watch_log_for(start_message, timeout=timeout, process=p, verbose=start_options['verbose'],
+                               from_mark=mark, error_on_pid_terminated=True, supervisor=supervisor, deadline=deadline)
+            start_options['timeline'].record(node, 'listening')
+            progress('listening')
+            return node, p, mark
+        except Exception as e:
+            # the other starts need not wait any longer
+            supervisor.fail(node, str(e) or type(e).__name__)
+            raise
 
-        if not no_wait:
-            if wait_other_notice:
-                for (node, _, mark), (other_node, _, _) in itertools.permutations(started, 2):
-                    node.watch_log_for_alive(other_node, from_mark=mark)
+    def watch_logs_for(self, exprs_by_node, from_marks=None, timeout=DEFAULT_CLUSTER_WAIT_TIMEOUT_IN_SECS,
+                       filename='system.log', error_on_pid_terminated=False, supervisor=None, deadline=None,
+                       on_found=None):
+        """
+        Watch the logs of several nodes at once until each of them contains all of its (regular)
+        expressions. exprs_by_node maps nodes to their list of expressions, and from_marks nodes
+        to the mark (as returned by mark_log()) to watch their log from. On successful completion,
+        a dict of node to list of pair (line matched, match object) is returned.
+
+        The logs are all tailed concurrently, so the wait lasts as long as the slowest node.
+        Raises TimeoutError if some expressions are not found within timeout seconds, NodeError
+        if error_on_pid_terminated is True and the process of a node still waited for terminates,
+        and StartupError as soon as the startup.StartupSupervisor given as supervisor sees a node
+        fail to start. deadline (a common.Deadline) bounds the wait along with timeout.
+        Once all are found, on_found, if given, is called with each node and the time at
+        which all of its expressions were.
+        """
+        start = time.time()
+        timeout = common.cap_timeout(timeout, deadline)
+        from_marks = from_marks or {}
+        subscriptions = []
+        try:
+            for node, exprs in exprs_by_node.items():
+                if not exprs:
+                    continue
+                subscriber = logtail.PatternSubscriber(exprs, timeout=timeout)
+                if supervisor is not None:
+                    supervisor.watch(subscriber)
+                tailer = node.log_tailer(filename)
+                tailer.subscribe(subscriber, from_mark=from_marks.get(node))
+                subscriptions.append((node, tailer, subscriber))
+
+            pending = list(subscriptions)
+            while pending:
+                _, _, subscriber = pending[0]
+                if subscriber.wait(logtail.POLL_INTERVAL_IN_SECS):
+                    if subscriber.expired:
+                        break
+                    pending.pop(0)
+                elif error_on_pid_terminated:
+                    for node, _, _ in pending:
+                        if node.pid:
+                            node.raise_node_error_if_cassandra_process_is_terminated()
+        finally:
+            for _, tailer, subscriber in subscriptions:
+                tailer.unsubscribe(subscriber)
+                if supervisor is not None:
+                    supervisor.unwatch(subscriber)
+
+        missing = ["{}: {}{}".format(node.name, [e.pattern for e in subscriber.tofind],
+                                     subscriber.capture.describe().replace('\n', '\n  '))
+                   for node, _, subscriber in subscriptions if subscriber.tofind]
+        if missing:
+            raise TimeoutError.create(start=start, timeout=timeout,
+                                      msg="Missing in {f}:\n {m}".format(f=filename, m="\n ".join(missing)))
+        if on_found is not None:
+            for node, _, subscriber in subscriptions:
+                on_found(node, subscriber.finished_at)
+        return dict((node, subscriber.matchings) for node, _, subscriber in subscriptions)
 
-            if wait_for_binary_proto:
-                for node, p, mark in started:
-                    node.wait_for_binary_interface(process=p, verbose=verbose, from_mark=mark)
+    def stop(self, wait=True, signal_event=signal.SIGTERM, **kwargs):
+        """
+        Stop the running nodes of the cluster and return those that were not running.
+        The nodes are stopped all at once, see stop_nodes().
+        """
+        results = self.stop_nodes(wait=wait, signal_event=signal_event, **kwargs)
+        return [node for node, result in results.items() if result == StopResult.NOT_RUNNING]
 
-        extension.post_cluster_start(self)
+    def stop_nodes(self, wait=True, signal_event=signal.SIGTERM, kill_after=None, **kwargs):
+        """
+        Stop the running nodes of the cluster and return an OrderedDict of each node to
+        its StopResult. Every node is signaled at once, then waited for concurrently, so
+        that the stop lasts as long as the slowest node. A deadline, a common.Deadline or
+        a number of seconds, bounds the waits of all the nodes together. Nodes still
+        running kill_after seconds after being signaled are killed with SIGKILL.
+        wait_other_notice is ignored: no node is left running to notice.
+        If some nodes cannot be stopped, the NodeError of the first one is raised once
+        the others are stopped.
+        """
+        deadline = common.Deadline.of(kwargs.pop('deadline', None))
+        kwargs.pop('wait_other_notice', None)
+        results = OrderedDict((node, None) for node in list(self.nodes.values()))
+        errors = []
 
-        return started
+        def stop_node(node):
+            try:
+                results[node] = self._stop_node(node, wait, signal_event, kill_after, deadline, kwargs)
+            except Exception as e:
+                errors.append(e)
 
-    def stop(self, wait=True, signal_event=signal.SIGTERM, **kwargs):
-        not_running = []
         extension.pre_cluster_stop(self)
-        for node in list(self.nodes.values()):
-            if not node.stop(wait=wait, signal_event=signal_event, **kwargs):
-                not_running.append(node)
+        threads = [threading.Thread(target=stop_node, args=(node,), name="ccm-stop-{}".format(node.name))
+                   for node in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
         extension.post_cluster_stop(self)
-        return not_running
+        return results
+
+    def _stop_node(self, node, wait, signal_event, kill_after, deadline, kwargs):
+        if kill_after is None or not wait:
+            stopped = node.stop(wait=wait, signal_event=signal_event, deadline=deadline, **kwargs)
+            return StopResult.STOPPED if stopped else StopResult.NOT_RUNNING
+        try:
+            grace_period = common.Deadline(common.cap_timeout(kill_after, deadline))
+            stopped = node.stop(wait=wait, signal_event=signal_event, deadline=grace_period, **kwargs)
+            return StopResult.STOPPED if stopped else StopResult.NOT_RUNNING
+        except NodeError:
+            if not node.is_running():
+                return StopResult.STOPPED
+        common.warning("{} still running after {}s, killing it".format(node.name, kill_after))
+        if not node.stop(wait=wait, signal_event=signal.SIGKILL, deadline=deadline):
+            return StopResult.STOPPED
+        return StopResult.KILLED
 
     def set_log_level(self, new_level, class_names=None):
         class_names = class_names or []
@@ -869,47 +1114,81 @@ class Cluster(object):
         Raises a TimeoutError if the pattern is not found within the specified timeout period.
         """
         start_time = time.time()
-        while True:
-            TimeoutError.raise_if_passed(start=start_time, timeout=timeout_seconds,
-                                         msg="Unable to find: {x} in any node log within {t} s".format(
-                                             x=versions_to_patterns.patterns, t=timeout_seconds))
-
-            for node in self.nodelist():
-                pattern = versions_to_patterns(node.get_cassandra_version())
-                matchings = node.grep_log(pattern, filename)
-                if matchings:
-                    ret = namedtuple('Node_Log_Matching', 'node matchings')
-                    return ret(node=node, matchings=matchings)
-            time.sleep(1)
+        node_patterns = [(node, versions_to_patterns(node.get_cassandra_version())) for node in self.nodelist()]
+        found = common.watch_logs_for_any(node_patterns, timeout_seconds, filename=filename)
+        if found is None:
+            raise TimeoutError.create(start=start_time, timeout=timeout_seconds,
+                                      msg="Unable to find: {x} in any node log within {t} s".format(
+                                          x=versions_to_patterns.patterns, t=timeout_seconds))
+        node, _ = found
+        # every matching line logged so far, as before
+        matchings = node.grep_log(dict(node_patterns)[node], filename)
+        ret = namedtuple('Node_Log_Matching', 'node matchings')
+        return ret(node=node, matchings=matchings)
 
     def wait_for_any_log(self, pattern, timeout, filename='system.log', marks=None):
         return common.wait_for_any_log(self.nodelist(), pattern, timeout, filename=filename, marks=marks)
 
+    def grep_logs(self, pattern, filenames=('system.log',), since_mark=None, selected_nodes_names=None, workers=None):
+        """
+        Searches the logs of nodes in this cluster for a regular expression, all at
+        once (see logscan.grep_files), and yields (node name, filename, line) for the
+        matching lines. The lines of each log are yielded together, as soon as it
+        has been searched; large logs are searched by several processes, so that the
+        search lasts about as long as the slowest node's.
+        Params:
+        @filenames : the names of the logs to search, e.g. ('system.log', 'debug.log').
+        @since_mark : where to start searching each log: a mark (as returned by mark_log()),
+            or a dict mapping nodes to their mark, or (node, filename) pairs when searching several logs.
+        @selected_nodes_names : a list-like object that contains names of nodes to be searched. If empty, all nodes are.
+        @workers : the number of logs searched at once, logscan.GREP_WORKERS by default.
+        """
+        tasks = []
+        for node in self._selected_nodes(selected_nodes_names):
+            for filename in filenames:
+                if isinstance(since_mark, dict):
+                    mark = since_mark.get((node, filename), since_mark.get(node))
+                else:
+                    mark = since_mark
+                tasks.append(((node.name, filename), os.path.join(node.log_directory(), filename), pattern, mark))
+        for (name, filename), lines in logscan.grep_files(tasks, workers=workers):
+            for line in lines:
+                yield name, filename, line
+
     def show_logs(self, selected_nodes_names=None):
         """
-        Shows logs of nodes in this cluster, by default, with multitail.
-        If you need to alter the command or options, change CCM_MULTITAIL_CMD .
+        Returns the paths of the system.log of nodes in this cluster, to be shown
+        by an external viewer such as multitail (see merged_logs() for a built-in view).
         Params:
         @selected_nodes_names : a list-like object that contains names of nodes to be shown. If empty, this will show all nodes in the cluster.
         """
 
-        if selected_nodes_names is None:
-            selected_nodes_names = []
-
         if len(self.nodes) == 0:
             print_("There are no nodes in this cluster yet.")
             return
 
+        return [node.logfilename() for node in self._selected_nodes(selected_nodes_names)]
+
+    def merged_logs(self, selected_nodes_names=None, filename='system.log', follow=False):
+        """
+        Yields (node name, line) for the lines of the logs of nodes in this
+        cluster, merged in timestamp order (see logmerge.merge_logs).
+        Params:
+        @selected_nodes_names : a list-like object that contains names of nodes to be shown. If empty, this will show all nodes in the cluster.
+        @filename : the log to show, e.g. debug.log (which also has everything logged in system.log).
+        @follow : once the logs are shown, keep showing what is written to them until the generator is closed.
+        """
+        sources = [(node.name, os.path.join(node.log_directory(), filename))
+                   for node in self._selected_nodes(selected_nodes_names)]
+        return logmerge.merge_logs(sources, follow=follow)
+
+    def _selected_nodes(self, selected_nodes_names):
         nodes = sorted(list(self.nodes.values()), key=lambda node: node.name)
+        if not selected_nodes_names:
+            return nodes
         nodes_names = [node.name for node in nodes]
-
-        names_logs_dict = {node.name: node.logfilename() for node in nodes}
-        if len(selected_nodes_names) == 0: # Parameter selected_nodes_names is empty
-            return names_logs_dict.values()
-        else:
-            if set(selected_nodes_names).issubset(nodes_names):
-                return [names_logs_dict[name] for name in selected_nodes_names]
-            else:
-                raise ValueError("nodes in this cluster are {}. But nodes in argments are {}".format(
-                    nodes_names, selected_nodes_names
-                ))
+        if not set(selected_nodes_names).issubset(nodes_names):
+            raise ValueError("nodes in this cluster are {}. But nodes in argments are {}".format(
+                nodes_names, selected_nodes_names
+            ))
+        return [self.nodes[name] for name in selected_nodes_names]
@@ -25,7 +25,7 @@ import sys
 
 from six import print_
 
-from ccmlib import common, extension, repository
+from ccmlib import common, extension, repository, timeline
 from ccmlib.cluster_factory import ClusterFactory
 from ccmlib.cmds.command import Cmd
 from ccmlib.common import ArgumentError, get_default_signals
@@ -60,7 +60,9 @@ CLUSTER_CMDS = [
     "jconsole",
     "setworkload",
     "enableaoss",
-    "showlogs"
+    "showlogs",
+    "grep",
+    "timeline"
 ]
 
 
@@ -358,19 +360,111 @@ class ClusterStatusCmd(Cmd):
 
 
 class ClusterShowlogsCmd(Cmd):
-    descr_text = "Show logs of nodes in this cluster. If no nodes are specified, logs of all nodes will be shown.\
-                 By default multitail is used. If you need to alter the command or options, change CCM_MULTITAIL_CMD."
+    options_list = [
+        (['-f', '--follow'], {'action': "store_true", 'dest': "follow", 'help': "Keep showing what is logged until interrupted", 'default': False}),
+        (['--debug'], {'action': "store_true", 'dest': "debug", 'help': "Show debug.log (which also has everything in system.log) instead of system.log", 'default': False}),
+        (['--multitail'], {'action': "store_true", 'dest': "multitail", 'help': "Show the logs with multitail. If you need to alter the command or options, change CCM_MULTITAIL_CMD.", 'default': False}),
+    ]
+    descr_text = "Show logs of nodes in this cluster, merged in timestamp order, each line prefixed by the name of its node.\
+                 If no nodes are specified, logs of all nodes will be shown."
 
-    usage = "usage: ccm showlogs [node1 node2 ...]"
+    usage = "usage: ccm showlogs [options] [node1 node2 ...]"
 
     def validate(self, parser, options, args):
         Cmd.validate(self, parser, options, args, load_cluster=True)
 
     def run(self):
-        shower = os.getenv("CCM_MULTITAIL_CMD", 'multitail').split()[0]
-        shower_options = os.getenv("CCM_MULTITAIL_CMD", "").split()[1:]
-        logs = self.cluster.show_logs(self.args)
-        os.execvp(shower, [shower]+shower_options+logs)
+        if self.options.multitail:
+            shower = os.getenv("CCM_MULTITAIL_CMD", 'multitail').split()[0]
+            shower_options = os.getenv("CCM_MULTITAIL_CMD", "").split()[1:]
+            logs = self.cluster.show_logs(self.args)
+            if logs is not None:
+                os.execvp(shower, [shower] + shower_options + logs)
+            return
+
+        if len(self.cluster.nodes) == 0:
+            print_("There are no nodes in this cluster yet.")
+            return
+        filename = 'debug.log' if self.options.debug else 'system.log'
+        try:
+            lines = self.cluster.merged_logs(self.args, filename=filename, follow=self.options.follow)
+        except ValueError as e:
+            print_(str(e), file=sys.stderr)
+            exit(1)
+        width = max(len(name) for name in self.args or self.cluster.nodes)
+        try:
+            for name, line in lines:
+                sys.stdout.write("{} | {}".format(name.ljust(width), line))
+                if self.options.follow:
+                    sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            lines.close()
+
+
+class ClusterGrepCmd(Cmd):
+    options_list = [
+        (['--log'], {'type': "string", 'action': "append", 'dest': "logs", 'default': None, 'help': "The log to search, system.log by default (you may specify multiple --log)"}),
+        (['--debug'], {'action': "store_true", 'dest': "debug", 'help': "Search debug.log (which also has everything in system.log) instead of system.log", 'default': False}),
+        (['-j', '--jobs'], {'type': "int", 'dest': "jobs", 'help': "Number of logs searched at once (4 by default)", 'default': None}),
+    ]
+    descr_text = "Search the logs of nodes in this cluster for a regular expression, each matching line prefixed\
+                 by the name of its node. If no nodes are specified, logs of all nodes are searched."
+    usage = "usage: ccm grep [options] pattern [node1 node2 ...]"
+
+    def validate(self, parser, options, args):
+        Cmd.validate(self, parser, options, args, load_cluster=True)
+        if len(args) == 0:
+            print_("Missing pattern")
+            parser.print_help()
+            exit(1)
+        self.pattern = args[0]
+        self.filenames = options.logs or (['debug.log'] if options.debug else ['system.log'])
+
+    def run(self):
+        try:
+            results = self.cluster.grep_logs(self.pattern, filenames=self.filenames,
+                                             selected_nodes_names=self.args[1:], workers=self.options.jobs)
+            for name, filename, line in results:
+                if len(self.filenames) > 1:
+                    name = "{} {}".format(name, filename)
+                print_("{}: {}".format(name, line.rstrip('\n')))
+        except ValueError as e:
+            print_(str(e), file=sys.stderr)
+            exit(1)
+
+
+class ClusterTimelineCmd(Cmd):
+    options_list = [
+        (['--run'], {'type': "string", 'dest': "run", 'help': "The run to show the waterfall of (the last one by default)", 'default': None}),
+        (['-n', '--runs'], {'type': "int", 'dest': "runs", 'help': "Compute the percentiles over the last N runs only", 'default': None}),
+    ]
+    descr_text = "Show when each node of the last start (or of the given run) reached each startup phase, and\
+                 the percentiles across starts of the time the nodes took to reach them, by Cassandra version"
+    usage = "usage: ccm timeline [options]"
+
+    def validate(self, parser, options, args):
+        Cmd.validate(self, parser, options, args, load_cluster=True)
+
+    def run(self):
+        events = timeline.load_events(os.path.join(self.cluster.get_path(), timeline.TIMELINE_FILENAME))
+        by_run = timeline.runs(events)
+        if not by_run:
+            print_("No start recorded for this cluster yet")
+            return
+        run = self.options.run or list(by_run)[-1]
+        if run not in by_run:
+            print_("Unknown run {}".format(run), file=sys.stderr)
+            exit(1)
+        for line in timeline.format_waterfall(by_run[run]):
+            print_(line)
+        print_("")
+        runs = list(by_run.values())
+        if self.options.runs:
+            runs = runs[-self.options.runs:]
+        for line in timeline.format_percentiles([event for run_events in runs for event in run_events]):
+            print_(line)
 
 
 class ClusterRemoveCmd(Cmd):
@@ -487,6 +581,8 @@ class ClusterStartCmd(Cmd):
         (['--quiet-windows'], {'action': "store_true", 'dest': "quiet_start", 'help': "Pass -q on Windows 2.2.4+ and 3.0+ startup. Ignored on linux.", 'default': False}),
         (['--root'], {'action': "store_true", 'dest': "allow_root", 'help': "Allow CCM to start cassandra as root", 'default': False}),
         (['--jvm-version'], {'type': "int", 'dest': "jvm_version", 'help': "Specify the JVM version to use (e.g. 8 for Java 8)", 'default': None}),
+        (['--deadline'], {'type': "int", 'dest': "deadline", 'help': "Fail if the nodes are not started within this many seconds, all waits included", 'default': None}),
+        (['--max-concurrent-starts'], {'type': "int", 'dest': "max_concurrent_starts", 'help': "Launch at most this many nodes at a time, until their JVM runs (default: all at once)", 'default': None}),
     ]
     descr_text = "Start all the non started nodes of the current cluster"
     usage = "usage: ccm cluster start [options]"
@@ -519,7 +615,9 @@ class ClusterStartCmd(Cmd):
                                   profile_options=profile_options,
                                   quiet_start=self.options.quiet_start,
                                   allow_root=self.options.allow_root,
-                                  jvm_version=self.options.jvm_version) is None:
+                                  jvm_version=self.options.jvm_version,
+                                  deadline=self.options.deadline,
+                                  max_concurrent_starts=self.options.max_concurrent_starts) is None:
                 details = ""
                 if not self.options.verbose:
                     details = " (you can use --verbose for more information)"
@@ -527,9 +625,11 @@ class ClusterStartCmd(Cmd):
                 exit(1)
         except NodeError as e:
             print_(str(e), file=sys.stderr)
-            print_("Standard error output is:", file=sys.stderr)
-            for line in e.process.stderr_file.readlines():
-                print_(line.rstrip('\n'), file=sys.stderr)
+            if e.process is not None and getattr(e.process, 'stderr_file', None) is not None:
+                print_("Standard error output is:", file=sys.stderr)
+                e.process.stderr_file.seek(0)
+                for line in e.process.stderr_file.readlines():
+                    print_(line.rstrip('\n'), file=sys.stderr)
             exit(1)
 
 
@@ -541,6 +641,7 @@ class ClusterStopCmd(Cmd):
         (['-g', '--gently'], {'action': "store_const", 'dest': "signal_event", 'help': "Shut down gently (default)", 'const': signal.SIGTERM, 'default': signal.SIGTERM}),
         (['--hang-up'], {'action': "store_const", 'dest': "signal_event", 'help': "Shut down via hang up (kill -1)", 'const': get_default_signals()['1']}),
         (['--not-gently'], {'action': "store_const", 'dest': "signal_event", 'help': "Shut down immediately (kill -9)", 'const': get_default_signals()['9']}),
+        (['--kill-after'], {'type': "int", 'dest': "kill_after", 'help': "Kill (kill -9) the nodes still running this many seconds after being signaled", 'default': None}),
     ]
     descr_text = "Stop all the nodes of the cluster"
     usage = "usage: ccm cluster stop [options] name"
@@ -550,7 +651,8 @@ class ClusterStopCmd(Cmd):
 
     def run(self):
         try:
-            not_running = self.cluster.stop(wait=not self.options.no_wait, signal_event=self.options.signal_event)
+            not_running = self.cluster.stop(wait=not self.options.no_wait, signal_event=self.options.signal_event,
+                                            kill_after=self.options.kill_after)
             if self.options.verbose and len(not_running) > 0:
                 sys.stdout.write("The following nodes were not running: ")
                 for node in not_running:
@@ -794,18 +896,28 @@ class ClusterInvalidatecacheCmd(Cmd):
 
 class ClusterChecklogerrorCmd(Cmd):
 
-    descr_text = "Check for errors in log file of each node."
-    usage = "usage: ccm checklogerror"
+    options_list = [
+        (['--all'], {'action': "store_true", 'dest': "all", 'help': "Print every occurrence of every error", 'default': False}),
+    ]
+    descr_text = "Check for errors in log file of each node. Each distinct error is printed once, with its number of occurrences."
+    usage = "usage: ccm checklogerror [options]"
 
     def validate(self, parser, options, args):
         Cmd.validate(self, parser, options, args, load_cluster=True)
 
     def run(self):
         for node in self.cluster.nodelist():
-            errors = node.grep_log_for_errors()
-            for mylist in errors:
-                for line in mylist:
+            if self.options.all:
+                for mylist in node.grep_log_for_errors():
+                    for line in mylist:
+                        print_(line)
+                continue
+            for error in node.log_error_digest():
+                for line in error.lines:
                     print_(line)
+                if error.count > 1:
+                    print_("[{}: {} occurrences of this error, between offsets {} and {} of the log]".format(
+                        node.name, error.count, error.first_offset, error.last_offset))
 
 
 class ClusterShowlastlogCmd(Cmd):
@@ -72,7 +72,8 @@ NODE_CMDS = [
     "resume",
     "jconsole",
     "versionfrombuild",
-    "byteman"
+    "byteman",
+    "gcstats"
 ]
 
 
@@ -817,6 +818,18 @@ class NodeVersionfrombuildCmd(Cmd):
         print_(common.get_version_from_build(self.node.get_install_dir()))
 
 
+class NodeGcstatsCmd(Cmd):
+
+    descr_text = "Print GC pause-time distribution, allocation rate and heap after GC, from the GC logs of the node"
+    usage = "usage: ccm node_name gcstats"
+
+    def validate(self, parser, options, args):
+        Cmd.validate(self, parser, options, args, node_name=True, load_cluster=True)
+
+    def run(self):
+        print_(self.node.gc_stats())
+
+
 class NodeBytemanCmd(Cmd):
 
     descr_text = "Invoke byteman-submit "
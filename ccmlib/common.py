@@ -33,12 +33,13 @@ import socket
 import stat
 import subprocess
 import sys
+import threading
 import time
 import yaml
 from distutils.version import LooseVersion  #pylint: disable=import-error, no-name-in-module
 from six import print_
 
-from ccmlib import extension
+from ccmlib import extension, logtail
 
 
 BIN_DIR = "bin"
@@ -233,6 +234,62 @@ class TimeoutError(Exception):
         Exception.__init__(self, str(data))
 
 
+class Deadline(object):
+    """
+    The time by which an operation must be done, shared by all of its waits:
+    each of them waits at most for the time left, so that nested and parallel
+    waits are all bounded by the timeout of the operation rather than adding
+    up. A Deadline without timeout never expires.
+    """
+
+    def __init__(self, timeout=None):
+        self.start = time.time()
+        self.timeout = timeout
+        self.end = self.start + timeout if timeout is not None else None
+
+    @staticmethod
+    def of(deadline):
+        """
+        Returns deadline if it is a Deadline (or None), and a Deadline expiring in deadline seconds otherwise.
+        """
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return Deadline(deadline)
+
+    def remaining(self):
+        """
+        Returns the number of seconds left, None if the deadline never expires.
+        """
+        if self.end is None:
+            return None
+        return max(0, self.end - time.time())
+
+    def expired(self):
+        return self.end is not None and time.time() >= self.end
+
+    def cap(self, timeout):
+        """
+        Returns timeout, or the time left if it is shorter (or timeout is None).
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def __repr__(self):
+        return "Deadline(remaining={})".format(self.remaining())
+
+
+def cap_timeout(timeout, deadline):
+    """
+    Returns timeout bounded by deadline, a Deadline, a number of seconds or None.
+    """
+    deadline = Deadline.of(deadline)
+    return deadline.cap(timeout) if deadline is not None else timeout
+
+
 class LogPatternToVersion(object):
 
     def __init__(self, versions_to_patterns, default_pattern=None):
@@ -1010,25 +1067,52 @@ def wait_for_any_log(nodes, pattern, timeout, filename='system.log', marks=None)
     of nodes.
     @param nodes The list of nodes whose logs to scan
     @param pattern The target pattern
-    @param timeout How long to wait for the pattern. Note that
-                    strictly speaking, timeout is not really a timeout,
-                    but a maximum number of attempts. This implies that
-                    the all the grepping takes no time at all, so it is
-                    somewhat inaccurate, but probably close enough.
+    @param timeout How long to wait for the pattern, in seconds.
     @param marks A dict of nodes to marks in the file. Keys must match the first param list.
     @return The first node in whose log the pattern was found
     """
+    found = watch_logs_for_any([(node, pattern) for node in nodes], timeout, filename=filename, marks=marks)
+    if found is None:
+        raise TimeoutError(time.strftime("%d %b %Y %H:%M:%S", time.gmtime()) +
+                           " Unable to find: " + repr(pattern) + " in any node log within " + str(timeout) + "s")
+    return found[0]
+
+
+def watch_logs_for_any(node_patterns, timeout, filename='system.log', marks=None):
+    """
+    Watches the logs of several nodes until the log of one of them contains its pattern.
+    @param node_patterns A list of (node, pattern)
+    @param timeout How long to wait for a pattern, in seconds.
+    @param marks A dict of nodes to marks in the file, to watch the logs from.
+    @return (node, [(line, match)]) for the first node in node_patterns whose pattern
+            was found, or None if none was found within timeout
+    Each log is read once, as it is written, by the shared tailer of the node.
+    """
     if marks is None:
         marks = {}
-    for _ in range(timeout):
-        for node in nodes:
-            found = node.grep_log(pattern, filename=filename, from_mark=marks.get(node, None))
-            if found:
-                return node
-        time.sleep(1)
-
-    raise TimeoutError(time.strftime("%d %b %Y %H:%M:%S", time.gmtime()) +
-                       " Unable to find: " + repr(pattern) + " in any node log within " + str(timeout) + "s")
+    deadline = time.time() + timeout
+    wakeup = threading.Event()
+    subscriptions = []
+    try:
+        for node, pattern in node_patterns:
+            subscriber = logtail.PatternSubscriber([pattern], wakeup=wakeup)
+            tailer = node.log_tailer(filename)
+            tailer.subscribe(subscriber, from_mark=marks.get(node, None))
+            subscriptions.append((node, tailer, subscriber))
+
+        while True:
+            for node, _, subscriber in subscriptions:
+                if subscriber.is_done():
+                    subscriber.wait()  # re-raises reading errors
+                    return node, subscriber.matchings
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            wakeup.wait(remaining)
+            wakeup.clear()
+    finally:
+        for _, tailer, subscriber in subscriptions:
+            tailer.unsubscribe(subscriber)
 
 
 def get_default_signals():
@@ -0,0 +1,174 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm compaction log analysis
+from __future__ import absolute_import
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from ccmlib.logsource import log_replaced, read_raw_lines
+
+# how many compaction logs have their CompactionLog kept, the least recently used ones being dropped
+MAX_LOGS = 16
+
+
+class TableCompactionStats(object):
+    """
+    What the compaction log tells about the compactions of one table.
+    """
+
+    def __init__(self, keyspace, table):
+        self.keyspace = keyspace
+        self.table = table
+        self.compactions = 0
+        self.flushes = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.duration_ms = 0
+        # last number of pending tasks logged by each compaction strategy of the table
+        self.pending_by_strategy = {}
+
+    @property
+    def pending(self):
+        return sum(self.pending_by_strategy.values())
+
+    @property
+    def throughput_mb(self):
+        """
+        Compaction throughput in MB/s of input, over the time spent compacting.
+        """
+        if not self.duration_ms:
+            return None
+        return self.bytes_in / 1024.0 / 1024.0 / (self.duration_ms / 1000.0)
+
+    def as_dict(self):
+        return {'compactions': self.compactions,
+                'flushes': self.flushes,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'duration_ms': self.duration_ms,
+                'throughput_mb': self.throughput_mb,
+                'pending': self.pending}
+
+    def __repr__(self):
+        return "{}.{}: {}".format(self.keyspace, self.table, self.as_dict())
+
+
+def _sstables_size(sstables):
+    return sum(entry.get('table', {}).get('size', 0) or 0 for entry in sstables or ())
+
+
+class CompactionLog(object):
+    """
+    Incremental reader of the compaction log (compaction.log, written as JSON
+    lines for the tables with the log_all compaction option). Each call to
+    update() only parses the events appended since the previous one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._offset = 0
+        self.tables = {}  # (keyspace, table) -> TableCompactionStats
+
+    def update(self):
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                self._reset(None)
+                return self
+            if log_replaced(st, self._inode, self._offset):
+                # a new log was started
+                self._reset(st.st_ino)
+            self._inode = st.st_ino
+            if st.st_size == self._offset:
+                return self
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                for raw in read_raw_lines(f):
+                    if not raw.endswith(b'\n'):
+                        # still being written
+                        break
+                    self._offset += len(raw)
+                    self._add(raw)
+        return self
+
+    def _add(self, raw):
+        try:
+            event = json.loads(raw.decode('utf-8'))
+        except ValueError:
+            return
+        if not isinstance(event, dict) or 'keyspace' not in event or 'table' not in event:
+            return
+        key = (event['keyspace'], event['table'])
+        stats = self.tables.get(key)
+        if stats is None:
+            stats = self.tables[key] = TableCompactionStats(*key)
+        kind = event.get('type')
+        if kind == 'compaction':
+            stats.compactions += 1
+            stats.bytes_in += _sstables_size(event.get('input'))
+            stats.bytes_out += _sstables_size(event.get('output'))
+            try:
+                stats.duration_ms += max(0, int(event['end']) - int(event['start']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        elif kind == 'flush':
+            stats.flushes += 1
+        elif kind == 'pending':
+            stats.pending_by_strategy[event.get('strategyId')] = int(event.get('pending', 0))
+        elif kind == 'disable':
+            stats.pending_by_strategy.clear()
+
+    def pending_tasks(self):
+        """
+        Returns the number of pending compaction tasks last logged for all tables.
+        """
+        with self._lock:
+            return sum(stats.pending for stats in self.tables.values())
+
+    def finished_tasks(self):
+        with self._lock:
+            return sum(stats.compactions for stats in self.tables.values())
+
+
+_logs = OrderedDict()
+_logs_lock = threading.Lock()
+
+
+def get_compaction_log(path):
+    """
+    Returns the CompactionLog shared by everybody reading the compaction log at path.
+    Those of the MAX_LOGS logs used last are kept.
+    """
+    path = os.path.abspath(path)
+    with _logs_lock:
+        log = _logs.pop(path, None)
+        if log is None:
+            log = CompactionLog(path)
+        _logs[path] = log
+        while len(_logs) > MAX_LOGS:
+            _logs.popitem(last=False)
+        return log
@@ -141,13 +141,13 @@ class DseCluster(Cluster):
     def can_generate_tokens(self):
         return False
 
-    def start(self, no_wait=False, verbose=False, wait_for_binary_proto=False, wait_other_notice=True, jvm_args=None, profile_options=None, quiet_start=False, allow_root=False, jvm_version=None):
+    def start(self, no_wait=False, verbose=False, wait_for_binary_proto=False, wait_other_notice=True, jvm_args=None, profile_options=None, quiet_start=False, allow_root=False, jvm_version=None, deadline=None, max_concurrent_starts=None):
         if jvm_args is None:
             jvm_args = []
         marks = {}
         for node in self.nodelist():
             marks[node] = node.mark_log()
-        started = super(DseCluster, self).start(no_wait, verbose, wait_for_binary_proto, wait_other_notice, jvm_args, profile_options, quiet_start=quiet_start, allow_root=allow_root, timeout=180, jvm_version=jvm_version)
+        started = super(DseCluster, self).start(no_wait, verbose, wait_for_binary_proto, wait_other_notice, jvm_args, profile_options, quiet_start=quiet_start, allow_root=allow_root, timeout=180, jvm_version=jvm_version, deadline=deadline, max_concurrent_starts=max_concurrent_starts)
         self.start_opscenter()
         if self._misc_config_options.get('enable_aoss', False):
             self.wait_for_any_log('AlwaysOn SQL started', 600, marks=marks)
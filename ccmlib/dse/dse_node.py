@@ -38,6 +38,9 @@ class DseNode(Node):
     Provides interactions to a DSE node.
     """
 
+    # a higher default than for Cassandra nodes
+    ALIVE_WAIT_TIMEOUT_IN_SECS = 720
+
     @staticmethod
     def get_version_from_build(install_dir=None, node_path=None, cassandra=False):
         if install_dir is None and node_path is not None:
@@ -138,15 +141,6 @@ class DseNode(Node):
             self._dse_config_options = common.merge_configuration(self._dse_config_options, values)
         self.import_dse_config_files()
 
-    def watch_log_for_alive(self, nodes, from_mark=None, timeout=720, filename='system.log'):
-        """
-        Watch the log of this node until it detects that the provided other
-        nodes are marked UP. This method works similarly to watch_log_for_death.
-
-        We want to provide a higher default timeout when this is called on DSE.
-        """
-        super(DseNode, self).watch_log_for_alive(nodes, from_mark=from_mark, timeout=timeout, filename=filename)
-
     def get_launch_bin(self):
         cdir = self.get_install_dir()
         launch_bin = common.join_bin(cdir, 'bin', 'dse')
@@ -183,11 +177,15 @@ class DseNode(Node):
               quiet_start=False,
               allow_root=False,
               set_migration_task=True,
-              jvm_version=None):
+              jvm_version=None,
+              supervisor=None,
+              deadline=None,
+              timeline=None):
         mark = self.mark_log()
         process = super(DseNode, self).start(join_ring, no_wait, verbose, update_pid, wait_other_notice, replace_token,
                                              replace_address, jvm_args, wait_for_binary_proto, profile_options, use_jna,
-                                             quiet_start, allow_root, set_migration_task, jvm_version)
+                                             quiet_start, allow_root, set_migration_task, jvm_version, supervisor, deadline,
+                                             timeline)
         if self.cluster.hasOpscenter():
             self._start_agent()
 
@@ -0,0 +1,257 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm GC log analysis
+from __future__ import absolute_import
+
+import os
+import re
+from collections import namedtuple
+
+from ccmlib.logsource import read_lines
+
+# a stop-the-world pause; sizes in KB, None when the log does not tell
+GcPause = namedtuple('GcPause', 'uptime kind pause_ms heap_before heap_after heap_total')
+
+_UNITS = {'B': 1.0 / 1024, 'K': 1, 'M': 1024, 'G': 1024 * 1024}
+
+# JDK 8 (-Xloggc with -XX:+PrintGCDetails), e.g.
+# 2024-01-01T10:00:00.123+0000: 1.234: [GC (Allocation Failure) ... [ParNew: ...] 34944K->5000K(126720K), 0.0124 secs] ...
+# 2024-01-01T10:00:00.123+0000: 1.234: [GC pause (G1 Evacuation Pause) (young), 0.0123 secs]
+_jdk8_pause_re = re.compile(r'(?P<uptime>\d+\.\d+): \[(?P<kind>Full GC|GC)(?P<cause>(?: pause)?(?: \((?:[^()]|\([^)]*\))*\))*)')
+# the total of a pause (or of one of its generations) is the last, e.g. [Times: ... real=0.01 secs] does not count
+_jdk8_secs_re = re.compile(r'(?:(?P<before>\d+(?:\.\d+)?)(?P<bunit>[BKMG])->)?(?:(?P<after>\d+(?:\.\d+)?)(?P<aunit>[BKMG])'
+                           r'\((?P<total>\d+(?:\.\d+)?)(?P<tunit>[BKMG])\))?, (?P<secs>\d+\.\d+) secs\]')
+# sizes of the non-heap spaces, printed after the heap ones
+_jdk8_non_heap_re = re.compile(r', \[(?:Metaspace|PSPermGen|CMS Perm ?|Perm ?): [^\]]*\]')
+# G1 details printed on the following lines
+_jdk8_g1_heap_re = re.compile(r'Heap: (?P<before>\d+(?:\.\d+)?)(?P<bunit>[BKMG])\(\d+(?:\.\d+)?[BKMG]\)->'
+                              r'(?P<after>\d+(?:\.\d+)?)(?P<aunit>[BKMG])\((?P<total>\d+(?:\.\d+)?)(?P<tunit>[BKMG])\)')
+
+# JDK 9+ unified logging (-Xlog:gc), e.g.
+# [2024-01-01T10:00:00.123+0000][1.234s][123][456][info][gc] GC(0) Pause Young (Normal) (G1 Evacuation Pause) 24M->4M(256M) 12.345ms
+_unified_pause_re = re.compile(r'\[(?P<uptime>\d+\.\d+)s\].*\bGC\(\d+\) (?P<kind>Pause .*?)'
+                               r'(?: (?P<before>\d+(?:\.\d+)?)(?P<bunit>[BKMG])->(?P<after>\d+(?:\.\d+)?)(?P<aunit>[BKMG])'
+                               r'\((?P<total>\d+(?:\.\d+)?)(?P<tunit>[BKMG])\))? (?P<ms>\d+\.\d+)ms')
+
+
+def _kb(m, group):
+    value = m.group(group)
+    if value is None:
+        return None
+    return float(value) * _UNITS[m.group(group[0] + 'unit')]
+
+
+class GcLogParser(object):
+    """
+    Turns the lines of a JDK 8 or unified (JDK 9+) GC log into GcPause tuples.
+    Lines are fed one at a time; the pauses they complete are returned.
+    """
+
+    def __init__(self):
+        # a JDK 8 G1 pause waiting for its heap sizes, printed on the following lines
+        self._pending = None
+
+    def feed(self, line):
+        m = _unified_pause_re.search(line)
+        if m:
+            return self._complete() + [GcPause(float(m.group('uptime')), m.group('kind').strip(), float(m.group('ms')),
+                                               _kb(m, 'before'), _kb(m, 'after'), _kb(m, 'total'))]
+
+        m = _jdk8_pause_re.search(line)
+        if m:
+            pauses = self._complete()
+            kind = m.group('kind') + m.group('cause').rstrip()
+            secs = None
+            for secs in _jdk8_secs_re.finditer(_jdk8_non_heap_re.sub('', line[m.end():])):
+                pass
+            if secs is None:
+                return pauses
+            pause = GcPause(float(m.group('uptime')), kind, float(secs.group('secs')) * 1000,
+                            _kb(secs, 'before'), _kb(secs, 'after'), _kb(secs, 'total'))
+            if pause.heap_after is None:
+                self._pending = pause
+            else:
+                pauses.append(pause)
+            return pauses
+
+        if self._pending is not None:
+            m = _jdk8_g1_heap_re.search(line)
+            if m:
+                pause, self._pending = self._pending, None
+                return [pause._replace(heap_before=_kb(m, 'before'), heap_after=_kb(m, 'after'),
+                                       heap_total=_kb(m, 'total'))]
+        return []
+
+    def flush(self):
+        """
+        Returns the pause still waiting for its details, if any.
+        """
+        return self._complete()
+
+    def _complete(self):
+        pending, self._pending = self._pending, None
+        return [pending] if pending is not None else []
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))]
+
+
+class GcStats(object):
+    """
+    Summary of the pauses of one or more GC logs: pause-time distribution,
+    allocation rate and heap occupancy after GC.
+    """
+
+    # upper bounds (ms) of the buckets of the pause-time histogram
+    HISTOGRAM_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self, pauses=()):
+        self.pauses = []
+        self.elapsed = 0.0  # seconds of JVM uptime covered by the logs
+        self.allocated_kb = 0.0
+        self._last = None
+        self._last_heap_after = None
+        for pause in pauses:
+            self.add(pause)
+
+    def add(self, pause):
+        if self._last is not None and pause.uptime < self._last.uptime:
+            # the JVM was restarted, nothing is known about what happened in between
+            self._last = None
+            self._last_heap_after = None
+        if self._last is not None:
+            self.elapsed += pause.uptime - self._last.uptime
+        if pause.heap_before is not None and self._last_heap_after is not None:
+            self.allocated_kb += max(0.0, pause.heap_before - self._last_heap_after)
+        self.pauses.append(pause)
+        self._last = pause
+        if pause.heap_after is not None:
+            self._last_heap_after = pause.heap_after
+
+    @property
+    def count(self):
+        return len(self.pauses)
+
+    @property
+    def full_count(self):
+        return sum(1 for p in self.pauses if p.kind.startswith('Full GC') or p.kind.startswith('Pause Full'))
+
+    @property
+    def total_pause_ms(self):
+        return sum(p.pause_ms for p in self.pauses)
+
+    def pause_percentile(self, p):
+        return _percentile(sorted(pause.pause_ms for pause in self.pauses), p)
+
+    def histogram(self):
+        """
+        Returns a list of (upper bound in ms, number of pauses), the last bound being None.
+        """
+        counts = [0] * (len(self.HISTOGRAM_BUCKETS) + 1)
+        for pause in self.pauses:
+            i = 0
+            while i < len(self.HISTOGRAM_BUCKETS) and pause.pause_ms > self.HISTOGRAM_BUCKETS[i]:
+                i += 1
+            counts[i] += 1
+        return list(zip(self.HISTOGRAM_BUCKETS + (None,), counts))
+
+    @property
+    def pause_fraction(self):
+        """
+        Fraction of the time spent in pauses, close to 1 when GC-bound.
+        """
+        return self.total_pause_ms / 1000.0 / self.elapsed if self.elapsed else None
+
+    @property
+    def allocation_rate_mb(self):
+        """
+        Allocation rate in MB/s, from the heap growth between pauses.
+        """
+        return self.allocated_kb / 1024.0 / self.elapsed if self.elapsed else None
+
+    def heap_after_gc_mb(self):
+        """
+        Returns (min, average, max, last) heap occupancy after GC in MB.
+        """
+        after = [p.heap_after / 1024.0 for p in self.pauses if p.heap_after is not None]
+        if not after:
+            return None
+        return min(after), sum(after) / len(after), max(after), after[-1]
+
+    def as_dict(self):
+        return {'count': self.count,
+                'full_count': self.full_count,
+                'total_pause_ms': self.total_pause_ms,
+                'pause_ms': dict((p, self.pause_percentile(p)) for p in (50, 90, 99, 100)),
+                'histogram': self.histogram(),
+                'pause_fraction': self.pause_fraction,
+                'allocation_rate_mb': self.allocation_rate_mb,
+                'heap_after_gc_mb': self.heap_after_gc_mb()}
+
+    def __str__(self):
+        if not self.pauses:
+            return "No GC pause logged"
+        lines = ["Pauses: {} ({} full), {:.1f} ms in total".format(self.count, self.full_count, self.total_pause_ms),
+                 "Pause time (ms): p50 {:.1f}, p90 {:.1f}, p99 {:.1f}, max {:.1f}".format(
+                     *[self.pause_percentile(p) for p in (50, 90, 99, 100)])]
+        if self.pause_fraction is not None:
+            lines.append("Time in pauses: {:.2%} of {:.1f} s".format(self.pause_fraction, self.elapsed))
+        if self.allocation_rate_mb is not None:
+            lines.append("Allocation rate: {:.1f} MB/s".format(self.allocation_rate_mb))
+        heap = self.heap_after_gc_mb()
+        if heap is not None:
+            lines.append("Heap after GC (MB): min {:.1f}, avg {:.1f}, max {:.1f}, last {:.1f}".format(*heap))
+        lines.append("Pause time histogram:")
+        previous = 0
+        for bound, count in self.histogram():
+            if count:
+                label = "{}-{} ms".format(previous, bound) if bound is not None else "> {} ms".format(previous)
+                lines.append("  {:>13}: {}".format(label, count))
+            previous = bound
+        return "\n".join(lines)
+
+
+def gc_logs(log_directory):
+    """
+    Returns the GC logs (current and rotated) of a log directory, oldest first.
+    """
+    try:
+        names = [name for name in os.listdir(log_directory) if name.startswith('gc.log')]
+    except OSError:
+        return []
+    paths = [os.path.join(log_directory, name) for name in names]
+    return sorted((p for p in paths if os.path.isfile(p)), key=lambda p: (os.path.getmtime(p), p))
+
+
+def parse_gc_logs(paths):
+    """
+    Returns the GcStats of the given GC logs, read in order.
+    """
+    stats = GcStats()
+    parser = GcLogParser()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for line in read_lines(f):
+                for pause in parser.feed(line):
+                    stats.add(pause)
+    for pause in parser.flush():
+        stats.add(pause)
+    return stats
@@ -0,0 +1,244 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm log timestamp index
+from __future__ import absolute_import
+
+import bisect
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from ccmlib.logsource import log_replaced, read_lines
+
+# distance between two entries of the index
+DEFAULT_INDEX_INTERVAL = 64 * 1024
+# how much of a block is read looking for a line with a timestamp
+_PROBE_SIZE = 16 * 1024
+_INDEX_VERSION = 1
+# how many logs have their TimestampIndex kept, the least recently used ones being dropped
+MAX_INDEXES = 16
+
+# logback and log4j layouts used by Cassandra, e.g.
+# INFO  [main] 2024-01-01 00:00:00,123 CassandraDaemon.java:1 - ...
+_timestamp_re = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}')
+_timestamp_bytes_re = re.compile(_timestamp_re.pattern.encode())
+
+
+def line_timestamp(line):
+    """
+    Returns the timestamp of a log line as a string, or None for lines without
+    one (e.g. stack traces). Timestamps in this format sort like the times they
+    represent.
+    """
+    match = _timestamp_re.search(line[:128])
+    return match.group(0) if match else None
+
+
+def format_timestamp(value):
+    """
+    Converts a datetime to the timestamp format of the logs. Strings are
+    returned unchanged; a prefix such as '2024-01-01 10:00' is valid.
+    """
+    if value is None or not isinstance(value, datetime):
+        return value
+    return value.strftime('%Y-%m-%d %H:%M:%S') + ',{:03d}'.format(value.microsecond // 1000)
+
+
+def time_range(lines, since=None, until=None):
+    """
+    Yields the lines logged at or after since and before until. Lines without
+    a timestamp belong to the previous line.
+    """
+    since = format_timestamp(since)
+    until = format_timestamp(until)
+    current = None
+    for line in lines:
+        current = line_timestamp(line) or current
+        if current is not None and (since is None or current >= since) and (until is None or current < until):
+            yield line
+
+
+class TimestampIndex(object):
+    """
+    Sparse index of a log file mapping byte offsets to timestamps: one entry
+    for the first timestamped line of every block of interval bytes. The index
+    is extended incrementally as the log grows, and persisted next to the log
+    (as .<log name>.tsindex) so that other processes can reuse it.
+    """
+
+    def __init__(self, path, interval=DEFAULT_INDEX_INTERVAL):
+        self.path = path
+        self.index_path = os.path.join(os.path.dirname(path), '.{}.tsindex'.format(os.path.basename(path)))
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._reset(None)
+        self._loaded = False
+
+    def _reset(self, inode):
+        self.inode = inode
+        self.indexed = 0  # offset of the next block to index
+        self.offsets = []
+        self.timestamps = []
+
+    def update(self):
+        """
+        Indexes the part of the log written since the previous update, and saves the index.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                self._reset(None)
+                return self
+            if log_replaced(st, self.inode, self.indexed) or not self._head_matches():
+                # the log was rotated or truncated
+                self._reset(st.st_ino)
+            self.inode = st.st_ino
+            if self._extend(st.st_size):
+                self._save()
+        return self
+
+    def byte_range(self, since=None, until=None):
+        """
+        Returns (start, end) offsets of the part of the log that may contain lines
+        logged at or after since and before until. end is None for the end of the file.
+        """
+        self.update()
+        with self._lock:
+            start, end = 0, None
+            since = format_timestamp(since)
+            until = format_timestamp(until)
+            # lines of different threads may be logged slightly out of order, so keep one entry of slack
+            if since is not None:
+                i = bisect.bisect_left(self.timestamps, since) - 2
+                if i >= 0:
+                    start = self.offsets[i]
+            if until is not None:
+                i = bisect.bisect_left(self.timestamps, until) + 1
+                if i < len(self.offsets):
+                    end = self.offsets[i]
+            return start, end
+
+    def lines(self, since=None, until=None, from_mark=None):
+        """
+        Yields the lines logged at or after since and before until. Lines without
+        a timestamp belong to the previous line.
+        """
+        start, end = self.byte_range(since, until)
+        start = max(start, from_mark or 0)
+        return time_range(self._read(start, end), since, until)
+
+    def _read(self, start, end):
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            for line in read_lines(f, end - start if end is not None else None):
+                yield line
+
+    def _head_matches(self):
+        # a new log may reuse the inode of a deleted one, so check the first entry still holds
+        if not self.offsets:
+            return True
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[0])
+            match = _timestamp_bytes_re.search(f.readline()[:128])
+        return match is not None and match.group(0).decode() == self.timestamps[0]
+
+    def _extend(self, size):
+        changed = False
+        with open(self.path, 'rb') as f:
+            while self.indexed < size:
+                f.seek(self.indexed)
+                data = f.read(_PROBE_SIZE)
+                lines = data.split(b'\n')
+                offset = self.indexed
+                if self.indexed > 0:
+                    # the block most likely starts in the middle of a line
+                    offset += len(lines.pop(0)) + 1
+                found = None
+                for raw in lines[:-1]:  # only complete lines
+                    match = _timestamp_bytes_re.search(raw[:128])
+                    if match:
+                        found = (offset, match.group(0).decode())
+                        break
+                    offset += len(raw) + 1
+                if found is None and self.indexed + len(data) >= size:
+                    # the end of the log is being written, come back later
+                    break
+                if found is not None and (not self.offsets or found[0] > self.offsets[-1]):
+                    self.offsets.append(found[0])
+                    self.timestamps.append(found[1])
+                self.indexed += self.interval
+                changed = True
+        return changed
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return
+        if data.get('version') != _INDEX_VERSION or data.get('interval') != self.interval:
+            return
+        self.inode = data['inode']
+        self.indexed = data['indexed']
+        self.offsets = [o for o, _ in data['entries']]
+        self.timestamps = [t for _, t in data['entries']]
+
+    def _save(self):
+        data = {'version': _INDEX_VERSION,
+                'interval': self.interval,
+                'inode': self.inode,
+                'indexed': self.indexed,
+                'entries': list(zip(self.offsets, self.timestamps))}
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.index_path), prefix=os.path.basename(self.index_path))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.index_path)
+        except (IOError, OSError):
+            # the index is only an optimization, it will be rebuilt next time
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(path, interval=DEFAULT_INDEX_INTERVAL):
+    """
+    Returns the TimestampIndex of the log at path. The indexes of the MAX_INDEXES
+    logs used last are kept.
+    """
+    key = (os.path.abspath(path), interval)
+    with _indexes_lock:
+        index = _indexes.pop(key, None)
+        if index is None:
+            index = TimestampIndex(key[0], interval)
+        _indexes[key] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+        return index
@@ -0,0 +1,116 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm log line matching
+from __future__ import absolute_import
+
+import re
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse  # Python < 3.11
+
+# literals shorter than this reject too few lines to be worth checking first
+_MIN_LITERAL_LENGTH = 3
+_BACKREFERENCE_RE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+def required_literal(pattern):
+    """
+    Returns the longest literal substring every match of the compiled pattern
+    contains, or None if there is no useful one.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    longest = []
+    run = []
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(av)
+        else:
+            run = []
+        if len(run) > len(longest):
+            longest = list(run)
+    if len(longest) < _MIN_LITERAL_LENGTH:
+        return None
+    if isinstance(pattern.pattern, bytes):
+        return bytes(bytearray(longest))
+    return ''.join(chr(c) for c in longest)
+
+
+def _combine(patterns):
+    sources = [p.pattern for p in patterns]
+    if len(patterns) < 2 or len(set(p.flags for p in patterns)) != 1:
+        return None
+    if any(isinstance(s, bytes) or _BACKREFERENCE_RE.search(s) for s in sources):
+        return None
+    try:
+        return re.compile('|'.join('(?:{})'.format(s) for s in sources), patterns[0].flags)
+    except re.error:
+        return None
+
+
+class MultiPatternMatcher(object):
+    """
+    Matches lines against several regular expressions at once. A line is first
+    checked for the literal substrings the expressions require (for instance
+    "is now UP" or "Starting listening"), so that most lines are rejected by a
+    single substring test, and only lines that may match are searched with each
+    regular expression. When some expression has no such literal, one regular
+    expression combining all of them is used as the filter instead.
+    """
+
+    def __init__(self, exprs):
+        self.patterns = [re.compile(e) for e in exprs]
+        literals = [required_literal(p) for p in self.patterns]
+        if self.patterns and all(literal is not None for literal in literals):
+            self._literals = tuple(set(literals))
+            self._combined = None
+        else:
+            self._literals = None
+            self._combined = _combine(self.patterns)
+
+    def may_match(self, line):
+        """
+        Returns False if the line cannot match any of the expressions.
+        """
+        if self._literals is not None:
+            for literal in self._literals:
+                if literal in line:
+                    return True
+            return False
+        if self._combined is not None:
+            return self._combined.search(line) is not None
+        return True
+
+    def search(self, line):
+        """
+        Returns a list of (pattern, match) for every expression found in the line.
+        """
+        if not self.may_match(line):
+            return []
+        found = []
+        for pattern in self.patterns:
+            m = pattern.search(line)
+            if m:
+                found.append((pattern, m))
+        return found
@@ -0,0 +1,151 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm merged view of several logs
+from __future__ import absolute_import
+
+import heapq
+import time
+
+from six.moves import queue
+
+from ccmlib import logtail
+from ccmlib.logindex import line_timestamp
+from ccmlib.logsource import read_raw_lines
+
+# how long live events are held to be ordered with the events of the other logs
+REORDER_WINDOW_IN_SECS = 0.5
+
+
+class _LogEvents(object):
+    # the events (a timestamped line and the lines that follow it, such as a
+    # stack trace) of a log, read lazily, and how far the log was read
+
+    def __init__(self, label, path, complete_only):
+        self.label = label
+        self.path = path
+        self.complete_only = complete_only
+        self.offset = 0
+        self.timestamp = ''
+
+    def __iter__(self):
+        try:
+            f = open(self.path, 'rb')
+        except IOError:
+            return
+        current = []
+        with f:
+            for raw in read_raw_lines(f):
+                line = logtail.decode_line(raw)
+                if not raw.endswith(b'\n'):
+                    # the last line is still being written
+                    if self.complete_only:
+                        break
+                    line += '\n'
+                self.offset += len(raw)
+                event = self._group(current, line)
+                if event is not None:
+                    yield event
+        if current:
+            yield self.timestamp, self.label, current
+
+    def _group(self, current, line):
+        # adds line to the current event, returns the event it completes, if any
+        timestamp = line_timestamp(line)
+        event = None
+        if timestamp is not None and current:
+            event = (self.timestamp, self.label, list(current))
+            del current[:]
+        if timestamp is not None:
+            self.timestamp = timestamp
+        current.append(line)
+        return event
+
+
+class _EventSubscriber(logtail.LogSubscriber):
+    # groups the lines of a followed log into events, and queues them
+
+    def __init__(self, label, timestamp, events):
+        super(_EventSubscriber, self).__init__()
+        self.label = label
+        self.timestamp = timestamp
+        self.events = events
+        self._current = []
+
+    def on_line(self, line):
+        if not line.endswith('\n'):
+            line += '\n'
+        timestamp = line_timestamp(line)
+        if timestamp is not None:
+            self.on_caught_up()
+            self.timestamp = timestamp
+        self._current.append(line)
+
+    def on_caught_up(self):
+        # the lines of an event are written together
+        if self._current:
+            self.events.put((self.timestamp, self.label, self._current, time.time()))
+            self._current = []
+
+
+def merge_logs(sources, follow=False, reorder_window=REORDER_WINDOW_IN_SECS):
+    """
+    Yields (label, line) for every line of the logs in sources, a list of
+    (label, path), merged in timestamp order. Lines without a timestamp (stack
+    traces) stay with the line they follow. The merge is lazy and only holds
+    one event per log in memory, so the first lines come out immediately
+    whatever the size of the logs.
+
+    With follow, the logs are then followed, and what is written to them is
+    yielded as it comes, ordered with what was written to the other logs
+    within reorder_window seconds. Following only ends when the generator is
+    closed.
+    """
+    readers = [_LogEvents(label, path, complete_only=follow) for label, path in sources]
+    for _, label, lines in heapq.merge(*readers, key=lambda event: event[0]):
+        for line in lines:
+            yield label, line
+    if not follow:
+        return
+
+    events = queue.Queue()
+    subscriptions = []
+    try:
+        for reader in readers:
+            tailer = logtail.get_tailer(reader.path)
+            subscriber = _EventSubscriber(reader.label, reader.timestamp, events)
+            tailer.subscribe(subscriber, from_mark=reader.offset)
+            subscriptions.append((tailer, subscriber))
+
+        held = []
+        sequence = 0
+        while True:
+            timeout = max(0, held[0][2] + reorder_window - time.time()) if held else logtail.POLL_INTERVAL_IN_SECS
+            try:
+                timestamp, label, lines, arrival = events.get(timeout=timeout)
+                heapq.heappush(held, (timestamp, sequence, arrival, label, lines))
+                sequence += 1
+            except queue.Empty:
+                pass
+            now = time.time()
+            while held and held[0][2] + reorder_window <= now:
+                _, _, _, label, lines = heapq.heappop(held)
+                for line in lines:
+                    yield label, line
+    finally:
+        for tailer, subscriber in subscriptions:
+            tailer.unsubscribe(subscriber)
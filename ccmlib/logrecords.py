@@ -0,0 +1,244 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm structured log records
+from __future__ import absolute_import
+
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+
+from ccmlib.logindex import format_timestamp
+from ccmlib.logsource import decode_line, log_replaced, read_raw_lines
+
+
+LEVELS = ('TRACE', 'DEBUG', 'INFO', 'WARN', 'ERROR', 'FATAL')
+
+# the logback layout of Cassandra, e.g.
+#   INFO  [main] 2024-01-01 00:00:00,123 CassandraDaemon.java:123 - Starting
+# and the log4j one of older versions, e.g.
+#    INFO [main] 2012-01-01 00:00:00,123 CassandraDaemon.java (line 123) Starting
+# The source is whatever the layout writes after the timestamp: the source file
+# and line (e.g. CassandraDaemon.java:123) with the default layouts, the logger
+# name if the layout uses %logger.
+_record_re = re.compile(r'\s*(?P<level>' + '|'.join(LEVELS) + r')\s+\[(?P<thread>[^\]]*)\]\s+'
+                        r'(?P<timestamp>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}[,.]\d{3})\s+'
+                        r'(?P<source>\S+(?: \(line \d+\))?)(?: -)?(?: (?P<message>.*))?$')
+
+LogRecord = namedtuple('LogRecord', 'offset level timestamp thread source message continuation')
+LogRecord.__doc__ = """
+A log event: the byte offset of its first line in the log, its level, timestamp,
+thread, source and message, and the lines (typically a stack trace) that follow it.
+"""
+
+# how many logs have their LogStore kept, the least recently used ones being dropped
+MAX_STORES = 16
+
+
+def parse_line(line):
+    """
+    Returns (level, timestamp, thread, source, message) for the first line of a
+    log event, or None for other lines (e.g. stack traces).
+    """
+    m = _record_re.match(line)
+    if m is None:
+        return None
+    return m.group('level'), m.group('timestamp'), m.group('thread'), m.group('source'), m.group('message') or ''
+
+
+class _Interned(object):
+    # values stored as ids in a column, with the records having each value
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+        self.records = []
+
+    def add(self, value, record):
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+            self.records.append(array('i'))
+        self.records[i].append(record)
+        return i
+
+
+class LogStore(object):
+    """
+    The records of a log, parsed once and kept in columns: the level, thread and
+    source of each record are stored as ids of interned values, along with the
+    list of records having each of these values, so that filtering on them only
+    visits matching records. Messages are not kept: the byte range of each record
+    is, and the records returned by query() are read back from the log. The store
+    is extended incrementally with what was appended to the log each time it is
+    queried.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._offset = 0  # how far the log was parsed (complete lines only)
+        self.offsets = array('q')
+        self.ends = array('q')  # where each record ends, continuation lines included
+        self.timestamps = []
+        self.levels = array('b')
+        self.threads = array('i')
+        self.sources = array('i')
+        self._levels = _Interned()
+        self._threads = _Interned()
+        self._sources = _Interned()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def update(self):
+        """
+        Parses the records appended to the log since the previous update.
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                self._reset(None)
+                return self
+            if log_replaced(st, self._inode, self._offset):
+                # the log was rotated or truncated
+                self._reset(st.st_ino)
+            self._inode = st.st_ino
+            if st.st_size == self._offset:
+                return self
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                for raw in read_raw_lines(f):
+                    if not raw.endswith(b'\n'):
+                        # still being written
+                        break
+                    end = self._offset + len(raw)
+                    self._add(self._offset, end, decode_line(raw).rstrip('\r\n'))
+                    self._offset = end
+        return self
+
+    def _add(self, offset, end, line):
+        parsed = parse_line(line)
+        if parsed is None:
+            # continuation of the previous record, if any
+            if self.offsets:
+                self.ends[-1] = end
+            return
+        level, timestamp, thread, source, _ = parsed
+        record = len(self.offsets)
+        self.offsets.append(offset)
+        self.ends.append(end)
+        self.timestamps.append(timestamp)
+        self.levels.append(self._levels.add(level, record))
+        self.threads.append(self._threads.add(thread, record))
+        self.sources.append(self._sources.add(source, record))
+
+    def _read(self, f, i):
+        f.seek(self.offsets[i])
+        lines = [decode_line(raw).rstrip('\r') for raw in f.read(self.ends[i] - self.offsets[i]).split(b'\n')]
+        if lines and not lines[-1]:
+            lines.pop()
+        parsed = parse_line(lines[0]) if lines else None
+        return LogRecord(offset=self.offsets[i],
+                         level=self._levels.values[self.levels[i]],
+                         timestamp=self.timestamps[i],
+                         thread=self._threads.values[self.threads[i]],
+                         source=self._sources.values[self.sources[i]],
+                         message=parsed[4] if parsed is not None else '',
+                         continuation=tuple(lines[1:]))
+
+    def query(self, level=None, source_prefix=None, thread=None, since=None, until=None, from_mark=None):
+        """
+        Returns the LogRecords of the log matching all the given criteria:
+        level (a level name, or a list of them), source_prefix (a prefix of the
+        source, e.g. 'CompactionTask' for CompactionTask.java:NN), thread (a
+        thread name), since and until (datetimes or timestamp prefixes; records
+        logged at or after since and before until) and from_mark (records
+        starting at or after this offset in the log).
+        """
+        self.update()
+        with self._lock:
+            candidates = None
+            for interned, wanted in ((self._levels, _as_list(level)), (self._threads, _as_list(thread))):
+                if wanted is not None:
+                    candidates = _intersect(candidates, _union(interned.records[interned.ids[v]]
+                                                               for v in wanted if v in interned.ids))
+            if source_prefix is not None:
+                candidates = _intersect(candidates, _union(records for value, records
+                                                           in zip(self._sources.values, self._sources.records)
+                                                           if value.startswith(source_prefix)))
+            if candidates is None:
+                candidates = range(len(self.offsets))
+
+            since = format_timestamp(since)
+            until = format_timestamp(until)
+            selected = [i for i in candidates
+                        if (from_mark is None or self.offsets[i] >= from_mark)
+                        and (since is None or self.timestamps[i] >= since)
+                        and (until is None or self.timestamps[i] < until)]
+            if not selected:
+                return []
+            with open(self.path, 'rb') as f:
+                return [self._read(f, i) for i in selected]
+
+
+def _as_list(value):
+    if value is None or isinstance(value, (list, tuple, set)):
+        return value
+    return [value]
+
+
+def _union(record_lists):
+    record_lists = list(record_lists)
+    if len(record_lists) == 1:
+        return record_lists[0]
+    return sorted(set().union(*record_lists))
+
+
+def _intersect(candidates, records):
+    if candidates is None:
+        return records
+    records = set(records)
+    return [i for i in candidates if i in records]
+
+
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def get_store(path):
+    """
+    Returns the LogStore of the log at path. The stores of the MAX_STORES logs
+    used last are kept.
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.pop(path, None)
+        if store is None:
+            store = LogStore(path)
+        _stores[path] = store
+        while len(_stores) > MAX_STORES:
+            _stores.popitem(last=False)
+        return store
@@ -0,0 +1,524 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm log scanning
+from __future__ import absolute_import
+
+import concurrent.futures
+import hashlib
+import mmap
+import multiprocessing
+import os
+import re
+from collections import OrderedDict
+
+from ccmlib.logmatch import required_literal, sre_parse
+from ccmlib.logrecords import parse_line
+from ccmlib.logsource import decode_line, log_replaced, read_raw_lines
+from ccmlib.logtail import LogSubscriber, PatternSubscriber
+
+_GREP_CHUNK_SIZE = 4 * 1024 * 1024
+
+# how many files grep_files() searches at once by default
+GREP_WORKERS = 4
+# below this many bytes to search, starting worker processes takes longer than searching
+GREP_PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+_except_re = re.compile(r'[Ee]xception|AssertionError')
+_log_cat_re = re.compile(r'(\W|^)(INFO|DEBUG|WARN|ERROR)\W')
+
+# how many frames of a stack trace identify an error
+FINGERPRINT_FRAMES = 5
+_exception_class_re = re.compile(r'(?:Caused by: )?([\w$.]+(?:Exception|Error|Throwable)[\w$]*)(?::|$)')
+_frame_re = re.compile(r'\s+at ([^(\s]+)')
+# what differs between occurrences of the same error: numbers, addresses and identity hashes
+_variable_re = re.compile(r'0x[0-9a-fA-F]+|@[0-9a-fA-F]+\b|\d+')
+
+
+def log_line_category(line):
+    match = _log_cat_re.search(line)
+    return match.group(2) if match else None
+
+
+_NEWLINE = ord('\n')
+_NEWLINE_CATEGORIES = set(getattr(sre_parse, name) for name in (
+    'CATEGORY_SPACE', 'CATEGORY_NOT_DIGIT', 'CATEGORY_NOT_WORD', 'CATEGORY_LINEBREAK',
+    'CATEGORY_UNI_SPACE', 'CATEGORY_UNI_NOT_DIGIT', 'CATEGORY_UNI_NOT_WORD', 'CATEGORY_UNI_LINEBREAK')
+    if hasattr(sre_parse, name))
+
+
+def _set_has_newline(items):
+    found = False
+    negate = False
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL:
+            found = found or av == _NEWLINE
+        elif op is sre_parse.RANGE:
+            found = found or av[0] <= _NEWLINE <= av[1]
+        elif op is sre_parse.CATEGORY:
+            found = found or av in _NEWLINE_CATEGORIES
+    return found != negate
+
+
+def _subpatterns(av):
+    if isinstance(av, sre_parse.SubPattern):
+        yield av
+    elif isinstance(av, (tuple, list)):
+        for item in av:
+            for subpattern in _subpatterns(item):
+                yield subpattern
+
+
+def _may_match_newline(parsed, dotall):
+    # whether some part of the parsed pattern may match a line terminator
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            if av == _NEWLINE:
+                return True
+        elif op is sre_parse.NOT_LITERAL:
+            if av != _NEWLINE:
+                return True
+        elif op is sre_parse.ANY:
+            if dotall:
+                return True
+        elif op is sre_parse.IN:
+            if _set_has_newline(av):
+                return True
+        elif any(_may_match_newline(subpattern, dotall) for subpattern in _subpatterns(av)):
+            return True
+    return False
+
+
+def _bytes_pattern(pattern):
+    # a bytes version of the pattern finds the same lines as the pattern in
+    # ASCII text, as long as it does not depend on where the text starts and
+    # cannot match the end of a line (searching a chunk, a line is followed
+    # by the next one rather than by the end of the text)
+    source = pattern.pattern
+    if isinstance(source, bytes):
+        return None
+    try:
+        if _may_match_newline(sre_parse.parse(source, pattern.flags), pattern.flags & re.DOTALL):
+            return None
+    except Exception:
+        return None
+    try:
+        encoded = source.encode('ascii')
+    except UnicodeEncodeError:
+        return None
+    if b'\\A' in encoded or b'\\Z' in encoded:
+        return None
+    try:
+        return re.compile(encoded, (pattern.flags & (re.IGNORECASE | re.DOTALL | re.VERBOSE)) | re.MULTILINE)
+    except re.error:
+        return None
+
+
+def grep_file(path, expr, from_mark=None):
+    """
+    Returns a list of (line, match) for the lines of the file matching the
+    regular expression, starting at byte offset from_mark.
+
+    The file is memory-mapped and searched in large chunks with a bytes
+    version of the expression (or for the literal text it requires, in
+    non-ASCII chunks), and only the lines found this way are decoded and
+    matched with the expression itself. Chunks that cannot be searched that
+    way are matched line by line.
+    """
+    pattern = re.compile(expr)
+    matchings = []
+    bytes_pattern = _bytes_pattern(pattern)
+    literal = required_literal(pattern)
+    if literal is not None and not isinstance(literal, bytes):
+        literal = literal.encode('utf-8')
+    if literal is not None and b'\n' in literal:
+        literal = None
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        start = from_mark or 0
+        if start >= size:
+            return matchings
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            def find_pattern(pos, end):
+                m = bytes_pattern.search(mm, pos, end)
+                return m.start() if m else -1
+
+            def find_literal(pos, end):
+                return mm.find(literal, pos, end)
+
+            pos = start
+            if start > 0 and mm[start - 1:start] != b'\n':
+                # from_mark is in the middle of a line, its end is matched as a line of its own
+                pos = mm.find(b'\n', start) + 1 or size
+                _grep_line(pattern, decode_line(mm[start:pos]), matchings)
+            while pos < size:
+                # chunks end at a line end
+                end = min(pos + _GREP_CHUNK_SIZE, size)
+                if end < size:
+                    eol = mm.rfind(b'\n', pos, end)
+                    if eol < 0:
+                        eol = mm.find(b'\n', end)
+                    end = eol + 1 if eol >= 0 else size
+
+                if bytes_pattern is not None and mm[pos:end].isascii():
+                    find = find_pattern
+                elif literal is not None:
+                    find = find_literal
+                else:
+                    find = None
+
+                if find is None:
+                    lines = mm[pos:end].split(b'\n')
+                    last = lines.pop()
+                    for raw in lines:
+                        _grep_line(pattern, decode_line(raw + b'\n'), matchings)
+                    if last:
+                        _grep_line(pattern, decode_line(last), matchings)
+                else:
+                    candidate = find(pos, end)
+                    # an empty match after the last line end is not a line
+                    while 0 <= candidate < end:
+                        line_start = mm.rfind(b'\n', pos, candidate) + 1 or pos
+                        line_end = mm.find(b'\n', candidate, end) + 1 or end
+                        _grep_line(pattern, decode_line(mm[line_start:line_end]), matchings)
+                        candidate = find(line_end, end) if line_end < end else -1
+                pos = end
+        finally:
+            mm.close()
+    return matchings
+
+
+def _grep_task(task):
+    key, path, expr, from_mark = task
+    if not os.path.exists(path):
+        return key, []
+    return key, [line for line, _ in grep_file(path, expr, from_mark=from_mark)]
+
+
+def _grep_size(task):
+    _, path, _, from_mark = task
+    try:
+        return max(0, os.path.getsize(path) - (from_mark or 0))
+    except OSError:
+        return 0
+
+
+def _grep_context():
+    # the workers are not forked from this process, whose tailer and supervisor
+    # threads may hold locks the children would then wait for forever
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def grep_files(tasks, workers=None):
+    """
+    Greps several files concurrently. tasks is a list of (key, path, expr,
+    from_mark); yields (key, matching lines) for each of them as soon as its
+    file has been searched. Missing files have no matching lines.
+
+    The files are searched by a pool of processes (workers, GREP_WORKERS by
+    default), as searching holds the GIL; unless there are less than
+    GREP_PARALLEL_MIN_BYTES to search, which are searched in this process.
+    """
+    tasks = list(tasks)
+    workers = min(len(tasks), workers or GREP_WORKERS)
+    if workers <= 1 or sum(_grep_size(task) for task in tasks) < GREP_PARALLEL_MIN_BYTES:
+        for task in tasks:
+            yield _grep_task(task)
+        return
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=_grep_context())
+    futures = []
+    try:
+        futures.extend(executor.submit(_grep_task, task) for task in tasks)
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _grep_line(pattern, line, matchings):
+    m = pattern.search(line)
+    if m:
+        matchings.append((line, m))
+
+
+class ErrorCollector(object):
+    """
+    Groups ERROR lines, and WARN lines mentioning an exception, with the
+    unidentified lines (stack traces) that follow them. Lines are fed one
+    at a time, without their line terminator.
+    """
+
+    def __init__(self):
+        self._current = None
+        # offset of the first line of the error being collected, when fed with offsets
+        self.offset = None
+
+    def feed(self, line, offset=None):
+        """
+        Returns the error completed by this line, if any. offset is the
+        position of the line in the log, for the offset attribute.
+        """
+        category = log_line_category(line)
+        if category is None:
+            # if a log line can't be identified, assume continuation of an ERROR/WARN exception
+            if self._current is not None:
+                self._current.append(line)
+            return None
+
+        completed = self._current
+        self._current = None
+        if category == 'ERROR' or (category == 'WARN' and _except_re.search(line) is not None):
+            self._current = [line]
+            self.offset = offset
+        return completed
+
+    def in_error(self):
+        """
+        Returns true if an error is being collected, i.e. more lines of its stack trace may follow.
+        """
+        return self._current is not None
+
+    def flush(self):
+        """
+        Returns the error being collected, if any, considering it complete.
+        """
+        completed = self._current
+        self._current = None
+        return completed
+
+    def reset(self):
+        self._current = None
+        self.offset = None
+
+
+def error_fingerprint(error):
+    """
+    Returns the fingerprint of an error (a list of lines): its level, logger,
+    exception classes and top stack frames, or its message when it has no
+    stack trace, with numbers and addresses ignored. Occurrences of the same
+    error have the same fingerprint.
+    """
+    parsed = parse_line(error[0])
+    parts = [parsed[0], parsed[3]] if parsed is not None else []
+    trace = []
+    frames = 0
+    for line in error[1:]:
+        m = _exception_class_re.match(line.strip())
+        if m:
+            trace.append(m.group(1))
+            continue
+        m = _frame_re.match(line)
+        if m and frames < FINGERPRINT_FRAMES:
+            trace.append(m.group(1))
+            frames += 1
+    parts.extend(trace or [parsed[4] if parsed is not None else error[0]])
+    normalized = _variable_re.sub('#', '\n'.join(parts))
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class DistinctError(object):
+    """
+    The occurrences of one error in a log: how many there were, the offsets
+    of the first and last ones (None when unknown) and the lines of the first.
+    """
+
+    def __init__(self, fingerprint, lines, offset):
+        self.fingerprint = fingerprint
+        self.lines = lines
+        self.count = 0
+        self.first_offset = offset
+        self.last_offset = offset
+
+    def __repr__(self):
+        return "{} x {}".format(self.count, self.lines[0])
+
+
+class ErrorDigest(object):
+    """
+    The distinct errors of a log, by fingerprint (see error_fingerprint()),
+    in the order they first occurred. Only the first occurrence of each error
+    is kept, so the digest grows with the number of distinct errors rather
+    than with the size of the log.
+    """
+
+    def __init__(self):
+        self._errors = OrderedDict()
+
+    def add(self, error, offset=None):
+        fingerprint = error_fingerprint(error)
+        distinct = self._errors.get(fingerprint)
+        if distinct is None:
+            distinct = self._errors[fingerprint] = DistinctError(fingerprint, error, offset)
+        distinct.count += 1
+        distinct.last_offset = offset
+        return distinct
+
+    @property
+    def count(self):
+        """
+        The number of errors, counting every occurrence.
+        """
+        return sum(distinct.count for distinct in self._errors.values())
+
+    def __len__(self):
+        return len(self._errors)
+
+    def __iter__(self):
+        return iter(list(self._errors.values()))
+
+    def __getitem__(self, fingerprint):
+        return self._errors[fingerprint]
+
+
+def collect_errors(lines, digest=None):
+    """
+    Returns the errors (lists of lines) found in the given lines, or, given an
+    ErrorDigest, adds them to it and returns it.
+    """
+    collector = ErrorCollector()
+    errors = []
+    add = errors.append if digest is None else digest.add
+    for line in lines:
+        error = collector.feed(line.rstrip('\r\n'))
+        if error:
+            add(error)
+    error = collector.flush()
+    if error:
+        add(error)
+    return errors if digest is None else digest
+
+
+class ErrorScanner(object):
+    """
+    Finds errors in a log file incrementally: every call to scan() only reads
+    the bytes appended since the previous one, in bounded chunks. The offset
+    reached and an error whose stack trace may still be being written are
+    kept between calls.
+    """
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset or 0
+        self._collector = ErrorCollector()
+        self._inode = None
+
+    def scan(self, flush=False, digest=None):
+        """
+        Returns the errors (lists of lines) found since the previous call, or,
+        given an ErrorDigest, adds them to it (with their offsets) and returns it.
+
+        The last error of the log is only returned once a following log line
+        shows it is complete, or when a call finds nothing new in the log (or
+        flush is true). Raises IOError if the log does not exist.
+        """
+        errors = []
+        add = (lambda error, offset: errors.append(error)) if digest is None else digest.add
+        st = os.stat(self.path)
+        if log_replaced(st, self._inode, self.offset):
+            # the log was rotated or truncated, start over with the new file
+            self.offset = 0
+            self._collector.reset()
+        self._inode = st.st_ino
+
+        start = self.offset
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            for raw in read_raw_lines(f):
+                if not raw.endswith(b'\n') and not flush:
+                    # the last line is still being written
+                    break
+                self._feed(raw, add)
+                self.offset += len(raw)
+
+        if flush or self.offset == start:
+            offset = self._collector.offset
+            error = self._collector.flush()
+            if error:
+                add(error, offset)
+        return errors if digest is None else digest
+
+    def _feed(self, raw, add):
+        offset = self._collector.offset
+        error = self._collector.feed(decode_line(raw).rstrip('\r\n'), self.offset)
+        if error:
+            add(error, offset)
+
+
+class NoErrorsPatternSubscriber(PatternSubscriber):
+    """
+    Looks for the given (regular) expressions like PatternSubscriber, but gives
+    up as soon as an error is logged. Each line is matched against the
+    expressions and classified for errors in the same pass.
+    """
+
+    def __init__(self, exprs, timeout=None):
+        super(NoErrorsPatternSubscriber, self).__init__(exprs, timeout)
+        self.errors = []
+        self._collector = ErrorCollector()
+
+    def on_line(self, line):
+        error = self._collector.feed(line.rstrip('\r\n'))
+        if error:
+            self._fail(error)
+        elif not self._collector.in_error():
+            super(NoErrorsPatternSubscriber, self).on_line(line)
+
+    def on_caught_up(self):
+        # the stack trace of an error is written along with it, so once the end
+        # of the log is reached the error is complete
+        error = self._collector.flush()
+        if error:
+            self._fail(error)
+
+    def _fail(self, error):
+        self.errors.append(error)
+        self.finish()
+
+
+class ErrorSubscriber(LogSubscriber):
+    """
+    Collects the errors written to a log and hands them over to report (a
+    callable taking a list of errors), in one batch every time the end of
+    the log is reached.
+    """
+
+    def __init__(self, report):
+        super(ErrorSubscriber, self).__init__()
+        self._report = report
+        self._collector = ErrorCollector()
+        self._errors = []
+
+    def on_line(self, line):
+        error = self._collector.feed(line.rstrip('\r\n'))
+        if error:
+            self._errors.append(error)
+
+    def on_caught_up(self):
+        # the stack trace of an error is written along with it
+        error = self._collector.flush()
+        if error:
+            self._errors.append(error)
+        if self._errors:
+            errors, self._errors = self._errors, []
+            self._report(errors)
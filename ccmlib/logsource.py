@@ -0,0 +1,157 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm log sources, including rotated logs
+from __future__ import absolute_import
+
+import gzip
+import os
+import re
+import zipfile
+
+_READ_CHUNK_SIZE = 1024 * 1024
+# logback rolls system.log into e.g. system.log.1.zip or system.log.2024-01-01.0.zip
+ARCHIVE_SUFFIXES = ('.zip', '.gz')
+_number_re = re.compile(r'(\d+)')
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in _number_re.split(name)]
+
+
+def rotated_logs(path):
+    """
+    Returns the archives the log at path was rotated into, oldest first.
+    """
+    directory, name = os.path.split(path)
+    try:
+        entries = os.listdir(directory or '.')
+    except OSError:
+        return []
+    archives = []
+    for entry in entries:
+        if entry.startswith(name + '.') and entry.endswith(ARCHIVE_SUFFIXES):
+            archive = os.path.join(directory, entry)
+            try:
+                archives.append((os.path.getmtime(archive), _natural_key(entry), archive))
+            except OSError:
+                # removed by logback in the meantime
+                continue
+    return [archive for _, _, archive in sorted(archives)]
+
+
+def decode_line(raw):
+    line = raw.decode('utf-8', 'replace')
+    if line.endswith('\r\n'):
+        line = line[:-2] + '\n'
+    return line
+
+
+def log_replaced(st, inode, offset):
+    """
+    Tells whether a log (given its os.stat() result) is no longer the one that
+    was read up to offset: it was rotated into a new file or truncated. An
+    unknown inode (None) is not taken as a rotation.
+    """
+    return (inode is not None and st.st_ino != inode) or st.st_size < offset
+
+
+def read_raw_lines(f, size=None):
+    """
+    Yields the lines of a binary file object from its current position, with
+    their newline, reading it in chunks and at most size bytes. The last line
+    has no newline if the file does not end with one: incremental readers
+    leave it for the next read.
+    """
+    pending = b''
+    while size is None or size > 0:
+        data = f.read(_READ_CHUNK_SIZE if size is None else min(_READ_CHUNK_SIZE, size))
+        if not data:
+            break
+        if size is not None:
+            size -= len(data)
+        lines = (pending + data).split(b'\n')
+        pending = lines.pop()
+        for raw in lines:
+            yield raw + b'\n'
+    if pending:
+        yield pending
+
+
+def read_lines(f, size=None):
+    """
+    Yields the decoded lines of a binary file object, reading it in chunks.
+    """
+    for raw in read_raw_lines(f, size):
+        yield decode_line(raw)
+
+
+def archive_lines(path):
+    """
+    Yields the lines of a .zip or .gz log archive, decompressing it on the fly.
+    """
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            for line in read_lines(f):
+                yield line
+    else:
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                with archive.open(member) as f:
+                    for line in read_lines(f):
+                        yield line
+
+
+class LogSource(object):
+    """
+    The chronological history of a log: the archives it was rotated into,
+    oldest first, then the live log. Nothing is extracted to disk.
+    """
+
+    def __init__(self, path, include_rotated=True):
+        self.path = path
+        self.include_rotated = include_rotated
+
+    def segments(self):
+        """
+        Returns the paths of the archives and of the live log, in chronological order.
+        """
+        segments = rotated_logs(self.path) if self.include_rotated else []
+        if os.path.exists(self.path):
+            segments.append(self.path)
+        return segments
+
+    def lines(self, from_mark=None):
+        """
+        Yields every line of the log history. from_mark (as returned by
+        Node.mark_log()) only applies to the live log.
+        """
+        for segment in self.segments():
+            if segment != self.path:
+                for line in archive_lines(segment):
+                    yield line
+                continue
+            try:
+                f = open(segment, 'rb')
+            except IOError:
+                # rotated since the segments were listed
+                continue
+            with f:
+                if from_mark:
+                    f.seek(from_mark)
+                for line in read_lines(f):
+                    yield line
@@ -0,0 +1,538 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm log tailing
+from __future__ import absolute_import
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+
+from ccmlib.logmatch import MultiPatternMatcher
+from ccmlib.logsource import decode_line, log_replaced, read_raw_lines
+
+# How long a waiter sleeps between two reads of a log when file-change
+# notifications are not available on this platform.
+POLL_INTERVAL_IN_SECS = 1
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM |
+                  _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+_IN_EVENT_HEADER = struct.Struct('iIII')
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = False
+        if sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                if hasattr(libc, 'inotify_init1') and hasattr(libc, 'inotify_add_watch'):
+                    _libc = libc
+            except OSError:
+                pass
+    return _libc
+
+
+def inotify_available():
+    """
+    Returns true if file-change notifications (inotify) can be used on this host.
+    """
+    return bool(_load_libc())
+
+
+class FileWatcher(object):
+    """
+    Waits for a file to change. This is the portable implementation: it simply
+    sleeps, so callers must re-check the file after every wait.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def wait(self, timeout):
+        """
+        Blocks for at most timeout seconds. Returns True if the file is known to
+        have changed, False if the wait timed out (or changes cannot be detected).
+        """
+        if timeout > 0:
+            time.sleep(timeout)
+        return False
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class InotifyFileWatcher(FileWatcher):
+    """
+    Waits for a file to change using Linux inotify. The parent directory is
+    watched rather than the file itself, so that the creation of the file and
+    its replacement on log rotation are noticed as well.
+    """
+
+    def __init__(self, path):
+        super(InotifyFileWatcher, self).__init__(path)
+        libc = _load_libc()
+        self._name = os.fsencode(os.path.basename(path))
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        directory = os.path.dirname(os.path.abspath(path))
+        self._wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_WATCH_MASK)
+        if self._wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, os.strerror(err))
+
+    def wait(self, timeout):
+        if self._fd is None or self._wd is None:
+            # the directory went away, nothing will ever be notified again
+            return super(InotifyFileWatcher, self).wait(timeout)
+        deadline = time.time() + timeout
+        while True:
+            remaining = max(0, deadline - time.time())
+            try:
+                readable, _, _ = select.select([self._fd], [], [], remaining)
+            except (OSError, select.error) as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            if not readable:
+                return False
+            if self._read_events():
+                return True
+
+    def _read_events(self):
+        changed = False
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return changed
+                raise
+            if not buf:
+                return changed
+            pos = 0
+            while pos + _IN_EVENT_HEADER.size <= len(buf):
+                _, mask, _, length = _IN_EVENT_HEADER.unpack_from(buf, pos)
+                name = buf[pos + _IN_EVENT_HEADER.size:pos + _IN_EVENT_HEADER.size + length].rstrip(b'\0')
+                pos += _IN_EVENT_HEADER.size + length
+                if mask & _IN_IGNORED:
+                    self._wd = None
+                    changed = True
+                elif mask & _IN_Q_OVERFLOW or name == self._name:
+                    changed = True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def create_watcher(path):
+    """
+    Returns the best FileWatcher available for path on this platform, falling
+    back to sleeping when change notifications cannot be set up.
+    """
+    if inotify_available():
+        try:
+            return InotifyFileWatcher(path)
+        except OSError:
+            pass
+    return FileWatcher(path)
+
+
+class LogSubscriber(object):
+    """
+    Receives the lines of a log from a LogTailer. Subclasses implement
+    on_line() and call finish() once they do not need any more lines.
+    """
+
+    def __init__(self, timeout=None, wakeup=None):
+        self.deadline = time.time() + timeout if timeout is not None else None
+        self.expired = False
+        self.error = None
+        # when the subscriber got all it needed
+        self.finished_at = None
+        self._done = threading.Event()
+        # an event shared with other subscribers, to wait for the first of them to be done
+        self._wakeup = wakeup
+        # bytes at the start of the next line(s) that precede the mark the subscriber asked for
+        self._skip = 0
+
+    def on_line(self, line):
+        raise NotImplementedError
+
+    def on_caught_up(self):
+        """
+        Called once every line written to the log so far has been handed over.
+        """
+        pass
+
+    def finish(self):
+        if self.finished_at is None:
+            self.finished_at = time.time()
+        self._done.set()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def is_done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Waits until the subscriber is done. Returns False if timeout expired first.
+        Re-raises any error that happened while reading the log for this subscriber.
+        """
+        done = self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return done
+
+
+class LogCapture(object):
+    """
+    Keeps what a wait needs to explain a timeout, in bounded memory however
+    long it lasts: the first head_size and last tail_size characters read, and
+    the last max_errors ERROR lines.
+    """
+
+    def __init__(self, head_size=50, tail_size=150, max_errors=5):
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.errors = deque(maxlen=max_errors)
+        self._head = []
+        self._head_length = 0
+        self._tail = deque()
+        self._tail_length = 0
+
+    def add(self, line):
+        if self._head_length < self.head_size:
+            self._head.append(line)
+            self._head_length += len(line)
+        self._tail.append(line)
+        self._tail_length += len(line)
+        # only drop lines that are no longer needed for the last tail_size characters
+        while self._tail_length - len(self._tail[0]) >= self.tail_size:
+            self._tail_length -= len(self._tail.popleft())
+        if line.startswith('ERROR'):
+            self.errors.append(line.rstrip('\r\n'))
+
+    def head(self):
+        return ''.join(self._head)[:self.head_size]
+
+    def tail(self):
+        return ''.join(self._tail)[-self.tail_size:]
+
+    def describe(self):
+        """
+        Returns the head, tail and errors of what was read, for error messages.
+        """
+        description = "\n Head: {head}\n Tail: ...{tail}".format(head=self.head(), tail=self.tail())
+        if self.errors:
+            description += "\n Errors:\n  " + "\n  ".join(self.errors)
+        return description
+
+
+class PatternSubscriber(LogSubscriber):
+    """
+    Looks for one match of each of the given (regular) expressions, in any order.
+    What it reads is kept in capture, to report on timeouts.
+    """
+
+    def __init__(self, exprs, timeout=None, wakeup=None):
+        super(PatternSubscriber, self).__init__(timeout, wakeup)
+        self._matcher = MultiPatternMatcher(exprs)
+        self.tofind = list(self._matcher.patterns)
+        self.matchings = []
+        self.capture = LogCapture()
+
+    def on_line(self, line):
+        self.capture.add(line)
+        found = self._matcher.search(line)
+        if found:
+            for e, m in found:
+                self.matchings.append((line, m))
+                self.tofind.remove(e)
+            if len(self.tofind) == 0:
+                self.finish()
+            else:
+                self._matcher = MultiPatternMatcher(self.tofind)
+
+
+class GrepSubscriber(LogSubscriber):
+    """
+    Collects every line matching the regular expression.
+    """
+
+    def __init__(self, expr):
+        super(GrepSubscriber, self).__init__()
+        self._matcher = MultiPatternMatcher([expr])
+        self.pattern = self._matcher.patterns[0]
+        self.matchings = []
+
+    def on_line(self, line):
+        if self._matcher.may_match(line):
+            m = self.pattern.search(line)
+            if m:
+                self.matchings.append((line, m))
+
+
+class LogTailer(object):
+    """
+    Reads one log file on behalf of any number of subscribers, so that each byte
+    appended to the log is read and decoded only once however many threads are
+    watching it. While there are subscribers a daemon thread follows the file,
+    woken by file-change notifications when available; it stops (and closes the
+    file) when the last subscriber is done.
+
+    Offsets are byte offsets in the file, as returned by Node.mark_log().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._file = None
+        self._inode = None
+        # how far the file has been read, and the trailing partial line not dispatched yet
+        self._offset = 0
+        self._pending = b''
+        self._thread = None
+
+    def subscribe(self, subscriber, from_mark=None):
+        """
+        Starts feeding subscriber with the lines of the log from from_mark
+        (the beginning of the file by default) and keeps following the log
+        until the subscriber is done, expired or unsubscribed.
+        """
+        with self._lock:
+            self._start_at(subscriber, from_mark or 0)
+            if subscriber.is_done():
+                if not self._subscribers:
+                    self._close()
+            else:
+                self._subscribers.append(subscriber)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="ccm-tail-{}".format(self.path))
+                    self._thread.daemon = True
+                    self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def catch_up(self):
+        """
+        Hands every complete line written to the log so far over to the
+        subscribers, without waiting for the following thread to do it.
+        """
+        with self._lock:
+            if self._subscribers:
+                self._pump()
+                self._caught_up()
+
+    def _consumed(self):
+        return self._offset - len(self._pending)
+
+    def _start_at(self, subscriber, start):
+        if not self._subscribers:
+            # nobody else is following the file, just move to where this subscriber starts
+            self._close()
+            self._offset = start
+            self._pending = b''
+            self._subscribers.append(subscriber)
+            try:
+                self._pump()
+            finally:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+            return
+        self._pump()
+        if start < self._consumed():
+            self._replay(subscriber, start, self._consumed())
+        else:
+            subscriber._skip = start - self._consumed()
+
+    def _open(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._close()
+            return False
+        if self._file is not None and log_replaced(st, self._inode, self._offset):
+            # the log was rotated or truncated, follow the new file from its start
+            self._close()
+            self._offset = 0
+            self._pending = b''
+        if self._file is None:
+            try:
+                self._file = open(self.path, 'rb')
+            except IOError:
+                return False
+            self._inode = st.st_ino
+            if st.st_size < self._offset:
+                self._offset = 0
+                self._pending = b''
+            self._file.seek(self._offset)
+        return True
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _pump(self, flush=False):
+        if not self._open():
+            return
+        read = False
+        for raw in read_raw_lines(self._file):
+            read = True
+            self._offset += len(raw)
+            if not raw.endswith(b'\n'):
+                # the line is still being written
+                self._pending += raw
+                break
+            raw, self._pending = self._pending + raw, b''
+            self._dispatch(raw)
+        if flush and not read and self._pending:
+            # the last line has not been completed for a while, hand it over as it is
+            raw, self._pending = self._pending, b''
+            self._dispatch(raw)
+
+    def _replay(self, subscriber, start, end):
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            for raw in read_raw_lines(f, end - start):
+                if subscriber.is_done():
+                    return
+                self._deliver(subscriber, raw, None)
+
+    def _dispatch(self, raw):
+        if not self._subscribers:
+            return
+        line = decode_line(raw)
+        for subscriber in list(self._subscribers):
+            self._deliver(subscriber, raw, line)
+            if subscriber.is_done():
+                self._subscribers.remove(subscriber)
+
+    def _deliver(self, subscriber, raw, line):
+        if subscriber._skip:
+            if len(raw) <= subscriber._skip:
+                subscriber._skip -= len(raw)
+                return
+            raw = raw[subscriber._skip:]
+            subscriber._skip = 0
+            line = None
+        try:
+            subscriber.on_line(decode_line(raw) if line is None else line)
+        except Exception as e:
+            subscriber.error = e
+            subscriber.finish()
+
+    def _caught_up(self):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.on_caught_up()
+            except Exception as e:
+                subscriber.error = e
+                subscriber.finish()
+            if subscriber.is_done():
+                self._subscribers.remove(subscriber)
+
+    def _expire(self):
+        now = time.time()
+        for subscriber in list(self._subscribers):
+            if subscriber.deadline is not None and subscriber.deadline < now:
+                subscriber.expired = True
+                subscriber.finish()
+                self._subscribers.remove(subscriber)
+
+    def _next_wait(self):
+        deadlines = [s.deadline for s in self._subscribers if s.deadline is not None]
+        if not deadlines:
+            return POLL_INTERVAL_IN_SECS
+        return max(0, min(POLL_INTERVAL_IN_SECS, min(deadlines) - time.time()))
+
+    def _run(self):
+        with create_watcher(self.path) as watcher:
+            changed = True
+            while True:
+                with self._lock:
+                    try:
+                        self._pump(flush=not changed)
+                        self._caught_up()
+                        self._expire()
+                    except Exception as e:
+                        for subscriber in self._subscribers:
+                            subscriber.error = e
+                            subscriber.finish()
+                        del self._subscribers[:]
+                    if not self._subscribers:
+                        self._close()
+                        self._thread = None
+                        return
+                    wait = self._next_wait()
+                changed = watcher.wait(wait)
+
+
+# the tailers in use: a tailer is forgotten (and its file closed) once nobody
+# refers to it any more, its thread being gone when it has no subscribers
+_tailers = weakref.WeakValueDictionary()
+_tailers_lock = threading.Lock()
+
+
+def get_tailer(path):
+    """
+    Returns the LogTailer shared by everybody reading the log at path.
+    """
+    path = os.path.abspath(path)
+    with _tailers_lock:
+        tailer = _tailers.get(path)
+        if tailer is None:
+            tailer = _tailers[path] = LogTailer(path)
+        return tailer
@@ -31,6 +31,7 @@ import signal
 import stat
 import subprocess
 import sys
+import threading
 import time
 import warnings
 from collections import namedtuple
@@ -40,13 +41,18 @@ from distutils.version import LooseVersion  #pylint: disable=import-error, no-na
 import yaml
 from six import print_, string_types
 
-from ccmlib import common, extension
+from ccmlib import common, compactionlog, extension, gclog, logindex, logrecords, logscan, logsource, logtail, procwatch, startup
 from ccmlib.repository import setup
+from ccmlib.timeline import cluster_timeline
 from six.moves import xrange
 
 logger = logging.getLogger(__name__)
 
 NODE_WAIT_TIMEOUT_IN_SECS = 90
+# how long stop() waits for the Cassandra process to exit
+STOP_WAIT_TIMEOUT_IN_SECS = 127
+# how often wait_for_compactions() runs nodetool while the compaction log shows pending tasks
+COMPACTION_NODETOOL_INTERVAL_IN_SECS = 5
 
 class Status():
     UNINITIALIZED = "UNINITIALIZED"
@@ -62,6 +68,17 @@ class NodeError(Exception):
         self.process = process
 
 
+class StartupError(NodeError):
+    """
+    A node failed to start; node is the node, reason what showed it.
+    """
+
+    def __init__(self, node, reason, process=None):
+        NodeError.__init__(self, "{} failed to start: {}".format(node.name, reason), process)
+        self.node = node
+        self.reason = reason
+
+
 class TimeoutError(Exception):
 
     def __init__(self, data):
@@ -115,6 +132,8 @@ class Node(object):
     Provides interactions to a Cassandra node.
     """
 
+    # how long other nodes are waited for to be marked UP by default
+    ALIVE_WAIT_TIMEOUT_IN_SECS = 120
 
     @staticmethod
     def get_version_from_build(install_dir=None, node_path=None, cassandra=False):
@@ -167,6 +186,8 @@ class Node(object):
         self.name = name
         self.cluster = cluster
         self.status = Status.UNINITIALIZED
+        # guards status and node.conf, as several threads may update them
+        self._state_lock = threading.RLock()
         self.auto_bootstrap = auto_bootstrap
         self.network_interfaces = {'thrift': common.normalize_interface(thrift_interface),
                                    'storage': common.normalize_interface(storage_interface),
@@ -507,42 +528,121 @@ class Node(object):
     def gclogfilename(self):
         return os.path.join(self.log_directory(), 'gc.log.0.current')
 
+    def gc_stats(self):
+        """
+        Returns the gclog.GcStats of this node: pause-time distribution, allocation
+        rate and heap after GC, from its GC logs (current and rotated).
+        """
+        return gclog.parse_gc_logs(gclog.gc_logs(self.log_directory()))
+
     def compactionlogfilename(self):
         return os.path.join(self.log_directory(), 'compaction.log')
 
+    def compaction_history(self):
+        """
+        Returns the compactionlog.CompactionLog of this node, up to date. Its
+        tables attribute maps (keyspace, table) to the compactions, bytes in and
+        out, throughput and pending tasks logged for that table. Only tables with
+        the log_all compaction option are in the compaction log.
+        """
+        return compactionlog.get_compaction_log(self.compactionlogfilename()).update()
+
     def envfilename(self):
         return os.path.join(
             self.get_conf_dir(),
             common.CASSANDRA_WIN_ENV if common.is_win() else common.CASSANDRA_ENV
         )
 
-    def grep_log(self, expr, filename='system.log', from_mark=None):
+    def log_tailer(self, filename='system.log'):
+        """
+        Returns the reader shared by every watcher of the given log of this node.
+        """
+        return logtail.get_tailer(os.path.join(self.log_directory(), filename))
+
+    def log_index(self, filename='system.log'):
+        """
+        Returns the timestamp index of the given log of this node, up to date.
+        """
+        return logindex.get_index(os.path.join(self.log_directory(), filename)).update()
+
+    def log_records(self, level=None, source_prefix=None, thread=None, since=None, until=None,
+                    from_mark=None, filename='system.log'):
+        """
+        Returns the records (logrecords.LogRecord, with level, timestamp, thread,
+        source, message and continuation lines) of the given log of this node
+        matching all the given criteria, e.g. log_records(level='ERROR',
+        source_prefix='ColumnFamilyStore'). The records are indexed once; each
+        call only parses what was logged since the previous one, and reads the
+        messages of the records it returns from the log.
+        """
+        store = logrecords.get_store(os.path.join(self.log_directory(), filename))
+        return store.query(level=level, source_prefix=source_prefix, thread=thread, since=since, until=until,
+                           from_mark=from_mark)
+
+    def grep_log(self, expr, filename='system.log', from_mark=None, since=None, until=None, include_rotated=False):
         """
         Returns a list of lines matching the regular expression in parameter
         in the Cassandra log of this node
+
+        since and until (datetimes, or strings such as '2024-01-01 10:00') restrict
+        the search to the lines logged at or after since and before until; only the
+        part of the log holding them is read, located with the timestamp index.
+
+        With include_rotated, the archives the log was rotated into are searched
+        too, oldest first; from_mark then only applies to the live log.
         """
-        matchings = []
-        pattern = re.compile(expr)
-        with open(os.path.join(self.log_directory(), filename)) as f:
-            if from_mark:
-                f.seek(from_mark)
-            for line in f:
-                m = pattern.search(line)
-                if m:
-                    matchings.append((line, m))
-        return matchings
+        log_file = os.path.join(self.log_directory(), filename)
+        if include_rotated:
+            lines = logsource.LogSource(log_file).lines(from_mark=from_mark)
+            if since is not None or until is not None:
+                lines = logindex.time_range(lines, since, until)
+        elif since is not None or until is not None:
+            lines = self.log_index(filename).lines(since=since, until=until, from_mark=from_mark)
+        else:
+            return logscan.grep_file(log_file, expr, from_mark=from_mark)
+        grep = logtail.GrepSubscriber(expr)
+        for line in lines:
+            grep.on_line(line)
+        return grep.matchings
 
-    def grep_log_for_errors(self, filename='system.log'):
+    def grep_log_for_errors(self, filename='system.log', include_rotated=False):
         """
         Returns a list of errors with stack traces
         in the Cassandra log of this node
         """
-        return self.grep_log_for_errors_from(seek_start=getattr(self, 'error_mark', 0))
+        return self.grep_log_for_errors_from(seek_start=getattr(self, 'error_mark', 0), include_rotated=include_rotated)
+
+    def grep_log_for_errors_from(self, filename='system.log', seek_start=0, include_rotated=False):
+        """
+        With include_rotated, the errors of the archives the log was rotated into
+        are returned too; seek_start then only applies to the live log.
+        """
+        if include_rotated:
+            log_file = os.path.join(self.log_directory(), filename)
+            return logscan.collect_errors(logsource.LogSource(log_file).lines(from_mark=seek_start))
+        return self.log_error_scanner(filename, from_mark=seek_start).scan(flush=True)
 
-    def grep_log_for_errors_from(self, filename='system.log', seek_start=0):
-        with open(os.path.join(self.log_directory(), filename)) as f:
-            f.seek(seek_start)
-            return _grep_log_for_errors(f.read())
+    def log_error_digest(self, filename='system.log', include_rotated=False):
+        """
+        Returns the distinct errors of the Cassandra log of this node (from the
+        mark set by mark_log_for_errors()) as a logscan.ErrorDigest: each error
+        once, with how many times and where it occurred. With include_rotated,
+        the archives the log was rotated into are read too, and the offsets are
+        not known.
+        """
+        seek_start = getattr(self, 'error_mark', 0)
+        if include_rotated:
+            log_file = os.path.join(self.log_directory(), filename)
+            return logscan.collect_errors(logsource.LogSource(log_file).lines(from_mark=seek_start),
+                                          digest=logscan.ErrorDigest())
+        return self.log_error_scanner(filename, from_mark=seek_start).scan(flush=True, digest=logscan.ErrorDigest())
+
+    def log_error_scanner(self, filename='system.log', from_mark=None):
+        """
+        Returns a scanner reporting, on each call to its scan() method, the errors
+        appended to the given log of this node since the previous call.
+        """
+        return logscan.ErrorScanner(os.path.join(self.log_directory(), filename), offset=from_mark)
 
     def mark_log_for_errors(self, filename='system.log'):
         """
@@ -560,9 +660,7 @@ class Node(object):
         log_file = os.path.join(self.log_directory(), filename)
         if not os.path.exists(log_file):
             return 0
-        with open(log_file) as f:
-            f.seek(0, os.SEEK_END)
-            return f.tell()
+        return os.path.getsize(log_file)
 
     def print_process_output(self, name, proc, verbose=False):
         # If stderr_file exists on the process, we opted to
@@ -582,40 +680,47 @@ class Node(object):
     # This will return when exprs are found or it timeouts
     def watch_log_for(self, exprs, from_mark=None, timeout=600,
                       process=None, verbose=False, filename='system.log',
-                      error_on_pid_terminated=False):
+                      error_on_pid_terminated=False, supervisor=None, deadline=None):
         """
         Watch the log until one or more (regular) expressions are found or timeouts (a
         TimeoutError is then raised). On successful completion, a list of pair (line matched,
         match object) is returned.
 
-        Will raise NodeError if error_on_pit_terminated is True and C* pid is not running.
+        Will raise NodeError if error_on_pit_terminated is True and C* pid is not running,
+        and StartupError as soon as the startup.StartupSupervisor given as supervisor sees
+        a node fail to start.
+
+        deadline (a common.Deadline) bounds the wait along with timeout, as do the deadline
+        parameters of the other watch_log_for* methods.
         """
         start = time.time()
+        timeout = common.cap_timeout(timeout, deadline)
         tofind = [exprs] if isinstance(exprs, string_types) else exprs
         tofind = [re.compile(e) for e in tofind]
-        matchings = []
-        reads = ""
         if len(tofind) == 0:
             return None
 
         log_file = os.path.join(self.log_directory(), filename)
         output_read = False
-        while not os.path.exists(log_file):
-            time.sleep(.5)
-            TimeoutError.raise_if_passed(start=start, timeout=timeout, node=self.name,
-                                         msg="Timed out waiting for {} to be created.".format(log_file))
-
-            if process and not output_read:
-                process.poll()
-                if process.returncode is not None:
-                    self.print_process_output(self.name, process, verbose)
-                    output_read = True
-                    if process.returncode != 0:
-                        raise RuntimeError()  # Shouldn't reuse RuntimeError but I'm lazy
-
-        with open(log_file) as f:
-            if from_mark:
-                f.seek(from_mark)
+        subscriber = logtail.PatternSubscriber(tofind, timeout=timeout)
+        if supervisor is not None:
+            supervisor.watch(subscriber)
+        tailer = self.log_tailer(filename)
+        tailer.subscribe(subscriber, from_mark=from_mark)
+        try:
+            while not os.path.exists(log_file):
+                if subscriber.wait(.5):
+                    break
+                TimeoutError.raise_if_passed(start=start, timeout=timeout, node=self.name,
+                                             msg="Timed out waiting for {} to be created.".format(log_file))
+
+                if process and not output_read:
+                    process.poll()
+                    if process.returncode is not None:
+                        self.print_process_output(self.name, process, verbose)
+                        output_read = True
+                        if process.returncode != 0:
+                            raise RuntimeError()  # Shouldn't reuse RuntimeError but I'm lazy
 
             while True:
                 # First, if we have a process to check, then check it.
@@ -629,45 +734,43 @@ class Node(object):
                             if process.returncode != 0:
                                 raise RuntimeError()  # Shouldn't reuse RuntimeError but I'm lazy
 
-                line = f.readline()
-                if line:
-                    reads = reads + line
-                    for e in tofind:
-                        m = e.search(line)
-                        if m:
-                            matchings.append((line, m))
-                            tofind.remove(e)
-                            if len(tofind) == 0:
-                                return matchings[0] if isinstance(exprs, string_types) else matchings
-                else:
-                    # wait for the situation to clarify, either stop or just a pause in log production
-                    time.sleep(1)
-
-                    if error_on_pid_terminated:
-                        self.raise_node_error_if_cassandra_process_is_terminated()
-
-                    TimeoutError.raise_if_passed(start=start, timeout=timeout, node=self.name,
-                                                 msg="Missing: {exprs} not found in {f}:\n Head: {head}\n Tail: {tail}"
-                                                 .format(
-                                                     exprs=[e.pattern for e in tofind], f=filename,
-                                                     head=reads[:50], tail="..."+reads[len(reads)-150:]))
-
-                    # Checking "process" is tricky, as it may be itself terminated e.g. after "verbose"
-                    # or if there is some race condition between log checking and start process finish
-                    # so if the "error_on_pid_terminated" is requested we will give it a chance
-                    # and will not check parent process termination
-                    if process and not error_on_pid_terminated:
-                        if common.is_win():
-                            if not self.is_running():
-                                return None
-                        else:
-                            process.poll()
-                            if process.returncode == 0:
-                                common.debug("{pid} or its child process terminated. watch_for_logs() for {l} will not continue.".format(
-                                    pid=process.pid, l=[e.pattern for e in tofind]))
-                                return None
-
-    def watch_log_for_no_errors(self, exprs, from_mark=None, timeout=600, process=None, verbose=False, filename='system.log'):
+                # the shared tailer wakes us up as soon as the log is appended to when
+                # change notifications are available, otherwise wait for the situation to
+                # clarify, either stop or just a pause in log production
+                if subscriber.wait(logtail.POLL_INTERVAL_IN_SECS) and not subscriber.expired:
+                    matchings = subscriber.matchings
+                    return matchings[0] if isinstance(exprs, string_types) else matchings
+
+                if error_on_pid_terminated:
+                    self.raise_node_error_if_cassandra_process_is_terminated()
+
+                if subscriber.expired:
+                    raise TimeoutError.create(start=start, timeout=timeout, node=self.name,
+                                              msg="Missing: {exprs} not found in {f}:{capture}".format(
+                                                  exprs=[e.pattern for e in subscriber.tofind], f=filename,
+                                                  capture=subscriber.capture.describe()))
+
+                # Checking "process" is tricky, as it may be itself terminated e.g. after "verbose"
+                # or if there is some race condition between log checking and start process finish
+                # so if the "error_on_pid_terminated" is requested we will give it a chance
+                # and will not check parent process termination
+                if process and not error_on_pid_terminated:
+                    if common.is_win():
+                        if not self.is_running():
+                            return None
+                    else:
+                        process.poll()
+                        if process.returncode == 0:
+                            common.debug("{pid} or its child process terminated. watch_for_logs() for {l} will not continue.".format(
+                                pid=process.pid, l=[e.pattern for e in subscriber.tofind]))
+                            return None
+        finally:
+            tailer.unsubscribe(subscriber)
+            if supervisor is not None:
+                supervisor.unwatch(subscriber)
+
+    def watch_log_for_no_errors(self, exprs, from_mark=None, timeout=600, process=None, verbose=False, filename='system.log',
+                                deadline=None):
         """
         Watch the log until one or more (regular) expressions are found or timeouts (a
         TimeoutError is then raised). On successful completion, a list of pair (line matched,
@@ -677,31 +780,30 @@ class Node(object):
         log contain an error; this assertion will contain the errors found in the log.
         """
         start = time.time()
+        timeout = common.cap_timeout(timeout, deadline)
         tofind = [exprs] if isinstance(exprs, string_types) else exprs
-        tofind = [re.compile(e) for e in tofind]
-        seek_start=0
-        if from_mark:
-            seek_start = from_mark
-        while True:
-            TimeoutError.raise_if_passed(start=start, timeout=timeout, node=self.name,
-                                         msg="Missing: {exprs} not found in {f}".format(
-                                             exprs=[e.pattern for e in tofind], f=filename))
-            try:
-                # process is bin/cassandra so choosing to ignore this argument to avoid early termination
-                return self.watch_log_for(tofind, from_mark=from_mark, timeout=5, verbose=verbose, filename=filename)
-            except TimeoutError:
-                logger.debug("waited 5s watching for '{}' but was not found; checking for errors".format(tofind))
-                # since the api doesn't return the mark read it isn't thread safe to use mark
-                # as the length of the file can change between calls which may mean we skip over
-                # errors; to avoid this keep reading the whole file over and over again...
-                # unless a explicit mark is given to the method, will read from that offset
-                errors = self.grep_log_for_errors_from(filename=filename, seek_start=seek_start)
-                if errors:
-                    msg = "Errors were found in the logs while watching for '{}'; attempting to fail the test".format(tofind)
-                    logger.debug(msg)
-                    raise AssertionError("{}:\n".format(msg) + '\n\n'.join(['\n'.join(msg) for msg in errors]))
-
-    def watch_log_for_death(self, nodes, from_mark=None, timeout=600, filename='system.log'):
+        # every new line is both matched against the expressions and checked for errors
+        subscriber = logscan.NoErrorsPatternSubscriber(tofind, timeout=timeout)
+        tailer = self.log_tailer(filename)
+        tailer.subscribe(subscriber, from_mark=from_mark)
+        try:
+            subscriber.wait(timeout + logtail.POLL_INTERVAL_IN_SECS)
+        finally:
+            tailer.unsubscribe(subscriber)
+
+        if subscriber.errors:
+            msg = "Errors were found in the logs while watching for '{}'; attempting to fail the test".format(
+                [e.pattern for e in subscriber.tofind])
+            logger.debug(msg)
+            raise AssertionError("{}:\n".format(msg) + '\n\n'.join(['\n'.join(msg) for msg in subscriber.errors]))
+        if subscriber.expired or not subscriber.is_done():
+            raise TimeoutError.create(start=start, timeout=timeout, node=self.name,
+                                      msg="Missing: {exprs} not found in {f}:{capture}".format(
+                                          exprs=[e.pattern for e in subscriber.tofind], f=filename,
+                                          capture=subscriber.capture.describe()))
+        return subscriber.matchings
+
+    def watch_log_for_death(self, nodes, from_mark=None, timeout=600, filename='system.log', deadline=None):
         """
         Watch the log of this node until it detects that the provided other
         nodes are marked dead. This method returns nothing but throw a
@@ -713,16 +815,24 @@ class Node(object):
         """
         tofind = nodes if isinstance(nodes, list) else [nodes]
         tofind = ["%s is now [dead|DOWN]" % node.address_for_version(self.get_cassandra_version()) for node in tofind]
-        self.watch_log_for(tofind, from_mark=from_mark, timeout=timeout, filename=filename)
+        self.watch_log_for(tofind, from_mark=from_mark, timeout=timeout, filename=filename, deadline=deadline)
 
-    def watch_log_for_alive(self, nodes, from_mark=None, timeout=120, filename='system.log'):
+    def watch_log_for_alive(self, nodes, from_mark=None, timeout=None, filename='system.log', deadline=None):
         """
         Watch the log of this node until it detects that the provided other
         nodes are marked UP. This method works similarly to watch_log_for_death.
         """
+        if timeout is None:
+            timeout = self.ALIVE_WAIT_TIMEOUT_IN_SECS
         tofind = nodes if isinstance(nodes, list) else [nodes]
-        tofind = ["%s.* is now UP" % node.address_for_version(self.get_cassandra_version()) for node in tofind]
-        self.watch_log_for(tofind, from_mark=from_mark, timeout=timeout, filename=filename)
+        self.watch_log_for(self.alive_exprs(tofind), from_mark=from_mark, timeout=timeout, filename=filename,
+                           deadline=deadline)
+
+    def alive_exprs(self, nodes):
+        """
+        Returns the expressions matching the lines logged by this node when it marks the provided nodes UP.
+        """
+        return ["%s.* is now UP" % node.address_for_version(self.get_cassandra_version()) for node in nodes]
 
     def raise_node_error_if_cassandra_process_is_terminated(self):
         if not self._is_pid_running():
@@ -742,13 +852,27 @@ class Node(object):
         """
         timeout = kwargs.get('timeout', NODE_WAIT_TIMEOUT_IN_SECS)
         kwargs['timeout'] = timeout
+        # the timeline.Timeline of the start waiting, if any
+        timeline = kwargs.pop('timeline', None)
 
         if self.pid:
             kwargs['error_on_pid_terminated'] = True
 
         if self.cluster.version() >= '1.2':
             self.watch_log_for("Starting listening for CQL clients", **kwargs)
+            if timeline is not None:
+                timeline.record(self, 'listening')
+
+        self.wait_for_binary_socket(timeout=common.cap_timeout(timeout, kwargs.get('deadline')))
+        if timeline is not None:
+            timeline.record(self, 'binary')
 
+    def wait_for_binary_socket(self, timeout=NODE_WAIT_TIMEOUT_IN_SECS):
+        """
+        Waits for the Binary CQL interface to be listening, without checking the log.
+
+        Emits a warning if not listening after given timeout in seconds.
+        """
         binary_itf = self.network_interfaces['binary']
         if not common.check_socket_listening(binary_itf, timeout=timeout):
             warnings.warn("Binary interface %s:%s is not listening after %s seconds, node may have failed to start."
@@ -769,6 +893,7 @@ class Node(object):
         self.watch_log_for("Listening for thrift clients...", **kwargs)
 
         thrift_itf = self.network_interfaces['thrift']
+        timeout = common.cap_timeout(timeout, kwargs.get('deadline'))
         if not common.check_socket_listening(thrift_itf, timeout=timeout):
             warnings.warn(
                 "Thrift interface {}:{} is not listening after {} seconds, node may have failed to start.".format(
@@ -799,7 +924,10 @@ class Node(object):
               quiet_start=False,
               allow_root=False,
               set_migration_task=True,
-              jvm_version=None):
+              jvm_version=None,
+              supervisor=None,
+              deadline=None,
+              timeline=None):
         """
         Start the node. Options includes:
           - join_ring: if false, start the node with -Dcassandra.join_ring=False
@@ -809,7 +937,15 @@ class Node(object):
             have marked this node UP. if an integer, sets the timeout for how long to wait
           - replace_token: start the node with the -Dcassandra.replace_token option.
           - replace_address: start the node with the -Dcassandra.replace_address option.
-        """
+          - supervisor: the startup.StartupSupervisor watching the nodes started along with
+            this one. By default the node gets its own, so that waiting for it to start
+            fails as soon as it shows it will not start; with no_wait, it gets none.
+          - deadline: a common.Deadline (or a number of seconds) bounding all the waits
+            of the start together, on top of their own timeouts.
+          - timeline: the timeline.Timeline recording the phases of the start. By default
+            the start is recorded as a run of its own in the timeline of the cluster.
+        """
+        deadline = common.Deadline.of(deadline)
         if jvm_args is None:
             jvm_args = []
 
@@ -837,6 +973,11 @@ class Node(object):
 
         self.mark = self.mark_log()
 
+        own_timeline = timeline is None
+        if own_timeline:
+            timeline = cluster_timeline(self.cluster, 'node')
+        timeline.record(self, 'start')
+
         launch_bin = self.get_launch_bin()
 
         # If Windows, change entries in .bat file to split conf from binaries
@@ -860,6 +1001,7 @@ class Node(object):
         env = self.get_env()
 
         extension.append_to_server_env(self, env)
+        timeline.record(self, 'config')
 
         if common.is_win():
             self._clean_win_jmx()
@@ -905,6 +1047,7 @@ class Node(object):
         # (e.g. the host's JAVA_HOME points to Java 11, but the node's software is only for Java 8)
         for k in 'JAVA_HOME', 'PATH':
             self.__environment_variables[k] = env[k]
+        timeline.record(self, 'java')
 
         common.info("Starting {} with JAVA_HOME={} java_version={} cassandra_version={}, install_dir={}"
                     .format(self.name, env['JAVA_HOME'], common.get_jdk_version_int(env=env),
@@ -933,7 +1076,33 @@ class Node(object):
             process = subprocess.Popen(args, env=env, stdout=stdout_sink, stderr=stderr_sink)
 
         process.stderr_file = stderr_sink
+        timeline.record(self, 'exec')
 
+        # nobody waits for a node started with no_wait to fail
+        own_supervisor = supervisor is None and not no_wait
+        if own_supervisor:
+            supervisor = startup.StartupSupervisor()
+        try:
+            if supervisor is not None:
+                supervisor.supervise(self, process, from_mark=self.mark,
+                                     output_files=[stdout_sink.name, stderr_sink.name])
+            self._wait_for_start(process, supervisor, deadline, timeline, verbose, update_pid, wait_other_notice, marks,
+                                 wait_for_binary_proto)
+        except Exception as e:
+            timeline.record(self, 'failed', error=str(e))
+            raise
+        finally:
+            if own_supervisor:
+                supervisor.close()
+
+        if own_timeline:
+            timeline.record(self, 'ready')
+        return process
+
+    def _wait_for_start(self, process, supervisor, deadline, timeline, verbose, update_pid, wait_other_notice, marks,
+                        wait_for_binary_proto):
+        # the waits of start(), which fail as soon as supervisor sees a node fail to start
+        # and are all bounded by deadline
         if verbose:
             common.debug("verbose mode: waiting for the start process out/err (and termination)")
             stdout, stderr = process.communicate()
@@ -949,35 +1118,43 @@ class Node(object):
 
         if update_pid or wait_for_binary_proto:
             # at this moment we should have PID and it should be running...
-            if not self._wait_for_running(process, timeout_s=7):
+            if not self._wait_for_running(process, timeout_s=common.cap_timeout(7, deadline)):
+                if supervisor is not None:
+                    supervisor.check()
+                if deadline is not None and deadline.expired():
+                    raise TimeoutError.create(start=deadline.start, timeout=deadline.timeout, node=self.name,
+                                              msg="the start deadline expired before the process was running")
                 raise NodeError("Node {n} is not running".format(n=self.name), process)
+            timeline.record(self, 'pid')
 
         # if requested wait for other nodes to observe this one (via gossip)
-        if common.is_int_not_bool(wait_other_notice):
-            for node, mark in marks:
-                node.watch_log_for_alive(self, from_mark=mark, timeout=wait_other_notice)
-        elif wait_other_notice:
-            for node, mark in marks:
-                node.watch_log_for_alive(self, from_mark=mark)
+        if wait_other_notice and marks:
+            if common.is_int_not_bool(wait_other_notice):
+                timeout = wait_other_notice
+            else:
+                timeout = max(node.ALIVE_WAIT_TIMEOUT_IN_SECS for node, _ in marks)
+            self.cluster.watch_logs_for(dict((node, node.alive_exprs([self])) for node, _ in marks),
+                                        from_marks=dict(marks), timeout=timeout, supervisor=supervisor,
+                                        deadline=deadline)
+            timeline.record(self, 'gossip')
 
         # if requested wait for binary protocol to start
         if common.is_int_not_bool(wait_for_binary_proto):
-            self.wait_for_binary_interface(from_mark=self.mark, timeout=wait_for_binary_proto)
+            self.wait_for_binary_interface(from_mark=self.mark, timeout=wait_for_binary_proto, supervisor=supervisor,
+                                           deadline=deadline, timeline=timeline)
         elif wait_for_binary_proto:
-            self.wait_for_binary_interface(from_mark=self.mark)
-
-        return process
+            self.wait_for_binary_interface(from_mark=self.mark, supervisor=supervisor, deadline=deadline,
+                                           timeline=timeline)
 
     def _wait_for_running(self, process, timeout_s):
-        deadline = time.time() + timeout_s
-        while time.time() < deadline:
-            if self.is_running():
-                return True
-            time.sleep(0.5)
+        if self.is_running():
+            return True
+        # the launcher writes the pidfile once the JVM is forked, which is then checked once
+        if procwatch.wait_for_file(os.path.join(self.get_path(), 'cassandra.pid'), timeout_s):
             self._update_pid(process)
         return self.is_running()
 
-    def stop(self, wait=True, wait_other_notice=False, signal_event=signal.SIGTERM, **kwargs):
+    def stop(self, wait=True, wait_other_notice=False, signal_event=signal.SIGTERM, deadline=None, **kwargs):
         """
         Stop the node.
           - wait: if True (the default), wait for the Cassandra process to be
@@ -986,11 +1163,15 @@ class Node(object):
             cluster have marked this node has dead.
           - signal_event: Signal event to send to Cassandra; default is to
             let Cassandra clean up and shut down properly (SIGTERM [15])
+          - deadline: a common.Deadline (or a number of seconds) bounding all
+            the waits of the stop together.
           - Optional:
              + gently: Let Cassandra clean up and shut down properly; unless
                        false perform a 'kill -9' which shuts down faster.
         """
+        deadline = common.Deadline.of(deadline)
         if self.is_running():
+            pid = self.pid
             if wait_other_notice:
                 marks = [(node, node.mark_log()) for node in list(self.cluster.nodes.values()) if node.is_live() and node is not self]
 
@@ -1019,27 +1200,20 @@ class Node(object):
                 if 'gently' in kwargs and kwargs['gently'] is False:
                     signal_event = signal.SIGKILL
 
-                os.kill(self.pid, signal_event)
+                os.kill(pid, signal_event)
 
             if wait_other_notice:
                 for node, mark in marks:
-                    node.watch_log_for_death(self, from_mark=mark)
-            else:
+                    node.watch_log_for_death(self, from_mark=mark, deadline=deadline)
+            elif not wait:
                 time.sleep(.1)
 
-            still_running = self.is_running()
-            if still_running and wait:
-                wait_time_sec = 1
-                for i in xrange(0, 7):
-                    # we'll double the wait time each try and cassandra should
-                    # not take more than 1 minute to shutdown
-                    time.sleep(wait_time_sec)
-                    if not self.is_running():
-                        return True
-                    wait_time_sec = wait_time_sec * 2
-                raise NodeError("Problem stopping node %s" % self.name)
-            else:
-                return True
+            if wait:
+                # returns as soon as the process exits, rather than at the next of a series of checks
+                procwatch.wait_for_exit(pid, common.cap_timeout(STOP_WAIT_TIMEOUT_IN_SECS, deadline))
+                if self.is_running():
+                    raise NodeError("Problem stopping node %s" % self.name)
+            return True
         else:
             return False
 
@@ -1049,11 +1223,26 @@ class Node(object):
         """
         pattern = re.compile("pending tasks:? +0")
         start = time.time()
-        while time.time() - start < timeout:
-            output, err, rc = self.nodetool("compactionstats")
-            if pattern.search(output):
-                return
-            time.sleep(1)
+        last_nodetool = None
+        # nodetool launches a JVM: it is run every second while the compaction log shows no
+        # pending tasks (it only covers the tables with log_all), and only every few seconds
+        # while it does, in case its pending counts are stale
+        with logtail.create_watcher(self.compactionlogfilename()) as watcher:
+            while time.time() - start < timeout:
+                logged_pending = self.compaction_history().pending_tasks()
+                interval = COMPACTION_NODETOOL_INTERVAL_IN_SECS if logged_pending else 1
+                if last_nodetool is None or time.time() - last_nodetool >= interval:
+                    last_nodetool = time.time()
+                    output, err, rc = self.nodetool("compactionstats")
+                    if pattern.search(output):
+                        return
+                    continue
+                wait_s = max(0, min(last_nodetool + interval, start + timeout) - time.time())
+                if logged_pending:
+                    # woken up as soon as compactions are logged, in case none are pending any more
+                    watcher.wait(wait_s)
+                else:
+                    time.sleep(wait_s)
         raise TimeoutError.create(start=start, timeout=timeout,
                                   msg="Compactions did not finish in {} seconds".format(timeout),
                                   node=self.name)
@@ -1755,8 +1944,9 @@ class Node(object):
             values['data_center'] = self.data_center
         if self.workloads is not None:
             values['workloads'] = self.workloads
-        with open(filename, 'w') as f:
-            yaml.safe_dump(values, f)
+        with self._state_lock:
+            with open(filename, 'w') as f:
+                yaml.safe_dump(values, f)
 
     def _update_yaml(self):
         conf_file = self.get_conf_file()
@@ -2029,25 +2219,27 @@ class Node(object):
             return True
 
     def __update_status(self):
-        if self.pid is None:
-            if self.status in [Status.UP, Status.DECOMMISSIONED]:
-                self.status = Status.DOWN
-            return
+        # nodes started concurrently check each other's status
+        with self._state_lock:
+            if self.pid is None:
+                if self.status in [Status.UP, Status.DECOMMISSIONED]:
+                    self.status = Status.DOWN
+                return
 
-        old_status = self.status
+            old_status = self.status
 
-        pid_alive = self._is_pid_running()
-        if pid_alive:
-            if self.status in [Status.DOWN, Status.UNINITIALIZED]:
-                self.status = Status.UP
-        else:
-            if self.status in [Status.UP, Status.DECOMMISSIONED]:
-                self.status = Status.DOWN
+            pid_alive = self._is_pid_running()
+            if pid_alive:
+                if self.status in [Status.DOWN, Status.UNINITIALIZED]:
+                    self.status = Status.UP
+            else:
+                if self.status in [Status.UP, Status.DECOMMISSIONED]:
+                    self.status = Status.DOWN
 
-        if not old_status == self.status:
-            if old_status == Status.UP and self.status == Status.DOWN:
-                self.pid = None
-            self._update_config()
+            if not old_status == self.status:
+                if old_status == Status.UP and self.status == Status.DOWN:
+                    self.pid = None
+                self._update_config()
 
     def _find_pid_on_windows(self):
         found = False
@@ -2148,13 +2340,8 @@ class Node(object):
         """
         pidfile = os.path.join(self.get_path(), 'cassandra.pid')
 
-        start = time.time()
-        while not (os.path.isfile(pidfile) and os.stat(pidfile).st_size > 0):
-            if (time.time() - start > 30.0):
-                common.error("Timed out waiting for pidfile to be filled (current time is {}, file exists {})".format(datetime.now(), os.path.isfile(pidfile)))
-                break
-            else:
-                time.sleep(0.1)
+        if not procwatch.wait_for_file(pidfile, 30.0):
+            common.error("Timed out waiting for pidfile to be filled (current time is {}, file exists {})".format(datetime.now(), os.path.isfile(pidfile)))
 
         try:
             with open(pidfile, 'rb') as f:
@@ -2338,40 +2525,7 @@ def _get_load_from_info_output(info):
 
 
 def _grep_log_for_errors(log):
-    except_re = re.compile(r'[Ee]xception|AssertionError')
-    log_cat_re = re.compile(r'(\W|^)(INFO|DEBUG|WARN|ERROR)\W')
-
-    def log_line_category(line):
-        match = log_cat_re.search(line)
-        return match.group(2) if match else None
-
-    matches = []
-
-    loglines = log.splitlines()
-
-    for line_num, line in enumerate(loglines):
-        found_exception = False
-        line_category = log_line_category(line)
-        if line_category == 'ERROR':
-            matches.append([line])
-            found_exception = True
-
-        elif line_category == 'WARN':
-            match = except_re.search(line)
-            if match is not None:
-                matches.append([line])
-                found_exception = True
-
-        if found_exception:
-            for next_line_num in range(line_num + 1, len(loglines)):
-                next_line = loglines[next_line_num]
-                # if a log line can't be identified, assume continuation of an ERROR/WARN exception
-                if log_line_category(next_line) is None:
-                    matches[-1].append(next_line)
-                else:
-                    break
-
-    return matches
+    return logscan.collect_errors(log.splitlines())
 
 
 def handle_external_tool_process(process, cmd_args):
@@ -0,0 +1,119 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm process start and exit notification
+from __future__ import absolute_import
+
+import errno
+import os
+import select
+import time
+
+import psutil
+
+from ccmlib import logtail
+
+# the longest sleep between two checks of a process or file when notifications are not available
+MAX_POLL_INTERVAL_IN_SECS = 0.1
+
+
+def wait_for_file(path, timeout):
+    """
+    Waits for the file at path, like a pidfile, to be written. Returns True once
+    it has some content, or False if timeout expired first. Where inotify is
+    available the wait ends as soon as the file is written, otherwise the file
+    is checked every MAX_POLL_INTERVAL_IN_SECS.
+    """
+    end = time.time() + timeout
+    # the watcher is set up before the first check, so that no write goes unnoticed
+    with logtail.create_watcher(path) as watcher:
+        notified = isinstance(watcher, logtail.InotifyFileWatcher)
+        while not _has_content(path):
+            remaining = end - time.time()
+            if remaining <= 0:
+                return False
+            watcher.wait(remaining if notified else min(remaining, MAX_POLL_INTERVAL_IN_SECS))
+    return True
+
+
+def _has_content(path):
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
+
+def pidfd_available():
+    return hasattr(os, 'pidfd_open') and hasattr(select, 'poll')
+
+
+def wait_for_exit(pid, timeout=None):
+    """
+    Waits for process pid, which needs not be a child of ours, to exit. Returns
+    True once it has (a zombie has exited), or False if timeout expired first.
+    On Linux 5.3+ the kernel tells us as soon as the process exits through a
+    pidfd; elsewhere the process is checked with short, growing intervals.
+    """
+    fd = _pidfd_open(pid)
+    if fd is None:
+        return _poll_for_exit(pid, timeout)
+    if fd is False:
+        return True
+    try:
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        while True:
+            try:
+                # a pidfd is readable once its process has exited
+                return len(poller.poll(None if timeout is None else max(0, int(timeout * 1000)))) > 0
+            except (IOError, OSError) as e:
+                if e.errno != errno.EINTR:
+                    raise
+    finally:
+        os.close(fd)
+
+
+def _pidfd_open(pid):
+    # returns the pidfd of pid, False if there is no such process or None if pidfds are not available
+    if not pidfd_available():
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError as e:
+        if e.errno == errno.ESRCH:
+            return False
+        # e.g. a kernel older than 5.3, or a seccomp policy forbidding the call
+        return None
+
+
+def _poll_for_exit(pid, timeout):
+    end = time.time() + timeout if timeout is not None else None
+    interval = 0.01
+    while is_alive(pid):
+        remaining = end - time.time() if end is not None else interval
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, MAX_POLL_INTERVAL_IN_SECS)
+    return True
+
+
+def is_alive(pid):
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
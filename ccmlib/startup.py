@@ -0,0 +1,288 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm node startup supervision and scheduling
+from __future__ import absolute_import
+
+import os
+import threading
+
+from ccmlib import common, logtail, procwatch
+from ccmlib.logmatch import MultiPatternMatcher
+
+# how often the processes of the starting nodes are checked
+PROCESS_POLL_INTERVAL_IN_SECS = 0.25
+
+# lines showing a node will not start, in its log or in the output of its launcher; a port
+# in use only counts in the forms Cassandra and the JVM report it with at startup, as
+# "Address already in use" also shows up in the stack traces of errors a node survives
+FATAL_STARTUP_EXPRS = [
+    r'^\s*ERROR .*Exception encountered during startup',
+    r'^Exception \(\S+\) encountered during startup',
+    r'Fatal configuration error',
+    r'Fatal exception during initialization',
+    r'^\s*ERROR .*Unable to bind',
+    r'Failed to bind port \d+ on',
+    r'^Error: Exception thrown by the agent : .*Port already in use',
+    r'Error: Could not find or load main class',
+    r'Error occurred during initialization of VM',
+    r'Could not create the Java Virtual Machine',
+    r'Exception in thread "main"',
+]
+
+
+class _FatalLineSubscriber(logtail.LogSubscriber):
+    # fails the startup on the first fatal line of a log
+
+    def __init__(self, supervisor, node, source):
+        super(_FatalLineSubscriber, self).__init__()
+        self.supervisor = supervisor
+        self.node = node
+        self.source = source
+        self._matcher = MultiPatternMatcher(supervisor.fatal_exprs)
+
+    def on_line(self, line):
+        if self._matcher.search(line):
+            self.supervisor.fail(self.node, "{} in {}".format(line.strip(), self.source))
+            self.finish()
+
+
+class StartupSupervisor(object):
+    """
+    Watches starting nodes for signs they will not start: a fatal line in
+    their system.log or in the output of their launcher (the startup-*-stdout
+    and stderr logs), the launcher exiting with an error, or the JVM exiting.
+    The waits of the startup register their log subscribers with watch(): on
+    the first failure, those still waiting are finished with a node.StartupError
+    as their error, so that every pending wait raises it at once rather than
+    timing out.
+    """
+
+    def __init__(self, fatal_exprs=None):
+        self.fatal_exprs = fatal_exprs or FATAL_STARTUP_EXPRS
+        self.failure = None
+        self._lock = threading.Lock()
+        self._waits = []
+        self._subscriptions = []
+        self._processes = []  # (node, launcher process)
+        self._closed = threading.Event()
+        self._thread = None
+
+    def supervise(self, node, process=None, from_mark=None, output_files=()):
+        """
+        Starts watching a node started by process, whose system.log is read
+        from from_mark and whose launcher writes to output_files.
+        """
+        self._subscribe(node, node.log_tailer(), from_mark, 'system.log')
+        for path in output_files:
+            # the output of each start goes to new files, no need to share their tailers
+            self._subscribe(node, logtail.LogTailer(path), 0, os.path.basename(path))
+        with self._lock:
+            self._processes.append((node, process))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ccm-startup-supervisor")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _subscribe(self, node, tailer, from_mark, source):
+        subscriber = _FatalLineSubscriber(self, node, source)
+        tailer.subscribe(subscriber, from_mark=from_mark)
+        with self._lock:
+            self._subscriptions.append((tailer, subscriber))
+
+    def watch(self, subscriber):
+        """
+        Makes subscriber fail as soon as a node fails to start.
+        """
+        with self._lock:
+            if self.failure is None:
+                self._waits.append(subscriber)
+                return subscriber
+        self._abort(subscriber)
+        return subscriber
+
+    def unwatch(self, subscriber):
+        with self._lock:
+            if subscriber in self._waits:
+                self._waits.remove(subscriber)
+
+    def fail(self, node, reason):
+        with self._lock:
+            if self.failure is not None:
+                return
+            # imported here as the node module uses this one
+            from ccmlib.node import StartupError
+            process = next((p for n, p in self._processes if n is node), None)
+            self.failure = StartupError(node, reason, process)
+            waits, self._waits = self._waits, []
+        common.debug(str(self.failure))
+        for subscriber in waits:
+            self._abort(subscriber)
+
+    def _abort(self, subscriber):
+        if subscriber.is_done():
+            return
+        subscriber.error = self.failure
+        subscriber.finish()
+
+    def check(self):
+        """
+        Raises the StartupError of the first node that failed to start, if any.
+        """
+        if self.failure is not None:
+            raise self.failure
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+            self._waits = []
+        for tailer, subscriber in subscriptions:
+            tailer.unsubscribe(subscriber)
+
+    def _run(self):
+        pids = {}
+        while not self._closed.wait(PROCESS_POLL_INTERVAL_IN_SECS) and self.failure is None:
+            with self._lock:
+                processes = list(self._processes)
+            for node, process in processes:
+                if process is not None and process.poll() is not None and process.returncode != 0:
+                    self.fail(node, "launcher exited with status {}{}".format(process.returncode,
+                                                                               _last_output_line(process)))
+                    break
+                if common.is_win():
+                    continue
+                pid = pids.get(node) or _read_pid(node)
+                if pid is not None:
+                    pids[node] = pid
+                    if not procwatch.is_alive(pid):
+                        self.fail(node, "Cassandra process {} exited{}".format(pid, _last_output_line(process)))
+                        break
+
+
+def _read_pid(node):
+    # the pidfile of the previous run was deleted before starting
+    try:
+        with open(os.path.join(node.get_path(), 'cassandra.pid')) as f:
+            return int(f.readline().strip())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _last_output_line(process):
+    stderr_file = getattr(process, 'stderr_file', None)
+    if stderr_file is None:
+        return ''
+    try:
+        with open(stderr_file.name, 'rb') as f:
+            lines = [line.strip() for line in f.read().decode('utf-8', 'replace').splitlines() if line.strip()]
+    except (IOError, OSError):
+        return ''
+    return ": {}".format(lines[-1]) if lines else ''
+
+
+class StartScheduler(object):
+    """
+    Runs the starts of several nodes concurrently, each in its own thread. A start
+    is a pipeline that reports the phases it goes through ('launched', 'running'...)
+    to the progress function it is given, so that other starts can wait for a node
+    to reach a phase before they begin. At most max_concurrent_starts starts (all
+    of them by default) are between their beginning and slot_phase at a time: the
+    rest of a start, e.g. waiting for its node to listen, does not hold a slot.
+    Starts begin in the order they were added, as soon as what they wait for is
+    reached and a slot is free.
+    """
+
+    def __init__(self, max_concurrent_starts=None, slot_phase=None):
+        self.max_concurrent_starts = max_concurrent_starts
+        self.slot_phase = slot_phase
+        self._condition = threading.Condition()
+        self._starts = []  # (node, pipeline, after)
+        self._phases = {}
+        self._slots = set()
+        self._done = set()
+        self._results = {}
+        self._error = None
+
+    def add(self, node, pipeline, after=()):
+        """
+        Adds the start of node, pipeline(progress), to begin once every (other
+        node, phase) of after is reached. A node whose start is over has reached
+        all its phases, and nodes not started by the scheduler are not waited for.
+        """
+        self._starts.append((node, pipeline, list(after)))
+        self._phases[node] = set()
+
+    def run(self):
+        """
+        Runs the starts and returns the result of each pipeline by node. If one
+        fails, no other start begins and the first error is raised once the
+        starts in progress are over.
+        """
+        pending = list(self._starts)
+        started = 0
+        with self._condition:
+            while pending and self._error is None:
+                ready = None
+                if self.max_concurrent_starts is None or len(self._slots) < self.max_concurrent_starts:
+                    ready = next((start for start in pending if self._can_begin(start)), None)
+                if ready is None:
+                    if started == len(self._done):
+                        raise ValueError("The start of {} waits for phases no start will reach"
+                                         .format(", ".join(node.name for node, _, _ in pending)))
+                    self._condition.wait()
+                    continue
+                pending.remove(ready)
+                node, pipeline, _ = ready
+                self._slots.add(node)
+                thread = threading.Thread(target=self._run_one, args=(node, pipeline),
+                                          name="ccm-start-{}".format(node.name))
+                thread.daemon = True
+                thread.start()
+                started += 1
+            while len(self._done) < started:
+                self._condition.wait()
+        if self._error is not None:
+            raise self._error
+        return self._results
+
+    def _can_begin(self, start):
+        _, _, after = start
+        return all(other not in self._phases or other in self._done or phase in self._phases[other]
+                   for other, phase in after)
+
+    def _run_one(self, node, pipeline):
+        def progress(phase):
+            with self._condition:
+                self._phases[node].add(phase)
+                if phase == self.slot_phase:
+                    self._slots.discard(node)
+                self._condition.notify_all()
+
+        try:
+            result = pipeline(progress)
+            with self._condition:
+                self._results[node] = result
+        except BaseException as e:
+            with self._condition:
+                if self._error is None:
+                    self._error = e
+        finally:
+            with self._condition:
+                self._done.add(node)
+                self._slots.discard(node)
+                self._condition.notify_all()
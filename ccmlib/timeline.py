@@ -0,0 +1,224 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# ccm startup timelines
+from __future__ import absolute_import
+
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from ccmlib import common
+
+TIMELINE_FILENAME = 'timeline.jsonl'
+
+# the phases of the start of a node, in order, after 'start':
+#   config: launch script and environment (cassandra.in.sh, JDK detection) ready
+#   java: the JDK to run the node with chosen
+#   exec: launcher started
+#   pid: pid of the JVM known
+#   listening: listening for clients logged
+#   gossip: seen UP by the other nodes
+#   binary: binary (CQL) port accepting connections
+#   ready: start over
+# a start that fails records 'failed' instead of 'ready'
+PHASES = ['config', 'java', 'exec', 'pid', 'listening', 'gossip', 'binary', 'ready']
+
+PERCENTILES = [50, 90, 99]
+
+# how many runs the timeline file keeps, the oldest ones being dropped when a run begins
+MAX_RUNS = 100
+
+# serializes the writes to timeline files, runs in the same process sharing the file of their cluster
+_file_lock = threading.Lock()
+
+
+class Timeline(object):
+    """
+    Records the phases of one start of nodes (a run) as JSON lines appended to
+    the timeline file of the cluster: each event has the run id, the time, the
+    name of the node (None for the whole run) and the phase reached. The file
+    keeps the events of the last MAX_RUNS runs.
+    """
+
+    def __init__(self, path, kind, version=None):
+        self.path = path
+        self.run = uuid.uuid4().hex[:12]
+        with _file_lock:
+            _keep_last_runs(path, MAX_RUNS - 1)
+        self.record(None, 'start', kind=kind, version=str(version) if version is not None else None)
+
+    def record(self, node, phase, at=None, **details):
+        """
+        Records that node reached phase, at the given time (now by default).
+        """
+        event = {'run': self.run, 'time': at if at is not None else time.time(),
+                 'node': getattr(node, 'name', node), 'phase': phase}
+        event.update(details)
+        line = json.dumps(event, sort_keys=True) + '\n'
+        with _file_lock:
+            try:
+                with open(self.path, 'a') as f:
+                    f.write(line)
+            except (IOError, OSError) as e:
+                # a start must not fail because of its timeline
+                common.debug("Could not record {} in {}: {}".format(phase, self.path, e))
+
+
+def _keep_last_runs(path, count):
+    # rewrites the timeline file at path without the events of its oldest runs if it has more than count
+    lines = OrderedDict()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    lines.setdefault(json.loads(line)['run'], []).append(line)
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except (IOError, OSError):
+        return
+    if len(lines) <= count:
+        return
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path))
+        with os.fdopen(fd, 'w') as f:
+            for run_lines in list(lines.values())[len(lines) - count:]:
+                f.writelines(run_lines)
+        os.replace(tmp, path)
+    except (IOError, OSError) as e:
+        common.debug("Could not drop the oldest runs of {}: {}".format(path, e))
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def cluster_timeline(cluster, kind):
+    """
+    Returns a new Timeline for a start of kind ('cluster' or 'node') of nodes of cluster.
+    """
+    return Timeline(os.path.join(cluster.get_path(), TIMELINE_FILENAME), kind, cluster.cassandra_version())
+
+
+def load_events(path):
+    """
+    Returns the events of the timeline file at path, skipping lines that cannot be parsed.
+    """
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path) as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def runs(events):
+    """
+    Groups events by run, in the order of the runs.
+    """
+    by_run = OrderedDict()
+    for event in events:
+        by_run.setdefault(event['run'], []).append(event)
+    return by_run
+
+
+def node_phases(run_events):
+    """
+    Returns an OrderedDict of node name (None for the whole run) to an OrderedDict
+    of the phases it reached to their time in seconds since the start of the run.
+    """
+    start = min(event['time'] for event in run_events)
+    phases = OrderedDict()
+    for event in run_events:
+        # a phase may be recorded both by a node and by the cluster starting it, the first one counts
+        phases.setdefault(event['node'], OrderedDict()).setdefault(event['phase'], event['time'] - start)
+    return phases
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(p / 100.0 * len(values))) - 1))]
+
+
+def phase_durations(events):
+    """
+    Returns an OrderedDict of (version, phase) to the times, in seconds since the
+    start of their node, at which the nodes of every run reached phase.
+    """
+    durations = {}
+    for run_events in runs(events).values():
+        version = next((event.get('version') for event in run_events if event['node'] is None
+                        and event['phase'] == 'start'), None)
+        for node, phases in node_phases(run_events).items():
+            if node is None or 'start' not in phases:
+                continue
+            for phase, offset in phases.items():
+                if phase != 'start':
+                    durations.setdefault((version, phase), []).append(offset - phases['start'])
+    order = dict((phase, i) for i, phase in enumerate(PHASES))
+    return OrderedDict(sorted(durations.items(),
+                              key=lambda item: (str(item[0][0]), order.get(item[0][1], len(order)), item[0][1])))
+
+
+def format_waterfall(run_events, width=50):
+    """
+    Returns the lines of a waterfall of a run: for each node, when it reached
+    each phase and a bar from its start to its last phase.
+    """
+    phases = node_phases(run_events)
+    total = max(max(offsets.values()) for offsets in phases.values()) or 1
+    run_start = phases.get(None, {})
+    header = next((event for event in run_events if event['node'] is None and event['phase'] == 'start'), {})
+    lines = ["Run {} ({} start, Cassandra {}) at {}, {:.1f}s".format(
+        run_events[0]['run'], header.get('kind', '?'), header.get('version', '?'),
+        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run_events[0]['time'])), total)]
+    names = [name for name in phases if name is not None]
+    name_width = max([len(name) for name in names] + [len('cluster')])
+    columns = ['start'] + PHASES
+    lines.append(' '.join([''.ljust(name_width)] + [phase.rjust(9) for phase in columns]))
+    for name in names:
+        offsets = phases[name]
+        begin, end = offsets.get('start', 0), max(offsets.values())
+        bar = ' ' * int(begin / total * width) + '=' * max(1, int((end - begin) / total * width))
+        lines.append(' '.join([name.ljust(name_width)] +
+                              [('{:.2f}'.format(offsets[phase]) if phase in offsets else '-').rjust(9)
+                               for phase in columns] + ['|' + bar.ljust(width) + '|']))
+    cluster_phases = ["{} {:.2f}".format(phase, offset) for phase, offset in run_start.items() if phase != 'start']
+    if cluster_phases:
+        lines.append("{}: {}".format('cluster'.ljust(name_width), ", ".join(cluster_phases)))
+    return lines
+
+
+def format_percentiles(events):
+    """
+    Returns the lines of a table of the percentiles, across runs, of the time the
+    nodes took to reach each phase, by Cassandra version.
+    """
+    lines = [' '.join(['version'.ljust(12), 'phase'.ljust(10), 'count'.rjust(6)] +
+                      ['p{}'.format(p).rjust(8) for p in PERCENTILES] + ['max'.rjust(8)])]
+    for (version, phase), values in phase_durations(events).items():
+        lines.append(' '.join([str(version).ljust(12), phase.ljust(10), str(len(values)).rjust(6)] +
+                              ['{:.2f}'.format(percentile(values, p)).rjust(8) for p in PERCENTILES] +
+                              ['{:.2f}'.format(max(values)).rjust(8)]))
+    return lines
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of log line matching: times scanning a synthetic system.log
+for the "is now UP" patterns watch_log_for_alive uses on an N-node cluster,
+searching every pattern on every line versus using
+ccmlib.logmatch.MultiPatternMatcher.
+
+    python misc/log_matcher_benchmark.py [size_in_mb] [node_count]
+"""
+
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ccmlib.logmatch import MultiPatternMatcher  # pylint: disable=wrong-import-position
+
+LINES = [
+    "INFO  [CompactionExecutor:{n}] 2024-01-01 00:00:00,{n:03d} CompactionTask.java:241 - Compacted (4a5b) 4 sstables to [/tmp/data/ks/t-1/nb-{n}-big,] to level=0.  1.2MiB to 1.1MiB (~92% of original) in 1,234ms.\n",
+    "DEBUG [ReadStage-{n}] 2024-01-01 00:00:00,{n:03d} ReadCallback.java:100 - Read {n} rows from 3 replicas for keyspace ks\n",
+    "INFO  [MemtableFlushWriter:{n}] 2024-01-01 00:00:00,{n:03d} Flushing.java:153 - Writing Memtable-t@{n}(1.001MiB serialized bytes, 10000 ops, 0%/0% of on/off-heap limit), flushed range = (min(-9223372036854775808), max(9223372036854775807)]\n",
+    "WARN  [GossipTasks:1] 2024-01-01 00:00:00,{n:03d} FailureDetector.java:319 - Not marking nodes down due to local pause of {n}ms > 5000000000ns\n",
+]
+UP_LINE = "INFO  [GossipStage:1] 2024-01-01 00:00:00,000 Gossiper.java:1343 - InetAddress /127.0.0.{n}:7000 is now UP\n"
+
+
+def write_log(path, size):
+    written = 0
+    rand = random.Random(42)
+    with open(path, 'w') as f:
+        while written < size:
+            chunk = ''.join(rand.choice(LINES).format(n=rand.randint(1, 999)) for _ in range(10000))
+            chunk += UP_LINE.format(n=rand.randint(1, 254))
+            f.write(chunk)
+            written += len(chunk)
+
+
+def scan_naive(path, patterns):
+    found = 0
+    with open(path) as f:
+        for line in f:
+            for pattern in patterns:
+                if pattern.search(line):
+                    found += 1
+    return found
+
+
+def scan_matcher(path, patterns):
+    matcher = MultiPatternMatcher(patterns)
+    found = 0
+    with open(path) as f:
+        for line in f:
+            found += len(matcher.search(line))
+    return found
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    node_count = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    patterns = [re.compile("127.0.0.{}:7000.* is now UP".format(i)) for i in range(2, node_count + 2)]
+    fd, path = tempfile.mkstemp(suffix='-system.log')
+    os.close(fd)
+    try:
+        write_log(path, size_mb * 1024 * 1024)
+        scan_naive(path, patterns[:1])  # warm the page cache
+        for name, scan in [('regex per pattern', scan_naive), ('MultiPatternMatcher', scan_matcher)]:
+            start = time.time()
+            found = scan(path, patterns)
+            elapsed = time.time() - start
+            print("{:<20} {:>4} patterns, {} MiB: {:7.2f}s ({:6.1f} MiB/s), {} matches".format(
+                name, len(patterns), size_mb, elapsed, size_mb / elapsed, found))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
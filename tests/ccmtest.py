@@ -18,6 +18,8 @@
 import os
 from unittest import TestCase
 
+from ccmlib import logscan, logtail
+
 try:
     FileNotFoundError
 except NameError:
@@ -47,3 +49,41 @@ class Tester(TestCase):
                 self.cluster.remove()
                 if os.path.exists(test_path):
                     os.remove(test_path)
+
+
+class FakeNode(object):
+    """
+    The part of Node used to watch, grep and supervise its logs, for a node
+    named name whose directory is created in path.
+    """
+
+    def __init__(self, name, path, version='4.0'):
+        self.name = name
+        self.pid = None
+        self.version = version
+        self.path = os.path.join(path, name)
+        os.makedirs(os.path.join(self.path, 'logs'))
+        self.log_file = os.path.join(self.path, 'logs', 'system.log')
+        open(self.log_file, 'w').close()
+
+    def get_path(self):
+        return self.path
+
+    def log_directory(self):
+        return os.path.join(self.path, 'logs')
+
+    def logfilename(self):
+        return self.log_file
+
+    def log_tailer(self, filename='system.log'):
+        return logtail.get_tailer(os.path.join(self.log_directory(), filename))
+
+    def grep_log(self, expr, filename='system.log', from_mark=None):
+        return logscan.grep_file(os.path.join(self.log_directory(), filename), expr, from_mark=from_mark)
+
+    def get_cassandra_version(self):
+        return self.version
+
+    def write(self, content, filename='system.log'):
+        with open(os.path.join(self.log_directory(), filename), 'a') as f:
+            f.write(content)
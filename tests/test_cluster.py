@@ -0,0 +1,446 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import signal
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from distutils.version import LooseVersion #pylint: disable=import-error, no-name-in-module
+
+from mock import patch
+
+from ccmlib import common, extension, logscan, logtail
+from ccmlib.cluster import Cluster, StopResult
+from ccmlib.node import Node, NodeError, StartupError, TimeoutError
+from . import ccmtest
+
+
+class TestWatchLogsFor(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestWatchLogsFor, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.nodes = [ccmtest.FakeNode('node{}'.format(i), self.temp_dir.name) for i in range(1, 4)]
+        # the method only relies on the nodes it is given
+        self.log_cluster = Cluster.__new__(Cluster)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestWatchLogsFor, self).tearDown()
+
+    def test_waits_for_all_nodes_concurrently(self):
+        node1, node2, node3 = self.nodes
+        node1.write('INFO old line /127.0.0.2 is now UP\n')
+        marks = {node1: os.path.getsize(node1.log_file)}
+
+        def log():
+            for node, other in [(node3, node1), (node2, node1), (node1, node2), (node3, node2)]:
+                time.sleep(.1)
+                node.write('INFO  Node /{} is now UP\n'.format(other.name))
+            node1.write('INFO  Node /node3 is now UP\n')
+            node2.write('INFO  Node /node3 is now UP\n')
+
+        threading.Thread(target=log).start()
+        start = time.time()
+        found = self.log_cluster.watch_logs_for(dict((node, ['/{}.* is now UP'.format(other.name)
+                                                         for other in self.nodes if other is not node])
+                                                 for node in self.nodes),
+                                            from_marks=marks, timeout=10)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(sorted(line for line, _ in found[node1]),
+                         ['INFO  Node /node2 is now UP\n', 'INFO  Node /node3 is now UP\n'])
+        self.assertEqual(len(found[node3]), 2)
+
+    def test_on_found(self):
+        node1, node2, _ = self.nodes
+        threading.Timer(.5, node2.write, args=['INFO  Starting listening for CQL clients\n']).start()
+        node1.write('INFO  Starting listening for CQL clients\n')
+        found_at = {}
+        start = time.time()
+        self.log_cluster.watch_logs_for({node1: ['Starting listening'], node2: ['Starting listening']}, timeout=10,
+                                        on_found=found_at.__setitem__)
+        # each node when its own expressions were found
+        self.assertLess(found_at[node1] - start, .4)
+        self.assertGreaterEqual(found_at[node2] - start, .5)
+
+    def test_reports_what_is_missing(self):
+        node1, node2, _ = self.nodes
+        node1.write('INFO  Starting listening for CQL clients\n')
+        with self.assertRaises(TimeoutError) as cm:
+            self.log_cluster.watch_logs_for({node1: ['Starting listening'], node2: ['Starting listening']}, timeout=1)
+        self.assertIn("node2: ['Starting listening']", str(cm.exception))
+        self.assertNotIn('node1', str(cm.exception))
+
+    def test_reports_what_was_read(self):
+        node1, _, _ = self.nodes
+        node1.write('INFO  first line\nERROR [main] something broke\nINFO  last line\n')
+        with self.assertRaises(TimeoutError) as cm:
+            self.log_cluster.watch_logs_for({node1: ['Starting listening']}, timeout=0.5)
+        self.assertIn('Head: INFO  first line', str(cm.exception))
+        self.assertIn('INFO  last line', str(cm.exception))
+        self.assertIn('ERROR [main] something broke', str(cm.exception))
+
+    def test_deadline(self):
+        node1, node2, _ = self.nodes
+        deadline = common.Deadline(1)
+        start = time.time()
+        # the waits share the deadline instead of each getting their own timeout
+        for node in (node1, node2):
+            with self.assertRaises(TimeoutError):
+                self.log_cluster.watch_logs_for({node: ['Starting listening']}, timeout=60, deadline=deadline)
+        self.assertLess(time.time() - start, 1 + 2 * logtail.POLL_INTERVAL_IN_SECS)
+
+
+class _ListeningNode(object):
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+
+    def wait_for_binary_socket(self, timeout):
+        time.sleep(self.delay)
+
+
+class _RecordingTimeline(object):
+
+    def __init__(self):
+        self.events = []
+
+    def record(self, node, phase, at=None):
+        self.events.append((node.name, phase, time.time()))
+
+
+class TestWaitForBinarySockets(ccmtest.Tester):
+
+    def test_each_node_is_recorded_when_listening(self):
+        nodes = [_ListeningNode('node1', .6), _ListeningNode('node2', .2), _ListeningNode('node3', .4)]
+        timeline = _RecordingTimeline()
+        start = time.time()
+        Cluster.__new__(Cluster)._wait_for_binary_sockets(nodes, None, timeline)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual([(name, phase) for name, phase, _ in timeline.events],
+                         [('node2', 'binary'), ('node3', 'binary'), ('node1', 'binary')])
+        self.assertLess(timeline.events[0][2] - start, .4)
+
+
+class TestActivelyWatchLogsForError(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestActivelyWatchLogsForError, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_cluster = Cluster.__new__(Cluster)
+        self.log_cluster.nodes = OrderedDict((name, ccmtest.FakeNode(name, self.temp_dir.name)) for name in ['node1', 'node2'])
+        self.reports = []
+        self.reported = threading.Event()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestActivelyWatchLogsForError, self).tearDown()
+
+    def _on_error(self, errordata):
+        self.reports.append(errordata)
+        self.reported.set()
+
+    def test_reports_errors_as_they_are_logged(self):
+        node1, node2 = self.log_cluster.nodelist()
+        tailers = [node1.log_tailer(), node2.log_tailer()]
+        node1.write('ERROR [main] already there\n')
+        watcher = self.log_cluster.actively_watch_logs_for_error(self._on_error, interval=10)
+        try:
+            self.assertTrue(self.reported.wait(5))
+            self.assertEqual(self.reports, [OrderedDict([('node1', [['ERROR [main] already there']])])])
+
+            self.reported.clear()
+            start = time.time()
+            node2.write('ERROR [main] failure\njava.lang.RuntimeException: boom\nINFO  [main] fine\n')
+            self.assertTrue(self.reported.wait(5))
+            # reported long before the next pass of a polling watcher
+            self.assertLess(time.time() - start, 2)
+            self.assertEqual(self.reports[-1], OrderedDict([('node2', [['ERROR [main] failure',
+                                                                        'java.lang.RuntimeException: boom']])]))
+        finally:
+            node1.write('ERROR [main] just before joining\n')
+            watcher.join(5)
+        self.assertFalse(watcher.is_alive())
+        self.assertEqual(self.reports[-1], OrderedDict([('node1', [['ERROR [main] just before joining']])]))
+        for tailer in tailers:
+            self.assertEqual(tailer._subscribers, [])
+
+    def test_removed_nodes_are_no_longer_watched(self):
+        node1, node2 = self.log_cluster.nodelist()
+        tailer1, tailer2 = node1.log_tailer(), node2.log_tailer()
+        watcher = self.log_cluster.actively_watch_logs_for_error(self._on_error, interval=0.05)
+        try:
+            deadline = time.time() + 5
+            while len(tailer2._subscribers) != 1 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(tailer2._subscribers), 1)
+            del self.log_cluster.nodes['node2']
+            while tailer2._subscribers and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(tailer2._subscribers, [])
+            self.assertEqual(len(tailer1._subscribers), 1)
+        finally:
+            watcher.join(5)
+
+
+class TestWaitForAnyLog(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestWaitForAnyLog, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_cluster = Cluster.__new__(Cluster)
+        self.log_cluster.nodes = OrderedDict([('node1', ccmtest.FakeNode('node1', self.temp_dir.name, version='3.11')),
+                                              ('node2', ccmtest.FakeNode('node2', self.temp_dir.name))])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestWaitForAnyLog, self).tearDown()
+
+    def test_wait_for_any_log(self):
+        node1, node2 = self.log_cluster.nodelist()
+        node1.write('INFO  Compacted 1 sstables\n')
+        marks = {node1: os.path.getsize(node1.log_file)}
+        threading.Timer(.2, node2.write, args=['INFO  Compacted 2 sstables\n']).start()
+        self.assertIs(self.log_cluster.wait_for_any_log('Compacted', 5, marks=marks), node2)
+        self.assertIs(self.log_cluster.wait_for_any_log('Compacted', 5), node1)
+
+    def test_wait_for_any_log_deadline(self):
+        start = time.time()
+        with self.assertRaises(common.TimeoutError):
+            self.log_cluster.wait_for_any_log('never logged', 1)
+        self.assertLess(time.time() - start, 3)
+
+    def test_timed_grep_nodes_for_patterns(self):
+        node1, node2 = self.log_cluster.nodelist()
+        patterns = common.LogPatternToVersion({'4.0': 'new message'}, default_pattern='old message')
+        node1.write('INFO  new message\n')
+        threading.Timer(.2, node2.write, args=['INFO  new message\nINFO  new message again\n']).start()
+        found = self.log_cluster.timed_grep_nodes_for_patterns(patterns, 5)
+        self.assertIs(found.node, node2)
+        self.assertEqual([line for line, _ in found.matchings], ['INFO  new message\n', 'INFO  new message again\n'])
+        with self.assertRaises(TimeoutError):
+            self.log_cluster.timed_grep_nodes_for_patterns(common.LogPatternToVersion({}, 'missing'), 1)
+
+
+class TestGrepLogs(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestGrepLogs, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_cluster = Cluster.__new__(Cluster)
+        self.log_cluster.nodes = OrderedDict((name, ccmtest.FakeNode(name, self.temp_dir.name))
+                                             for name in ('node1', 'node2', 'node3'))
+        for i, node in enumerate(self.log_cluster.nodes.values()):
+            node.write('INFO  old compaction\nINFO  nothing\n')
+            node.write('DEBUG compaction {}\n'.format(i), 'debug.log')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestGrepLogs, self).tearDown()
+
+    def test_grep_logs(self):
+        nodes = self.log_cluster.nodes
+        marks = {nodes['node1']: 0, nodes['node2']: len('INFO  old compaction\n')}
+        nodes['node2'].write('INFO  new compaction\n')
+        del nodes['node3']
+        # searched by worker processes however small the logs
+        with patch.object(logscan, 'GREP_PARALLEL_MIN_BYTES', 0):
+            found = sorted(self.log_cluster.grep_logs('compaction', since_mark=marks, workers=2))
+        self.assertEqual(found, [('node1', 'system.log', 'INFO  old compaction\n'),
+                                 ('node2', 'system.log', 'INFO  new compaction\n')])
+
+    def test_grep_several_logs(self):
+        found = sorted(self.log_cluster.grep_logs('compaction [02]|old', filenames=('system.log', 'debug.log', 'gc.log'),
+                                                  selected_nodes_names=['node1', 'node3'], workers=1))
+        self.assertEqual(found, [('node1', 'debug.log', 'DEBUG compaction 0\n'),
+                                 ('node1', 'system.log', 'INFO  old compaction\n'),
+                                 ('node3', 'debug.log', 'DEBUG compaction 2\n'),
+                                 ('node3', 'system.log', 'INFO  old compaction\n')])
+        with self.assertRaises(ValueError):
+            list(self.log_cluster.grep_logs('compaction', selected_nodes_names=['node4']))
+
+
+class _StoppingNode(object):
+    # the part of Node used to stop it, taking shutdown_time seconds to stop on SIGTERM
+
+    def __init__(self, name, running=True, shutdown_time=0.5):
+        self.name = name
+        self.running = running
+        self.shutdown_time = shutdown_time
+        self.signals = []
+
+    def is_running(self):
+        return self.running
+
+    def stop(self, wait=True, signal_event=signal.SIGTERM, deadline=None, **kwargs):
+        if not self.running:
+            return False
+        self.signals.append(signal_event)
+        if signal_event == signal.SIGKILL or deadline is None or deadline.remaining() >= self.shutdown_time:
+            time.sleep(self.shutdown_time if signal_event == signal.SIGTERM else 0)
+            self.running = False
+            return True
+        time.sleep(deadline.remaining())
+        raise NodeError("Problem stopping node %s" % self.name)
+
+
+class TestStopNodes(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestStopNodes, self).setUp()
+        # the methods only rely on the nodes
+        self.stop_cluster = Cluster.__new__(Cluster)
+        self.stop_cluster.nodes = OrderedDict((node.name, node) for node in [
+            _StoppingNode('node1'), _StoppingNode('node2', running=False), _StoppingNode('node3', shutdown_time=5)])
+        self.hooks = []
+        extension.PRE_CLUSTER_STOP_HOOKS.append(lambda cluster: self.hooks.append('pre'))
+        extension.POST_CLUSTER_STOP_HOOKS.append(lambda cluster: self.hooks.append('post'))
+
+    def tearDown(self):
+        del extension.PRE_CLUSTER_STOP_HOOKS[-1]
+        del extension.POST_CLUSTER_STOP_HOOKS[-1]
+        super(TestStopNodes, self).tearDown()
+
+    def test_stops_nodes_concurrently(self):
+        node1, node2, node3 = self.stop_cluster.nodes.values()
+        node3.shutdown_time = 0.5
+        start = time.time()
+        results = self.stop_cluster.stop_nodes()
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(list(results.items()), [(node1, StopResult.STOPPED), (node2, StopResult.NOT_RUNNING),
+                                                 (node3, StopResult.STOPPED)])
+        self.assertEqual(self.hooks, ['pre', 'post'])
+
+    def test_stop_returns_the_nodes_not_running(self):
+        self.stop_cluster.nodes['node3'].shutdown_time = 0.1
+        self.assertEqual([node.name for node in self.stop_cluster.stop()], ['node2'])
+
+    def test_kill_after(self):
+        node1, _, node3 = self.stop_cluster.nodes.values()
+        start = time.time()
+        results = self.stop_cluster.stop_nodes(kill_after=1)
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(results[node1], StopResult.STOPPED)
+        self.assertEqual(results[node3], StopResult.KILLED)
+        self.assertEqual(node3.signals, [signal.SIGTERM, signal.SIGKILL])
+
+    def test_failure(self):
+        node1 = self.stop_cluster.nodes['node1']
+        with self.assertRaises(NodeError) as cm:
+            self.stop_cluster.stop_nodes(deadline=1)
+        self.assertEqual(str(cm.exception), 'Problem stopping node node3')
+        # the other nodes were stopped all the same
+        self.assertFalse(node1.running)
+        self.assertEqual(self.hooks, ['pre'])
+
+
+# stands for bin/cassandra: forks a "JVM" writing its pid to the pidfile and logging
+# that it listens for clients, or logs a startup failure if the node has a fail file
+_LAUNCHER = """#!/bin/sh
+for arg; do
+    [ "$prev" = -p ] && pidfile=$arg
+    case $arg in -Dcassandra.logdir=*) logdir=${arg#-Dcassandra.logdir=};; esac
+    prev=$arg
+done
+if [ -e "$logdir/../fail" ]; then
+    echo "ERROR [main] 2024-01-01 00:00:00,000 CassandraDaemon.java:909 - Exception encountered during startup" >> "$logdir/system.log"
+    exit 3
+fi
+sleep 0.2
+sleep 60 &
+echo $! > "$pidfile"
+echo "INFO  [main] 2024-01-01 00:00:00,000 Server.java:159 - Starting listening for CQL clients" >> "$logdir/system.log"
+"""
+
+
+class TestStart(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestStart, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        install_dir = os.path.join(self.temp_dir.name, 'install')
+        for d in ('bin', 'conf'):
+            os.makedirs(os.path.join(install_dir, d))
+        launcher = os.path.join(install_dir, 'bin', 'cassandra')
+        with open(launcher, 'w') as f:
+            f.write(_LAUNCHER)
+        os.chmod(launcher, os.stat(launcher).st_mode | stat.S_IEXEC)
+        version = LooseVersion('4.0.0')
+        self.start_cluster = Cluster(self.temp_dir.name, 'test', install_dir=install_dir,
+                                     derived_cassandra_version=version)
+        for i in range(1, 4):
+            node = Node('node{}'.format(i), self.start_cluster, False, None, ('127.0.0.1', 0), '0', None, str(i),
+                        save=False, binary_interface=('127.0.0.1', 0), derived_cassandra_version=version)
+            node._update_config()
+            self.start_cluster.nodes[node.name] = node
+        self.start_cluster.seeds = [self.start_cluster.nodes['node1']]
+        # the environment of the JVM, which is not run
+        self.patches = [patch.dict(os.environ, {'JAVA_HOME': self.temp_dir.name}),
+                        patch.object(Node, 'get_env', lambda node: dict(os.environ)),
+                        patch('ccmlib.common.get_jdk_version', return_value='11'),
+                        patch('ccmlib.common.update_java_version', side_effect=lambda **kwargs: kwargs['env'])]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        for node in self.start_cluster.nodelist():
+            if node.pid is not None:
+                try:
+                    os.kill(node.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+        self.temp_dir.cleanup()
+        super(TestStart, self).tearDown()
+
+    def _launched(self, node):
+        return any(name.startswith('startup-') for name in os.listdir(node.log_directory()))
+
+    def test_start(self):
+        started = self.start_cluster.start(wait_other_notice=False, wait_for_binary_proto=False,
+                                           max_concurrent_starts=2)
+        self.assertEqual([node.name for node, _, _ in started], ['node1', 'node2', 'node3'])
+        for node in self.start_cluster.nodelist():
+            self.assertTrue(node.is_running())
+
+    def test_failing_node(self):
+        node1, node2, node3 = self.start_cluster.nodelist()
+        open(os.path.join(node2.get_path(), 'fail'), 'w').close()
+        start = time.time()
+        with self.assertRaises(StartupError) as cm:
+            self.start_cluster.start(wait_other_notice=False, wait_for_binary_proto=False, max_concurrent_starts=1)
+        self.assertLess(time.time() - start, 10)
+        self.assertIs(cm.exception.node, node2)
+        self.assertIn('Exception encountered during startup', cm.exception.reason)
+        # node2 took the slot node1 released once running, node3 never got it
+        self.assertTrue(node1.is_running())
+        self.assertFalse(self._launched(node3))
+
+    def test_running_nodes_see_the_started_ones(self):
+        node1, node2, node3 = self.start_cluster.nodelist()
+        node1.start(wait_other_notice=False, wait_for_binary_proto=False)
+        mark = node1.mark_log()
+        with patch.object(Cluster, 'watch_logs_for', return_value={}) as watch_logs_for:
+            self.start_cluster.start(wait_other_notice=True, wait_for_binary_proto=False)
+        exprs_by_node = watch_logs_for.call_args[0][0]
+        self.assertEqual(sorted(node.name for node in exprs_by_node), ['node1', 'node2', 'node3'])
+        self.assertEqual(exprs_by_node[node1], node1.alive_exprs([node2, node3]))
+        self.assertEqual(watch_logs_for.call_args[1]['from_marks'][node1], mark)
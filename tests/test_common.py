@@ -113,5 +113,31 @@ class TestCommon(ccmtest.Tester):
         self.assertEqual(common._get_jdk_version(v1000), "10.0")
         self.assertEqual(common._get_jdk_version(v1001), "10.0")
 
+
+class TestDeadline(ccmtest.Tester):
+
+    def test_cap(self):
+        deadline = common.Deadline(10)
+        self.assertEqual(deadline.cap(5), 5)
+        self.assertTrue(9 < deadline.cap(600) <= 10)
+        self.assertTrue(9 < deadline.cap(None) <= 10)
+        self.assertFalse(deadline.expired())
+        self.assertIsNone(common.Deadline().cap(None))
+        self.assertEqual(common.Deadline().cap(7), 7)
+
+    def test_expired(self):
+        deadline = common.Deadline(0)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.cap(7), 0)
+
+    def test_cap_timeout(self):
+        deadline = common.Deadline(10)
+        self.assertIs(common.Deadline.of(deadline), deadline)
+        self.assertIsNone(common.Deadline.of(None))
+        self.assertEqual(common.cap_timeout(600, None), 600)
+        self.assertEqual(common.cap_timeout(600, 0), 0)
+        self.assertTrue(9 < common.cap_timeout(600, deadline) <= 10)
+
+
 if __name__ == '__main__':
     unittest.main()
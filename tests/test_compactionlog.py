@@ -0,0 +1,131 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from mock import patch
+
+from ccmlib import compactionlog
+from ccmlib.node import Node
+from . import ccmtest
+
+
+def _sstable(generation, size):
+    return {'strategyId': '0', 'table': {'generation': generation, 'version': 'na', 'size': size, 'details': {}}}
+
+
+class TestCompactionLog(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestCompactionLog, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'compaction.log')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestCompactionLog, self).tearDown()
+
+    def _log(self, **event):
+        event.setdefault('keyspace', 'ks')
+        event.setdefault('table', 't')
+        event.setdefault('time', 1600000000000)
+        with open(self.log_file, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+
+    def test_table_stats(self):
+        log = compactionlog.CompactionLog(self.log_file)
+        self.assertEqual(log.update().tables, {})
+        self._log(type='enable', strategyId='0', strategy={})
+        self._log(type='flush', tables=[_sstable(1, 1024 * 1024)])
+        self._log(type='pending', strategyId='0', pending=2)
+        self._log(type='compaction', start='1600000000000', end='1600000002000',
+                  input=[_sstable(1, 3 * 1024 * 1024), _sstable(2, 1024 * 1024)], output=[_sstable(3, 3 * 1024 * 1024)])
+        self._log(type='pending', table='other', strategyId='0', pending=1)
+
+        log.update()
+        stats = log.tables[('ks', 't')]
+        self.assertEqual((stats.flushes, stats.compactions), (1, 1))
+        self.assertEqual((stats.bytes_in, stats.bytes_out), (4 * 1024 * 1024, 3 * 1024 * 1024))
+        self.assertEqual(stats.throughput_mb, 2.0)
+        self.assertEqual(log.pending_tasks(), 3)
+        self.assertEqual(log.finished_tasks(), 1)
+
+        # only what was appended is parsed
+        with open(self.log_file, 'a') as f:
+            f.write('{"type":"pending","keyspace":"ks","table":"t","strategyId":"0","pend')
+        self.assertEqual(log.update().pending_tasks(), 3)
+        with open(self.log_file, 'a') as f:
+            f.write('ing":0}\n')
+        self.assertEqual(log.update().pending_tasks(), 1)
+        self.assertEqual(stats.compactions, 1)
+
+    def _wait_for_compactions(self, nodetool_pending, log):
+        # returns the times nodetool was run at, since the start of the wait
+        node = Node.__new__(Node)
+        node.name = 'node1'
+        calls = []
+
+        def nodetool(cmd):
+            calls.append(time.time() - start)
+            return 'pending tasks: {}\n'.format(nodetool_pending()), '', 0
+
+        writer = threading.Thread(target=log)
+        with patch.object(Node, 'compactionlogfilename', return_value=self.log_file), \
+                patch.object(Node, 'nodetool', side_effect=nodetool):
+            start = time.time()
+            writer.start()
+            node.wait_for_compactions(timeout=10)
+        writer.join()
+        return calls
+
+    def test_wait_for_compactions(self):
+        self._log(type='pending', strategyId='0', pending=2)
+
+        def log():
+            # a busy table: many compactions logged, then none pending
+            for pending in range(20, 0, -1):
+                self._log(type='pending', strategyId='0', pending=pending)
+                time.sleep(0.05)
+            self._log(type='pending', strategyId='0', pending=0)
+
+        calls = self._wait_for_compactions(
+            lambda: compactionlog.CompactionLog(self.log_file).update().pending_tasks(), log)
+        # nodetool is not run on each change of the log, only to confirm no task is pending
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - calls[0], 1)
+        self.assertLess(calls[1], 2)
+
+    def test_wait_for_compactions_of_tables_not_logged(self):
+        results = [3, 1, 0]
+        calls = self._wait_for_compactions(lambda: results.pop(0), lambda: None)
+        # nodetool is run every second
+        self.assertEqual(len(calls), 3)
+        self.assertGreaterEqual(calls[2] - calls[1], 1)
+        self.assertLess(calls[2], 3)
+
+    def test_logs_are_bounded(self):
+        paths = [os.path.join(self.temp_dir.name, 'compaction{}.log'.format(i))
+                 for i in range(compactionlog.MAX_LOGS + 1)]
+        first = compactionlog.get_compaction_log(paths[0])
+        for path in paths[1:]:
+            compactionlog.get_compaction_log(path)
+        self.assertEqual(len(compactionlog._logs), compactionlog.MAX_LOGS)
+        self.assertIsNot(compactionlog.get_compaction_log(paths[0]), first)
+        self.assertIs(compactionlog.get_compaction_log(paths[0]), compactionlog.get_compaction_log(paths[0]))
@@ -0,0 +1,104 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import time
+
+from ccmlib import gclog
+from . import ccmtest
+
+JDK8_LOG = """\
+2024-01-01T10:00:00.123+0000: 1.000: [GC (Allocation Failure) 2024-01-01T10:00:00.123+0000: 1.000: [ParNew: 34944K->4352K(39296K), 0.0100000 secs] 34944K->5120K(126720K), 0.0100000 secs] [Times: user=0.02 sys=0.00, real=0.01 secs]
+2024-01-01T10:00:01.000+0000: 1.500: [CMS-concurrent-mark-start]
+2024-01-01T10:00:01.123+0000: 2.000: [GC (CMS Final Remark) [YG occupancy: 1000 K (39296 K)]2.000: [Rescan (parallel) , 0.0010 secs][1 CMS-remark: 5000K(87424K)] 6000K(126720K), 0.0050000 secs] [Times: user=0.01 sys=0.00, real=0.00 secs]
+2024-01-01T10:00:02.123+0000: 3.000: [Full GC (System.gc()) 3.000: [CMS: 5000K->3000K(87424K), 0.0500000 secs] 26720K->3072K(126720K), [Metaspace: 1K->1K(2K)], 0.2000000 secs] [Times: user=0.05 sys=0.00, real=0.20 secs]
+2024-01-01T10:00:03.123+0000: 5.000: [GC pause (G1 Evacuation Pause) (young), 0.0300000 secs]
+   [Parallel Time: 10.0 ms, GC Workers: 2]
+   [Eden: 24.0M(24.0M)->0.0B(20.0M) Survivors: 0.0B->3072.0K Heap: 24.0M(256.0M)->4096.0K(256.0M)]
+ [Times: user=0.02 sys=0.00, real=0.03 secs]
+"""
+
+UNIFIED_LOG = """\
+[2024-01-01T10:00:00.123+0000][1.000s][123][456][info][gc] Using G1
+[2024-01-01T10:00:00.123+0000][1.000s][123][456][info][gc] GC(0) Pause Young (Normal) (G1 Evacuation Pause) 24M->4M(256M) 2.000ms
+[2024-01-01T10:00:01.123+0000][2.000s][123][456][info][gc] GC(1) Pause Young (Concurrent Start) (G1 Humongous Allocation) 14M->6M(256M) 8.000ms
+[2024-01-01T10:00:01.123+0000][2.500s][123][456][info][gc] GC(2) Concurrent Cycle 20.000ms
+[2024-01-01T10:00:02.123+0000][3.000s][123][456][info][gc] GC(3) Pause Full (System.gc()) 26M->10M(256M) 150.000ms
+"""
+
+
+class TestGcLog(ccmtest.Tester):
+
+    def _parse(self, content):
+        parser = gclog.GcLogParser()
+        pauses = []
+        for line in content.splitlines(True):
+            pauses.extend(parser.feed(line))
+        return pauses + parser.flush()
+
+    def test_jdk8(self):
+        pauses = self._parse(JDK8_LOG)
+        self.assertEqual([p.kind for p in pauses], ['GC (Allocation Failure)', 'GC (CMS Final Remark)',
+                                                    'Full GC (System.gc())', 'GC pause (G1 Evacuation Pause) (young)'])
+        self.assertEqual([p.pause_ms for p in pauses], [10.0, 5.0, 200.0, 30.0])
+        self.assertEqual([p.heap_after for p in pauses], [5120, 6000, 3072, 4096])
+        self.assertEqual(pauses[3].heap_before, 24 * 1024)
+
+    def test_unified(self):
+        pauses = self._parse(UNIFIED_LOG)
+        self.assertEqual([p.kind for p in pauses], ['Pause Young (Normal) (G1 Evacuation Pause)',
+                                                    'Pause Young (Concurrent Start) (G1 Humongous Allocation)',
+                                                    'Pause Full (System.gc())'])
+        self.assertEqual([p.uptime for p in pauses], [1.0, 2.0, 3.0])
+        self.assertEqual([p.heap_after for p in pauses], [4096, 6144, 10240])
+
+    def test_stats(self):
+        stats = gclog.GcStats(self._parse(UNIFIED_LOG))
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.full_count, 1)
+        self.assertEqual(stats.total_pause_ms, 160.0)
+        self.assertEqual(stats.pause_percentile(50), 8.0)
+        self.assertEqual(stats.pause_percentile(100), 150.0)
+        self.assertEqual(stats.elapsed, 2.0)
+        self.assertAlmostEqual(stats.pause_fraction, 0.08)
+        # 10M allocated before the second pause, 20M before the third, in 2s
+        self.assertAlmostEqual(stats.allocation_rate_mb, 15.0)
+        self.assertEqual(stats.heap_after_gc_mb(), (4.0, 20.0 / 3, 10.0, 10.0))
+        self.assertEqual(dict(stats.histogram())[5], 1)
+        self.assertEqual(dict(stats.histogram())[200], 1)
+        self.assertIn('Allocation rate: 15.0 MB/s', str(stats))
+        self.assertEqual(str(gclog.GcStats()), 'No GC pause logged')
+
+    def test_restarted_jvm(self):
+        stats = gclog.GcStats(self._parse(UNIFIED_LOG) + self._parse(UNIFIED_LOG))
+        self.assertEqual(stats.count, 6)
+        # nothing is counted between the last pause of a JVM and the first of the next one
+        self.assertEqual(stats.elapsed, 4.0)
+        self.assertAlmostEqual(stats.allocation_rate_mb, 15.0)
+
+    def test_gc_logs(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            now = time.time()
+            for i, name in enumerate(['gc.log.1', 'gc.log.0', 'gc.log.2.current']):
+                path = os.path.join(log_dir, name)
+                with open(path, 'w') as f:
+                    f.write(JDK8_LOG)
+                os.utime(path, (now + i, now + i))
+            open(os.path.join(log_dir, 'system.log'), 'w').close()
+            logs = gclog.gc_logs(log_dir)
+            self.assertEqual([os.path.basename(p) for p in logs], ['gc.log.1', 'gc.log.0', 'gc.log.2.current'])
+            self.assertEqual(gclog.parse_gc_logs(logs).count, 12)
@@ -0,0 +1,102 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from datetime import datetime
+
+from ccmlib import logindex
+from . import ccmtest
+
+
+def _log_line(minute, second, i):
+    return 'INFO  [main] 2024-01-01 10:{:02d}:{:02d},000 Foo.java:1 - message {}\n'.format(minute, second, i)
+
+
+class TestTimestampIndex(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestTimestampIndex, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+        open(self.log_file, 'w').close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestTimestampIndex, self).tearDown()
+
+    def _write(self, minutes, start=0):
+        with open(self.log_file, 'a') as f:
+            i = start
+            for minute in minutes:
+                for second in range(60):
+                    f.write(_log_line(minute, second, i))
+                    if second == 30:
+                        f.write('java.lang.RuntimeException: boom\n\tat Foo.bar(Foo.java:1)\n')
+                    i += 1
+
+    def test_format_timestamp(self):
+        self.assertEqual(logindex.format_timestamp(datetime(2024, 1, 1, 10, 5, 3, 42000)), '2024-01-01 10:05:03,042')
+        self.assertEqual(logindex.format_timestamp('2024-01-01 10:05'), '2024-01-01 10:05')
+        self.assertEqual(logindex.line_timestamp(_log_line(1, 2, 0)), '2024-01-01 10:01:02,000')
+        self.assertIsNone(logindex.line_timestamp('\tat Foo.bar(Foo.java:1)\n'))
+
+    def test_time_range(self):
+        self._write(range(10))
+        index = logindex.TimestampIndex(self.log_file, interval=1024)
+        lines = list(index.lines(since='2024-01-01 10:03', until=datetime(2024, 1, 1, 10, 5)))
+        self.assertEqual(lines[0], _log_line(3, 0, 180))
+        self.assertEqual(lines[-1], _log_line(4, 59, 299))
+        # stack traces belong to the line logged before them
+        self.assertEqual(len(lines), 2 * 62)
+        start, end = index.byte_range(since='2024-01-01 10:03', until='2024-01-01 10:05')
+        self.assertGreater(start, 0)
+        self.assertLess(end, os.path.getsize(self.log_file))
+
+    def test_incremental_and_persisted(self):
+        self._write(range(2))
+        index = logindex.TimestampIndex(self.log_file, interval=1024).update()
+        indexed = index.indexed
+        entries = len(index.offsets)
+        self._write(range(2, 4), start=120)
+        index.update()
+        self.assertGreater(index.indexed, indexed)
+        self.assertGreater(len(index.offsets), entries)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, '.system.log.tsindex')))
+
+        reloaded = logindex.TimestampIndex(self.log_file, interval=1024)
+        reloaded._load()
+        self.assertEqual(reloaded.offsets, index.offsets)
+        self.assertEqual(reloaded.timestamps, index.timestamps)
+        self.assertEqual(list(reloaded.lines(since='2024-01-01 10:03:59')), [_log_line(3, 59, 239)])
+
+    def test_rebuilt_after_rotation(self):
+        self._write(range(5))
+        index = logindex.TimestampIndex(self.log_file, interval=1024).update()
+        os.rename(self.log_file, self.log_file + '.1')
+        self._write(range(20, 22))
+        lines = list(index.lines(since='2024-01-01 10:00', until='2024-01-01 10:10'))
+        self.assertEqual(lines, [])
+        self.assertEqual(index.timestamps[0], '2024-01-01 10:20:00,000')
+
+    def test_indexes_are_bounded(self):
+        paths = [os.path.join(self.temp_dir.name, 'log{}'.format(i)) for i in range(logindex.MAX_INDEXES + 1)]
+        first = logindex.get_index(paths[0])
+        for path in paths[1:]:
+            logindex.get_index(path)
+        self.assertEqual(len(logindex._indexes), logindex.MAX_INDEXES)
+        self.assertIsNot(logindex.get_index(paths[0]), first)
+        self.assertIs(logindex.get_index(paths[0]), logindex.get_index(paths[0]))
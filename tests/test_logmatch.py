@@ -0,0 +1,53 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+from ccmlib import logmatch
+from . import ccmtest
+
+
+class TestMultiPatternMatcher(ccmtest.Tester):
+
+    def test_required_literal(self):
+        self.assertEqual(logmatch.required_literal(re.compile("127.0.0.2:7000.* is now UP")), " is now UP")
+        self.assertEqual(logmatch.required_literal(re.compile("Starting listening for CQL clients")),
+                         "Starting listening for CQL clients")
+        self.assertEqual(logmatch.required_literal(re.compile(b"Compacted \\(\\w+\\)")), b"Compacted (")
+        self.assertIsNone(logmatch.required_literal(re.compile("is now (UP|DOWN)", re.IGNORECASE)))
+        self.assertIsNone(logmatch.required_literal(re.compile("UP|DOWN")))
+        self.assertIsNone(logmatch.required_literal(re.compile("\\d+ms")))
+
+    def test_search_finds_every_matching_pattern(self):
+        matcher = logmatch.MultiPatternMatcher(["127.0.0.2:7000.* is now UP", "127.0.0.3:7000.* is now UP", "now"])
+        line = "INFO  [GossipStage:1] 2024-01-01 00:00:00,000 Gossiper.java:1 - InetAddress /127.0.0.2:7000 is now UP"
+        self.assertEqual([p.pattern for p, _ in matcher.search(line)], ["127.0.0.2:7000.* is now UP", "now"])
+        self.assertEqual(matcher.search("INFO  [main] Starting listening for CQL clients"), [])
+
+    def test_literal_prefilter(self):
+        matcher = logmatch.MultiPatternMatcher(["127.0.0.2:7000.* is now UP", "127.0.0.3:7000.* is now UP"])
+        self.assertFalse(matcher.may_match("INFO  [main] Starting listening for CQL clients"))
+        self.assertTrue(matcher.may_match("/127.0.0.4:7000 is now UP"))
+
+    def test_combined_filter_without_literals(self):
+        matcher = logmatch.MultiPatternMatcher(["UP|DOWN", "\\d+ ms"])
+        self.assertTrue(matcher.may_match("took 12 ms"))
+        self.assertFalse(matcher.may_match("nothing to see"))
+        self.assertEqual(len(matcher.search("node is UP after 12 ms")), 2)
+
+    def test_backreferences_are_not_combined(self):
+        matcher = logmatch.MultiPatternMatcher(["(a)\\1", "(b)\\1"])
+        self.assertEqual([p.pattern for p, _ in matcher.search("bb")], ["(b)\\1"])
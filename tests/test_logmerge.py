@@ -0,0 +1,87 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import threading
+
+from ccmlib import logmerge
+from . import ccmtest
+
+
+class TestMergeLogs(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestMergeLogs, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log1 = self._write('node1.log',
+                                'starting\n'
+                                'INFO  [main] 2024-01-01 10:00:00,000 A.java:1 - one\n'
+                                'ERROR [main] 2024-01-01 10:00:02,000 A.java:1 - three\n'
+                                'java.lang.RuntimeException\n'
+                                '\tat A.run(A.java:1)\n'
+                                'INFO  [main] 2024-01-01 10:00:04,000 A.java:1 - five')
+        self.log2 = self._write('node2.log',
+                                'INFO  [main] 2024-01-01 10:00:01,000 A.java:1 - two\n'
+                                'INFO  [main] 2024-01-01 10:00:03,000 A.java:1 - four\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestMergeLogs, self).tearDown()
+
+    def _write(self, name, content, mode='w'):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, mode) as f:
+            f.write(content)
+        return path
+
+    def test_merge_in_timestamp_order(self):
+        merged = list(logmerge.merge_logs([('node1', self.log1), ('node2', self.log2),
+                                           ('node3', os.path.join(self.temp_dir.name, 'missing.log'))]))
+        self.assertEqual([(label, line.split(' - ')[-1]) for label, line in merged],
+                         [('node1', 'starting\n'),
+                          ('node1', 'one\n'),
+                          ('node2', 'two\n'),
+                          ('node1', 'three\n'),
+                          ('node1', 'java.lang.RuntimeException\n'),
+                          ('node1', '\tat A.run(A.java:1)\n'),
+                          ('node2', 'four\n'),
+                          ('node1', 'five\n')])
+
+    def test_merge_is_lazy(self):
+        merged = logmerge.merge_logs([('node1', self.log1), ('node2', self.log2)])
+        self.assertEqual(next(merged), ('node1', 'starting\n'))
+        merged.close()
+
+    def test_follow(self):
+        merged = logmerge.merge_logs([('node1', self.log1), ('node2', self.log2)], follow=True, reorder_window=0.1)
+        lines = []
+        # the partial last line of node1 is only shown once complete
+        for _ in range(7):
+            lines.append(next(merged)[1].split(' - ')[-1])
+        self.assertEqual(lines[-1], 'four\n')
+
+        def append():
+            self._write('node1.log', ' and more\n', 'a')
+            self._write('node2.log', 'INFO  [main] 2024-01-01 10:00:05,000 A.java:1 - six\n', 'a')
+
+        threading.Timer(0.2, append).start()
+        try:
+            self.assertEqual(sorted(next(merged) for _ in range(2)),
+                             [('node1', 'INFO  [main] 2024-01-01 10:00:04,000 A.java:1 - five and more\n'),
+                              ('node2', 'INFO  [main] 2024-01-01 10:00:05,000 A.java:1 - six\n')])
+        finally:
+            merged.close()
@@ -0,0 +1,91 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+
+from ccmlib import logrecords
+from . import ccmtest
+
+
+class TestLogRecords(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestLogRecords, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+        self._write('INFO  [main] 2024-01-01 10:00:00,000 CassandraDaemon.java:123 - Starting\n'
+                    'WARN  [CompactionExecutor:1] 2024-01-01 10:00:01,000 ColumnFamilyStore.java:10 - Slow\n'
+                    'ERROR [main] 2024-01-01 10:00:02,000 CassandraDaemon.java:456 - Exception encountered\n'
+                    'java.lang.RuntimeException: boom\n'
+                    '\tat org.apache.cassandra.Foo.bar(Foo.java:1)\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestLogRecords, self).tearDown()
+
+    def _write(self, content):
+        with open(self.log_file, 'a') as f:
+            f.write(content)
+
+    def test_parse_line(self):
+        self.assertEqual(logrecords.parse_line('INFO  [main] 2024-01-01 10:00:00,000 CassandraDaemon.java:123 - Starting up'),
+                         ('INFO', '2024-01-01 10:00:00,000', 'main', 'CassandraDaemon.java:123', 'Starting up'))
+        self.assertEqual(logrecords.parse_line(' INFO [main] 2012-01-01 10:00:00,000 CassandraDaemon.java (line 12) Starting'),
+                         ('INFO', '2012-01-01 10:00:00,000', 'main', 'CassandraDaemon.java (line 12)', 'Starting'))
+        self.assertEqual(logrecords.parse_line('DEBUG [Native-Transport 1] 2024-01-01 10:00:00,000 o.a.c.db.Keyspace - x')[3],
+                         'o.a.c.db.Keyspace')
+        self.assertIsNone(logrecords.parse_line('\tat org.apache.cassandra.Foo.bar(Foo.java:1)'))
+
+    def test_query(self):
+        store = logrecords.LogStore(self.log_file)
+        errors = store.query(level='ERROR')
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].message, 'Exception encountered')
+        self.assertEqual(errors[0].continuation, ('java.lang.RuntimeException: boom',
+                                                  '\tat org.apache.cassandra.Foo.bar(Foo.java:1)'))
+        self.assertEqual([r.level for r in store.query(thread='main')], ['INFO', 'ERROR'])
+        self.assertEqual([r.message for r in store.query(source_prefix='CassandraDaemon', level=['INFO', 'WARN'])],
+                         ['Starting'])
+        self.assertEqual([r.message for r in store.query(since='2024-01-01 10:00:01', until='2024-01-01 10:00:02')],
+                         ['Slow'])
+        self.assertEqual(errors[0].source, 'CassandraDaemon.java:456')
+        self.assertEqual(store.query(level='FATAL'), [])
+        mark = store.query(level='ERROR')[0].offset
+        self.assertEqual([r.level for r in store.query(from_mark=mark)], ['ERROR'])
+
+    def test_incremental_update(self):
+        store = logrecords.LogStore(self.log_file)
+        self.assertEqual(len(store.update()), 3)
+        # the stack trace goes on, and the next record is only partially written
+        self._write('\tat org.apache.cassandra.Foo.baz(Foo.java:2)\nINFO  [main] 2024-01-01 10:00:03,000 Foo.java:1 - Do')
+        self.assertEqual(len(store.query(level='ERROR')[0].continuation), 3)
+        self.assertEqual(len(store), 3)
+        self._write('ne\n')
+        self.assertEqual(store.query(level='INFO')[-1].message, 'Done')
+
+        with open(self.log_file, 'w') as f:
+            f.write('ERROR [main] 2024-01-01 11:00:00,000 Foo.java:1 - after truncation\n')
+        self.assertEqual([r.message for r in store.query()], ['after truncation'])
+
+    def test_stores_are_bounded(self):
+        paths = [os.path.join(self.temp_dir.name, 'log{}'.format(i)) for i in range(logrecords.MAX_STORES + 1)]
+        first = logrecords.get_store(paths[0])
+        for path in paths[1:]:
+            logrecords.get_store(path)
+        self.assertEqual(len(logrecords._stores), logrecords.MAX_STORES)
+        self.assertIsNot(logrecords.get_store(paths[0]), first)
+        self.assertIs(logrecords.get_store(paths[0]), logrecords.get_store(paths[0]))
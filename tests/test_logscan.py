@@ -0,0 +1,244 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import re
+import tempfile
+
+from mock import patch
+
+from ccmlib import logscan, logtail
+from . import ccmtest
+
+
+class TestErrorScanner(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestErrorScanner, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+        open(self.log_file, 'w').close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestErrorScanner, self).tearDown()
+
+    def _write(self, content):
+        with open(self.log_file, 'a') as f:
+            f.write(content)
+
+    def test_only_reads_appended_data(self):
+        scanner = logscan.ErrorScanner(self.log_file)
+        self._write('ERROR first\nINFO fine\n')
+        self.assertEqual(scanner.scan(), [['ERROR first']])
+        self.assertEqual(scanner.offset, os.path.getsize(self.log_file))
+        self._write('INFO still fine\nERROR second\nINFO fine again\n')
+        self.assertEqual(scanner.scan(), [['ERROR second']])
+        self.assertEqual(scanner.scan(), [])
+
+    def test_keeps_stack_trace_between_calls(self):
+        scanner = logscan.ErrorScanner(self.log_file)
+        self._write('ERROR failure\njava.lang.RuntimeException: boom\n')
+        # nothing proves the error is complete yet
+        self.assertEqual(scanner.scan(), [])
+        self._write('\tat org.apache.cassandra.Foo.bar(Foo.java:1)\nINFO recovered\n')
+        self.assertEqual(scanner.scan(), [['ERROR failure',
+                                           'java.lang.RuntimeException: boom',
+                                           '\tat org.apache.cassandra.Foo.bar(Foo.java:1)']])
+
+    def test_reports_last_error_when_log_is_idle(self):
+        scanner = logscan.ErrorScanner(self.log_file)
+        self._write('ERROR failure\n')
+        self.assertEqual(scanner.scan(), [])
+        self.assertEqual(scanner.scan(), [['ERROR failure']])
+
+    def test_flush(self):
+        self._write('INFO fine\nERROR failure\n  details')
+        scanner = logscan.ErrorScanner(self.log_file, offset=len('INFO fine\n'))
+        self.assertEqual(scanner.scan(flush=True), [['ERROR failure', '  details']])
+
+    def test_restarts_on_truncated_log(self):
+        scanner = logscan.ErrorScanner(self.log_file)
+        self._write('INFO a rather long line to be truncated\n')
+        self.assertEqual(scanner.scan(flush=True), [])
+        with open(self.log_file, 'w') as f:
+            f.write('ERROR after truncation\n')
+        self.assertEqual(scanner.scan(flush=True), [['ERROR after truncation']])
+
+
+class TestErrorDigest(ccmtest.Tester):
+
+    error = ('ERROR [ReadStage-{thread}] 2024-01-01 10:00:0{thread},000 ReadCommand.java:99 - Read of {key} failed\n'
+             'java.lang.IllegalStateException: object@{address} at offset {thread}00\n'
+             '\tat org.apache.cassandra.db.ReadCommand.lambda${thread}(ReadCommand.java:1{thread})\n'
+             '\tat org.apache.cassandra.db.ReadCommand.execute(ReadCommand.java:42)\n'
+             'Caused by: java.io.IOException: read failed\n'
+             '\t... {thread} more\n')
+
+    def setUp(self):
+        super(TestErrorDigest, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestErrorDigest, self).tearDown()
+
+    def _error(self, thread, key='k1', address='1a2b3c'):
+        return self.error.format(thread=thread, key=key, address=address)
+
+    def test_fingerprint(self):
+        def fingerprint(text):
+            return logscan.error_fingerprint(text.rstrip('\n').split('\n'))
+
+        same = fingerprint(self._error(1))
+        # numbers, addresses and the message of an error with a stack trace do not matter
+        self.assertEqual(fingerprint(self._error(2, key='k2', address='ffee01')), same)
+        self.assertNotEqual(fingerprint(self._error(1).replace('IOException', 'FileNotFoundException')), same)
+        self.assertNotEqual(fingerprint(self._error(1).replace('execute', 'executeLocally')), same)
+        self.assertNotEqual(fingerprint(self._error(1).replace('ERROR', 'WARN ')), same)
+        # without stack trace, the message does
+        self.assertEqual(fingerprint('ERROR [main] 2024-01-01 10:00:00,000 A.java:1 - Lost 12 files'),
+                         fingerprint('ERROR [main] 2024-01-01 11:00:00,000 A.java:1 - Lost 3 files'))
+        self.assertNotEqual(fingerprint('ERROR [main] 2024-01-01 10:00:00,000 A.java:1 - Lost 12 files'),
+                            fingerprint('ERROR [main] 2024-01-01 10:00:00,000 A.java:1 - Kept 12 files'))
+
+    def test_digest(self):
+        other = 'ERROR [main] 2024-01-01 10:00:00,000 A.java:1 - Something else\n'
+        with open(self.log_file, 'w') as f:
+            f.write('INFO  [main] 2024-01-01 10:00:00,000 A.java:1 - Starting\n')
+            f.write(self._error(1))
+            f.write(other)
+            for thread in range(2, 10):
+                f.write(self._error(thread))
+            f.write('INFO  [main] 2024-01-01 10:00:10,000 A.java:1 - Done\n')
+        digest = logscan.ErrorScanner(self.log_file).scan(flush=True, digest=logscan.ErrorDigest())
+        self.assertEqual(len(digest), 2)
+        self.assertEqual(digest.count, 10)
+        first, second = digest
+        self.assertEqual(first.count, 9)
+        self.assertEqual(first.lines, self._error(1).rstrip('\n').split('\n'))
+        start = len('INFO  [main] 2024-01-01 10:00:00,000 A.java:1 - Starting\n')
+        self.assertEqual(first.first_offset, start)
+        self.assertEqual(first.last_offset, start + len(self._error(1)) + len(other) + 7 * len(self._error(2)))
+        self.assertEqual((second.count, second.lines), (1, [other.rstrip('\n')]))
+        self.assertEqual(second.first_offset, start + len(self._error(1)))
+
+        with open(self.log_file) as f:
+            digest = logscan.collect_errors(f, digest=logscan.ErrorDigest())
+        self.assertEqual([(e.count, e.first_offset) for e in digest], [(9, None), (1, None)])
+
+
+class TestGrepFile(ccmtest.Tester):
+
+    content = (u'INFO  [main] 2024-01-01 00:00:00,000 Starting listening for CQL clients\n'
+               u'WARN  [main] caf\u00e9 is open, 42 ms\r\n'
+               u'ERROR [main] Exception encountered during startup\n'
+               u'java.lang.RuntimeException: boom\n'
+               u'\tat org.apache.cassandra.Foo.bar(Foo.java:1)\n'
+               u'INFO  [main] Node /127.0.0.2 is now UP\n') * 20 + u'INFO  [main] partial line 7 ms'
+
+    def setUp(self):
+        super(TestGrepFile, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+        with open(self.log_file, 'wb') as f:
+            f.write(self.content.encode('utf-8'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestGrepFile, self).tearDown()
+
+    def _expected(self, expr, from_mark=0):
+        pattern = re.compile(expr)
+        with open(self.log_file, 'rb') as f:
+            f.seek(from_mark)
+            lines = [logtail.decode_line(raw) for raw in f.read().splitlines(True)]
+        return [line for line in lines if pattern.search(line)]
+
+    def _check(self, expr, from_mark=0):
+        found = logscan.grep_file(self.log_file, expr, from_mark=from_mark)
+        self.assertEqual([line for line, _ in found], self._expected(expr, from_mark))
+        for line, m in found:
+            self.assertEqual(m.string, line)
+        return found
+
+    def test_same_lines_as_line_by_line_search(self):
+        # small chunks so that lines are found across several of them
+        with patch.object(logscan, '_GREP_CHUNK_SIZE', 100):
+            for expr in ['is now UP', r'Node /[0-9.]+ is now (UP|DOWN)', r'\d+ ms$', r'^\tat ', r'caf\w',
+                         r'(?i)exception', u'caf\u00e9', r'ms\r', 'not in the log',
+                         r'\s$', r'\W$', r'UP\s$', r'[^a-z]$', r'\D$', r'(?s)UP.', r'^$']:
+                self._check(expr)
+        self.assertEqual(len(self._check(r'\d+ ms$')), 21)
+        self.assertEqual(len(self._check(r'caf\w')), 20)
+        self.assertEqual(len(self._check(r'UP\s$')), 20)
+
+    def test_empty_lines(self):
+        # searched as ASCII text
+        with open(self.log_file, 'w') as f:
+            f.write('INFO  [main] started node\n\nINFO  [main] done.\n')
+        self.assertEqual([line for line, _ in self._check(r'^$')], ['\n'])
+        self.assertEqual(len(self._check(r'\s$')), 3)
+        self.assertEqual(len(self._check(r'\W$')), 3)
+        self.assertEqual(len(self._check(r'node\s$')), 1)
+
+    def test_from_mark(self):
+        mark = len(self.content.encode('utf-8')) // 2
+        self._check('is now UP', from_mark=mark)
+        self._check(r'^.*\d', from_mark=mark)
+        self.assertEqual(logscan.grep_file(self.log_file, 'UP', from_mark=os.path.getsize(self.log_file)), [])
+
+
+class TestNoErrorsPatternSubscriber(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestNoErrorsPatternSubscriber, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+        open(self.log_file, 'w').close()
+        self.tailer = logtail.LogTailer(self.log_file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestNoErrorsPatternSubscriber, self).tearDown()
+
+    def _write(self, content):
+        with open(self.log_file, 'a') as f:
+            f.write(content)
+
+    def test_finds_patterns(self):
+        subscriber = self.tailer.subscribe(logscan.NoErrorsPatternSubscriber(['Starting listening'], timeout=10))
+        self._write('INFO  [main] Starting listening for CQL clients\n')
+        self.assertTrue(subscriber.wait(5))
+        self.assertEqual(subscriber.errors, [])
+        self.assertEqual(len(subscriber.matchings), 1)
+
+    def test_fails_as_soon_as_error_is_logged(self):
+        subscriber = self.tailer.subscribe(logscan.NoErrorsPatternSubscriber(['Starting listening'], timeout=10))
+        self._write('ERROR [main] Exception encountered during startup\n'
+                    'java.lang.RuntimeException: boom\n')
+        self.assertTrue(subscriber.wait(5))
+        self.assertFalse(subscriber.expired)
+        self.assertEqual(subscriber.errors, [['ERROR [main] Exception encountered during startup',
+                                              'java.lang.RuntimeException: boom']])
+
+    def test_error_before_pattern_wins(self):
+        self._write('ERROR [main] failure\nINFO  [main] Starting listening for CQL clients\n')
+        subscriber = self.tailer.subscribe(logscan.NoErrorsPatternSubscriber(['Starting listening']))
+        self.assertTrue(subscriber.is_done())
+        self.assertEqual(subscriber.errors, [['ERROR [main] failure']])
+        self.assertEqual(subscriber.matchings, [])
@@ -0,0 +1,92 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import os
+import tempfile
+import time
+import zipfile
+
+from ccmlib import logscan, logsource
+from . import ccmtest
+
+
+class TestLogSource(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestLogSource, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+        now = time.time()
+        # written out of order, the archives are ordered by modification time
+        self._zip('system.log.2024-01-02.0.zip', 'INFO  second archive\nERROR in second archive\n', now - 100)
+        self._zip('system.log.2024-01-01.0.zip', 'INFO  first archive\n', now - 200)
+        self._gzip('system.log.2024-01-02.1.gz', 'INFO  third archive\n', now - 50)
+        with open(os.path.join(self.temp_dir.name, 'debug.log.2024-01-01.0.zip'), 'w') as f:
+            f.write('not an archive of system.log')
+        with open(self.log_file, 'w') as f:
+            f.write('INFO  live log\nINFO  after the mark')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestLogSource, self).tearDown()
+
+    def _zip(self, name, content, mtime):
+        path = os.path.join(self.temp_dir.name, name)
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(name[:-len('.zip')], content)
+        os.utime(path, (mtime, mtime))
+
+    def _gzip(self, name, content, mtime):
+        path = os.path.join(self.temp_dir.name, name)
+        with gzip.open(path, 'wb') as f:
+            f.write(content.encode())
+        os.utime(path, (mtime, mtime))
+
+    def test_rotated_logs(self):
+        self.assertEqual([os.path.basename(p) for p in logsource.rotated_logs(self.log_file)],
+                         ['system.log.2024-01-01.0.zip', 'system.log.2024-01-02.0.zip', 'system.log.2024-01-02.1.gz'])
+        self.assertEqual(logsource.rotated_logs(os.path.join(self.temp_dir.name, 'gc.log')), [])
+
+    def test_lines_in_chronological_order(self):
+        self.assertEqual(list(logsource.LogSource(self.log_file).lines()),
+                         ['INFO  first archive\n', 'INFO  second archive\n', 'ERROR in second archive\n',
+                          'INFO  third archive\n', 'INFO  live log\n', 'INFO  after the mark'])
+        self.assertEqual(list(logsource.LogSource(self.log_file, include_rotated=False).lines()),
+                         ['INFO  live log\n', 'INFO  after the mark'])
+
+    def test_from_mark_applies_to_live_log(self):
+        lines = list(logsource.LogSource(self.log_file).lines(from_mark=len('INFO  live log\n')))
+        self.assertEqual(lines[0], 'INFO  first archive\n')
+        self.assertEqual(lines[-2:], ['INFO  third archive\n', 'INFO  after the mark'])
+
+    def test_errors_in_archives(self):
+        self.assertEqual(logscan.collect_errors(logsource.LogSource(self.log_file).lines()),
+                         [['ERROR in second archive']])
+
+    def test_read_raw_lines(self):
+        with open(self.log_file, 'rb') as f:
+            self.assertEqual(list(logsource.read_raw_lines(f)), [b'INFO  live log\n', b'INFO  after the mark'])
+        with open(self.log_file, 'rb') as f:
+            self.assertEqual(list(logsource.read_raw_lines(f, len('INFO  live log\nINFO'))),
+                             [b'INFO  live log\n', b'INFO'])
+
+    def test_log_replaced(self):
+        st = os.stat(self.log_file)
+        self.assertFalse(logsource.log_replaced(st, st.st_ino, st.st_size))
+        self.assertFalse(logsource.log_replaced(st, None, 0))
+        self.assertTrue(logsource.log_replaced(st, st.st_ino, st.st_size + 1))
+        self.assertTrue(logsource.log_replaced(st, st.st_ino + 1, 0))
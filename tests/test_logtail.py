@@ -0,0 +1,184 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from ccmlib import logtail
+from . import ccmtest
+
+
+class TestFileWatcher(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestFileWatcher, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestFileWatcher, self).tearDown()
+
+    def _append_later(self, path, delay=0.2):
+        def append():
+            time.sleep(delay)
+            with open(path, 'a') as f:
+                f.write('INFO  [main] Starting listening for CQL clients\n')
+        thread = threading.Thread(target=append)
+        thread.start()
+        return thread
+
+    def test_polling_watcher_times_out(self):
+        with logtail.FileWatcher(self.log_file) as watcher:
+            start = time.time()
+            self.assertFalse(watcher.wait(0.1))
+            self.assertGreaterEqual(time.time() - start, 0.1)
+
+    @pytest.mark.skipif(not logtail.inotify_available(), reason="inotify is not available")
+    def test_inotify_watcher_wakes_on_append(self):
+        open(self.log_file, 'w').close()
+        with logtail.create_watcher(self.log_file) as watcher:
+            self.assertIsInstance(watcher, logtail.InotifyFileWatcher)
+            thread = self._append_later(self.log_file)
+            start = time.time()
+            self.assertTrue(watcher.wait(5))
+            self.assertLess(time.time() - start, 1)
+            thread.join()
+
+    @pytest.mark.skipif(not logtail.inotify_available(), reason="inotify is not available")
+    def test_inotify_watcher_wakes_on_creation(self):
+        with logtail.create_watcher(self.log_file) as watcher:
+            thread = self._append_later(self.log_file)
+            self.assertTrue(watcher.wait(5))
+            thread.join()
+
+    @pytest.mark.skipif(not logtail.inotify_available(), reason="inotify is not available")
+    def test_inotify_watcher_ignores_other_files(self):
+        with logtail.create_watcher(self.log_file) as watcher:
+            thread = self._append_later(os.path.join(self.temp_dir.name, 'debug.log'), delay=0)
+            thread.join()
+            self.assertFalse(watcher.wait(0.2))
+
+
+class TestLogTailer(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestLogTailer, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'system.log')
+        self.tailer = logtail.LogTailer(self.log_file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestLogTailer, self).tearDown()
+
+    def _write(self, content, mode='a'):
+        with open(self.log_file, mode) as f:
+            f.write(content)
+
+    def test_get_tailer_is_shared(self):
+        self.assertIs(logtail.get_tailer(self.log_file), logtail.get_tailer(os.path.join(self.temp_dir.name, '.', 'system.log')))
+
+    def test_subscriber_done_at_once_closes_the_log(self):
+        self._write('INFO one\nERROR two\n')
+        subscriber = self.tailer.subscribe(logtail.PatternSubscriber(['ERROR']))
+        self.assertTrue(subscriber.is_done())
+        self.assertEqual(len(subscriber.matchings), 1)
+        self.assertIsNone(self.tailer._file)
+
+    def test_unused_tailer_is_forgotten(self):
+        self._write('INFO one\n')
+        tailer = logtail.get_tailer(self.log_file)
+        subscriber = tailer.subscribe(logtail.PatternSubscriber(['two'], timeout=10))
+        self._write('INFO two\n')
+        self.assertTrue(subscriber.wait(5))
+        thread = tailer._thread
+        if thread is not None:
+            thread.join(5)
+        self.assertIsNone(tailer._file)
+        del tailer, thread
+        gc.collect()
+        self.assertNotIn(os.path.abspath(self.log_file), logtail._tailers)
+
+    def test_subscribers_share_the_reader(self):
+        self._write('INFO starting\n')
+        first = self.tailer.subscribe(logtail.PatternSubscriber(['node2 is now UP'], timeout=10))
+        mark = os.path.getsize(self.log_file)
+        second = self.tailer.subscribe(logtail.PatternSubscriber(['Starting listening', 'starting'], timeout=10), from_mark=mark)
+        self._write('INFO node2 is now UP\nINFO Starting listening for CQL clients\n')
+        self.assertTrue(first.wait(5))
+        self.assertEqual([line for line, _ in first.matchings], ['INFO node2 is now UP\n'])
+        # the line before the mark was not seen by the second subscriber
+        self.assertFalse(second.wait(0.2))
+        self._write('INFO starting again\n')
+        self.assertTrue(second.wait(5))
+        self.assertEqual(len(second.matchings), 2)
+
+    def test_late_subscriber_replays_from_mark(self):
+        self._write('INFO node1 is now UP\n')
+        follower = self.tailer.subscribe(logtail.PatternSubscriber(['never'], timeout=10))
+        self._write('INFO node2 is now UP\n')
+        late = self.tailer.subscribe(logtail.PatternSubscriber(['node1 is now UP', 'node2 is now UP'], timeout=10))
+        self.assertTrue(late.wait(5))
+        self.tailer.unsubscribe(follower)
+
+    def test_subscriber_expires(self):
+        subscriber = self.tailer.subscribe(logtail.PatternSubscriber(['never'], timeout=0.2))
+        self.assertTrue(subscriber.wait(5))
+        self.assertTrue(subscriber.expired)
+
+    def test_follows_rotated_log(self):
+        self._write('INFO before rotation\n')
+        subscriber = self.tailer.subscribe(logtail.PatternSubscriber(['after rotation'], timeout=10))
+        time.sleep(0.2)
+        os.rename(self.log_file, self.log_file + '.1')
+        self._write('INFO after rotation\n')
+        self.assertTrue(subscriber.wait(5))
+        self.assertFalse(subscriber.expired)
+
+
+class TestLogCapture(ccmtest.Tester):
+
+    def test_head_and_tail(self):
+        capture = logtail.LogCapture(head_size=10, tail_size=20)
+        self.assertEqual(capture.head(), '')
+        self.assertEqual(capture.tail(), '')
+        for i in range(10000):
+            capture.add('INFO line {}\n'.format(i))
+        self.assertEqual(capture.head(), 'INFO line ')
+        self.assertEqual(capture.tail(), '9998\nINFO line 9999\n')
+        # only the lines needed for the tail are kept
+        self.assertEqual(len(capture._head), 1)
+        self.assertEqual(len(capture._tail), 2)
+
+    def test_long_line(self):
+        capture = logtail.LogCapture(head_size=10, tail_size=15)
+        capture.add('x' * 1000 + 'y\n')
+        self.assertEqual(capture.head(), 'x' * 10)
+        self.assertEqual(capture.tail(), 'x' * 13 + 'y\n')
+
+    def test_errors(self):
+        capture = logtail.LogCapture(max_errors=2)
+        for i in range(5):
+            capture.add('ERROR [main] failure {}\n'.format(i))
+            capture.add('INFO  fine\n')
+        self.assertEqual(list(capture.errors), ['ERROR [main] failure 3', 'ERROR [main] failure 4'])
+        self.assertIn('Errors:\n  ERROR [main] failure 3\n  ERROR [main] failure 4', capture.describe())
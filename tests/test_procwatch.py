@@ -0,0 +1,105 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from mock import patch
+
+from ccmlib import procwatch
+from . import ccmtest
+
+
+class TestWaitForExit(ccmtest.Tester):
+
+    def _exits_promptly(self):
+        process = subprocess.Popen(['sleep', '0.3'])
+        # reaped by another thread, as the JVM is by init
+        threading.Thread(target=process.wait).start()
+        start = time.time()
+        self.assertTrue(procwatch.wait_for_exit(process.pid, timeout=10))
+        self.assertLess(time.time() - start, 0.3 + procwatch.MAX_POLL_INTERVAL_IN_SECS + 0.2)
+
+    def test_exit(self):
+        self._exits_promptly()
+
+    def test_exit_without_pidfd(self):
+        with patch('ccmlib.procwatch.pidfd_available', return_value=False):
+            self._exits_promptly()
+
+    def test_timeout(self):
+        process = subprocess.Popen(['sleep', '10'])
+        try:
+            self.assertFalse(procwatch.wait_for_exit(process.pid, timeout=0.2))
+            with patch('ccmlib.procwatch.pidfd_available', return_value=False):
+                self.assertFalse(procwatch.wait_for_exit(process.pid, timeout=0.2))
+        finally:
+            process.kill()
+            process.wait()
+
+    def test_zombie_and_missing_process(self):
+        process = subprocess.Popen(['true'])
+        time.sleep(0.2)
+        # not reaped yet
+        self.assertFalse(procwatch.is_alive(process.pid))
+        self.assertTrue(procwatch.wait_for_exit(process.pid, timeout=1))
+        process.wait()
+        self.assertTrue(procwatch.wait_for_exit(process.pid, timeout=1))
+
+
+class TestWaitForFile(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestWaitForFile, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pidfile = os.path.join(self.temp_dir.name, 'cassandra.pid')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestWaitForFile, self).tearDown()
+
+    def _write_pidfile(self):
+        # created empty first, as by a shell redirection
+        open(self.pidfile, 'w').close()
+        time.sleep(0.1)
+        with open(self.pidfile, 'w') as f:
+            f.write('1234')
+
+    def _notices_write(self):
+        threading.Timer(0.2, self._write_pidfile).start()
+        start = time.time()
+        self.assertTrue(procwatch.wait_for_file(self.pidfile, 10))
+        self.assertLess(time.time() - start, 0.3 + procwatch.MAX_POLL_INTERVAL_IN_SECS + 0.2)
+
+    def test_write(self):
+        self._notices_write()
+
+    def test_write_without_inotify(self):
+        with patch('ccmlib.logtail.inotify_available', return_value=False):
+            self._notices_write()
+
+    def test_timeout(self):
+        open(self.pidfile, 'w').close()
+        self.assertFalse(procwatch.wait_for_file(self.pidfile, 0.2))
+
+    def test_existing_file(self):
+        with open(self.pidfile, 'w') as f:
+            f.write('1234')
+        self.assertTrue(procwatch.wait_for_file(self.pidfile, 0))
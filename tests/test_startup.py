@@ -0,0 +1,246 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from ccmlib import common, logtail, startup
+from ccmlib.cluster import Cluster
+from ccmlib.node import Node, StartupError, TimeoutError
+from . import ccmtest
+
+
+class TestStartupSupervisor(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestStartupSupervisor, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.node1 = ccmtest.FakeNode('node1', self.temp_dir.name)
+        self.node2 = ccmtest.FakeNode('node2', self.temp_dir.name)
+        self.supervisor = startup.StartupSupervisor()
+
+    def tearDown(self):
+        self.supervisor.close()
+        self.temp_dir.cleanup()
+        super(TestStartupSupervisor, self).tearDown()
+
+    def _fails_fast(self, wait, fail):
+        threading.Timer(0.2, fail).start()
+        start = time.time()
+        with self.assertRaises(StartupError) as cm:
+            wait()
+        self.assertLess(time.time() - start, 2)
+        return cm.exception
+
+    def test_fatal_log_line_aborts_every_wait(self):
+        self.node1.write('ERROR old run: Exception encountered during startup\n')
+        for node in (self.node1, self.node2):
+            self.supervisor.supervise(node, from_mark=os.path.getsize(node.log_file))
+        log_cluster = Cluster.__new__(Cluster)
+        error = self._fails_fast(
+            lambda: log_cluster.watch_logs_for({self.node1: ['is now UP'], self.node2: ['is now UP']},
+                                               timeout=60, supervisor=self.supervisor),
+            lambda: self.node2.write('INFO  starting\nERROR [main] Fatal configuration error; unable to start\n'))
+        self.assertIs(error.node, self.node2)
+        self.assertIn('node2 failed to start: ERROR [main] Fatal configuration error', str(error))
+        self.assertIn('in system.log', str(error))
+
+        # later waits fail at once
+        subscriber = self.supervisor.watch(logtail.PatternSubscriber(['anything']))
+        with self.assertRaises(StartupError):
+            subscriber.wait(0)
+
+    def test_port_in_use(self):
+        self.supervisor.supervise(self.node1, from_mark=0)
+        subscriber = self.supervisor.watch(logtail.PatternSubscriber(['Starting listening']))
+        # errors the node survives
+        self.node1.write('WARN  [main] 2024-01-01 00:00:00,000 Gossiper.java:12 - Address already in use\n'
+                         'java.net.BindException: Address already in use\n')
+        self.assertFalse(subscriber.wait(0.5))
+        self.assertIsNone(self.supervisor.failure)
+        error = self._fails_fast(lambda: subscriber.wait(60), lambda: self.node1.write(
+            'ERROR [main] 2024-01-01 00:00:01,000 CassandraDaemon.java:909 - Exception encountered during startup\n'
+            'java.lang.IllegalStateException: Failed to bind port 9042 on 127.0.0.1.\n'))
+        self.assertIn('Exception encountered during startup', error.reason)
+
+    def test_launcher_output(self):
+        stdout = os.path.join(self.node1.path, 'logs', 'startup-1-stdout.log')
+        open(stdout, 'w').close()
+        self.supervisor.supervise(self.node1, output_files=[stdout])
+        subscriber = self.supervisor.watch(logtail.PatternSubscriber(['Starting listening']))
+        error = self._fails_fast(lambda: subscriber.wait(60),
+                                 lambda: self.node1.write('Error: Could not find or load main class Foo\n',
+                                                          'startup-1-stdout.log'))
+        self.assertIn('in startup-1-stdout.log', error.reason)
+
+    def test_launcher_exit(self):
+        stderr = open(os.path.join(self.node1.path, 'logs', 'startup-1-stderr.log'), 'w+')
+        self.addCleanup(stderr.close)
+
+        def launch():
+            process = subprocess.Popen(['sh', '-c', 'sleep 0.2; echo "Invalid option" >&2; exit 3'], stderr=stderr)
+            process.stderr_file = stderr
+            self.supervisor.supervise(self.node1, process)
+
+        subscriber = self.supervisor.watch(logtail.PatternSubscriber(['Starting listening']))
+        error = self._fails_fast(lambda: subscriber.wait(60), launch)
+        self.assertEqual(error.reason, 'launcher exited with status 3: Invalid option')
+
+    def test_process_exit(self):
+        process = subprocess.Popen(['sleep', '0.3'])
+        with open(os.path.join(self.node1.path, 'cassandra.pid'), 'w') as f:
+            f.write('{}\n'.format(process.pid))
+        self.supervisor.supervise(self.node1)
+        subscriber = self.supervisor.watch(logtail.PatternSubscriber(['Starting listening']))
+        # the process is still running
+        self.assertFalse(subscriber.wait(0.1))
+        error = self._fails_fast(lambda: subscriber.wait(60), process.wait)
+        self.assertEqual(error.reason, 'Cassandra process {} exited'.format(process.pid))
+
+
+class _NeverRunningNode(Node):
+    # a node whose process never gets running
+
+    def __init__(self, name):
+        self.name = name
+
+    def logfilename(self):
+        return os.path.join('no such dir', 'system.log')
+
+    def start(self, **kwargs):
+        return None
+
+    def _wait_for_running(self, process, timeout_s):
+        time.sleep(timeout_s)
+        return False
+
+
+class TestStartDeadline(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestStartDeadline, self).setUp()
+        self.node = _NeverRunningNode('node1')
+        self.supervisor = startup.StartupSupervisor()
+
+    def tearDown(self):
+        self.supervisor.close()
+        super(TestStartDeadline, self).tearDown()
+
+    def test_node_start(self):
+        with self.assertRaises(TimeoutError):
+            self.node._wait_for_start(None, self.supervisor, common.Deadline(0.1), None, verbose=False,
+                                      update_pid=False, wait_other_notice=False, marks=[], wait_for_binary_proto=True)
+
+    def test_cluster_start(self):
+        cluster = Cluster.__new__(Cluster)
+        with self.assertRaises(TimeoutError):
+            cluster._start_node(self.node, self.supervisor, common.Deadline(0.1), None, False,
+                                {'jvm_args': [], 'timeline': None}, 60, lambda phase: None)
+        self.assertIsNotNone(self.supervisor.failure)
+
+
+class _Node(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class TestStartScheduler(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestStartScheduler, self).setUp()
+        self.lock = threading.Lock()
+        self.events = []
+        self.running = 0
+        self.max_running = 0
+
+    def _pipeline(self, node, duration=0.2, fail=False):
+        def pipeline(progress):
+            with self.lock:
+                self.events.append((node.name, 'begin'))
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                progress('launched')
+                time.sleep(duration)
+                if fail:
+                    raise RuntimeError('{} failed'.format(node.name))
+                return node.name
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.events.append((node.name, 'end'))
+        return pipeline
+
+    def test_runs_starts_concurrently(self):
+        nodes = [_Node('node{}'.format(i)) for i in range(6)]
+        scheduler = startup.StartScheduler(max_concurrent_starts=3)
+        for node in nodes:
+            scheduler.add(node, self._pipeline(node))
+        start = time.time()
+        results = scheduler.run()
+        self.assertEqual(results, dict((node, node.name) for node in nodes))
+        self.assertEqual(self.max_running, 3)
+        self.assertLess(time.time() - start, 6 * 0.2)
+        # the starts begin in order
+        self.assertEqual([name for name, event in self.events if event == 'begin'], [node.name for node in nodes])
+
+    def test_slot_released_at_phase(self):
+        nodes = [_Node('node{}'.format(i)) for i in range(4)]
+        scheduler = startup.StartScheduler(max_concurrent_starts=1, slot_phase='launched')
+        for node in nodes:
+            scheduler.add(node, self._pipeline(node, duration=0.3))
+        start = time.time()
+        scheduler.run()
+        # the starts only hold their slot until launched, then wait together
+        self.assertEqual(self.max_running, 4)
+        self.assertLess(time.time() - start, 2 * 0.3)
+
+    def test_dependencies(self):
+        seed, node2, node3 = _Node('seed'), _Node('node2'), _Node('node3')
+        scheduler = startup.StartScheduler()
+        scheduler.add(node3, self._pipeline(node3), after=[(node2, 'done')])
+        scheduler.add(node2, self._pipeline(node2), after=[(seed, 'launched'), (_Node('not started'), 'launched')])
+        scheduler.add(seed, self._pipeline(seed))
+        scheduler.run()
+        begins = [name for name, event in self.events if event == 'begin']
+        self.assertEqual(begins, ['seed', 'node2', 'node3'])
+        # an unknown phase is reached once the start is over
+        self.assertLess(self.events.index(('node2', 'end')), self.events.index(('node3', 'begin')))
+
+    def test_failure_stops_pending_starts(self):
+        node1, node2, node3 = _Node('node1'), _Node('node2'), _Node('node3')
+        scheduler = startup.StartScheduler(max_concurrent_starts=2)
+        scheduler.add(node1, self._pipeline(node1, fail=True))
+        scheduler.add(node2, self._pipeline(node2, duration=0.4))
+        scheduler.add(node3, self._pipeline(node3))
+        with self.assertRaises(RuntimeError) as cm:
+            scheduler.run()
+        self.assertEqual(str(cm.exception), 'node1 failed')
+        # the start in progress went on, the pending one never began
+        self.assertIn(('node2', 'end'), self.events)
+        self.assertNotIn(('node3', 'begin'), self.events)
+
+    def test_unreachable_phase(self):
+        node1, node2 = _Node('node1'), _Node('node2')
+        scheduler = startup.StartScheduler()
+        scheduler.add(node1, self._pipeline(node1), after=[(node2, 'launched')])
+        scheduler.add(node2, self._pipeline(node2), after=[(node1, 'launched')])
+        with self.assertRaises(ValueError):
+            scheduler.run()
@@ -0,0 +1,112 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import os
+import tempfile
+
+from ccmlib import timeline
+from . import ccmtest
+
+
+def _run(run, version, start, phases):
+    # the events of a run, phases being (node, phase, seconds since start)
+    events = [{'run': run, 'time': start, 'node': None, 'phase': 'start', 'kind': 'cluster', 'version': version}]
+    events.extend({'run': run, 'time': start + offset, 'node': node, 'phase': phase} for node, phase, offset in phases)
+    return events
+
+
+class TestTimeline(ccmtest.Tester):
+
+    def setUp(self):
+        super(TestTimeline, self).setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, timeline.TIMELINE_FILENAME)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super(TestTimeline, self).tearDown()
+
+    def test_record(self):
+        first = timeline.Timeline(self.path, 'cluster', '4.0.1')
+        first.record('node1', 'exec')
+        with open(self.path, 'a') as f:
+            f.write('{"truncated\n')
+        second = timeline.Timeline(self.path, 'node')
+        second.record('node1', 'failed', error='boom')
+        events = timeline.load_events(self.path)
+        self.assertEqual([(e['run'], e['node'], e['phase']) for e in events],
+                         [(first.run, None, 'start'), (first.run, 'node1', 'exec'),
+                          (second.run, None, 'start'), (second.run, 'node1', 'failed')])
+        self.assertEqual(events[0]['version'], '4.0.1')
+        self.assertEqual(events[3]['error'], 'boom')
+        self.assertEqual(list(timeline.runs(events)), [first.run, second.run])
+
+    def test_record_at(self):
+        run = timeline.Timeline(self.path, 'cluster')
+        run.record('node1', 'gossip', at=1234.5)
+        self.assertEqual(timeline.load_events(self.path)[-1]['time'], 1234.5)
+
+    def test_record_does_not_fail(self):
+        # the start goes on without its timeline
+        timeline.Timeline(os.path.join(self.temp_dir.name, 'missing', 'timeline.jsonl'), 'node').record('node1', 'exec')
+        self.assertEqual(timeline.load_events(os.path.join(self.temp_dir.name, 'missing', 'timeline.jsonl')), [])
+
+    def test_keeps_the_last_runs(self):
+        with open(self.path, 'w') as f:
+            for run in range(timeline.MAX_RUNS + 5):
+                f.write(json.dumps({'run': str(run), 'time': run, 'node': None, 'phase': 'start'}) + '\n')
+                f.write(json.dumps({'run': str(run), 'time': run, 'node': 'node1', 'phase': 'exec'}) + '\n')
+        last = timeline.Timeline(self.path, 'cluster')
+        kept = list(timeline.runs(timeline.load_events(self.path)))
+        self.assertEqual(len(kept), timeline.MAX_RUNS)
+        self.assertEqual(kept[0], '6')
+        self.assertEqual(kept[-1], last.run)
+
+    def test_node_phases(self):
+        events = _run('a', '4.0', 100, [('node1', 'start', 0.5), ('node1', 'pid', 2), ('node1', 'pid', 3),
+                                         (None, 'ready', 10)])
+        phases = timeline.node_phases(events)
+        self.assertEqual(list(phases), [None, 'node1'])
+        self.assertEqual(phases['node1'], {'start': 0.5, 'pid': 2})
+        self.assertEqual(phases[None]['ready'], 10)
+
+    def test_percentiles_by_version(self):
+        events = []
+        for i in range(10):
+            events += _run('a{}'.format(i), '4.0', 100 * i, [('node1', 'start', 1), ('node1', 'listening', 1 + 10 + i)])
+        events += _run('b', '5.0', 2000, [('node1', 'start', 0), ('node1', 'listening', 30)])
+        durations = timeline.phase_durations(events)
+        self.assertEqual(list(durations), [('4.0', 'listening'), ('5.0', 'listening')])
+        self.assertEqual(timeline.percentile(durations[('4.0', 'listening')], 50), 14)
+        self.assertEqual(timeline.percentile(durations[('4.0', 'listening')], 90), 18)
+        self.assertEqual(timeline.percentile([3], 99), 3)
+        lines = timeline.format_percentiles(events)
+        self.assertEqual(lines[1].split(), ['4.0', 'listening', '10', '14.00', '18.00', '19.00', '19.00'])
+        self.assertEqual(lines[2].split()[:3], ['5.0', 'listening', '1'])
+
+    def test_waterfall(self):
+        events = _run('a', '4.0', 100, [('node1', 'start', 0), ('node1', 'exec', 1), ('node1', 'listening', 10),
+                                         ('node2', 'start', 5), ('node2', 'exec', 6), (None, 'ready', 20)])
+        lines = timeline.format_waterfall(events, width=20)
+        self.assertTrue(lines[0].startswith('Run a (cluster start, Cassandra 4.0) at '))
+        self.assertTrue(lines[0].endswith(', 20.0s'))
+        node1 = lines[2].split('|')
+        self.assertEqual(node1[0].split()[:4], ['node1', '0.00', '-', '-'])
+        self.assertEqual(node1[1], '=' * 10 + ' ' * 10)
+        self.assertEqual(lines[3].split('|')[1], ' ' * 5 + '=' + ' ' * 14)
+        self.assertEqual(lines[4], 'cluster: ready 20.00')